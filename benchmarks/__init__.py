@@ -0,0 +1,7 @@
+"""
+Benchmarks de Quibly.
+
+Cada módulo se ejecuta con ``python -m benchmarks.<nombre>`` desde la raíz
+del proyecto, con las mismas variables de entorno (.env) que ``manage.py``.
+Trabajan sobre una base SQLite temporal, nunca sobre db.sqlite3.
+"""
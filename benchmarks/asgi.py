@@ -0,0 +1,115 @@
+"""
+WSGI frente a ASGI en el bucle de estudio.
+
+Varios usuarios simulados recorren a la vez un capítulo (GET de la tarjeta
++ POST "siguiente", como benchmarks/write_behind.py) de tres maneras, todas
+en el mismo proceso y contra la misma base SQLite:
+
+- ``wsgi``: vistas síncronas, una hebra por usuario (cliente de pruebas,
+  que pasa por el mismo ``WSGIHandler`` que gunicorn);
+- ``asgi-sync``: ``ASGIHandler`` con las vistas síncronas, como hasta
+  ahora con core/asgi.py: cada petición salta a una hebra;
+- ``asgi``: ``ASGIHandler`` con las vistas de flashcard/async_views.py;
+  todos los usuarios son tareas del mismo bucle de eventos.
+
+    python -m benchmarks.asgi [--learners 50] [--answers 20] [--modes wsgi,asgi-sync,asgi]
+"""
+
+import argparse
+import asyncio
+import time
+
+from .harness import make_deck, make_users, print_table, run_concurrently, setup_django, summarize
+
+MODES = ('wsgi', 'asgi-sync', 'asgi')
+
+
+def study_urlconf(async_views):
+    """Un módulo de URLs con el sitio entero y las vistas de estudio elegidas."""
+    import types
+
+    from django.urls import include, path
+
+    from flashcard import async_views as async_module, urls, views
+
+    module = types.ModuleType(f'benchmarks_asgi_urls_{async_views}')
+    module.urlpatterns = [
+        *urls.study_urls(async_module if async_views else views),
+        path('', include('core.urls')),
+    ]
+    return module
+
+
+def wsgi_loop(user, chapter, answers):
+    from django.test import Client
+    from django.urls import reverse
+
+    def run():
+        client = Client()
+        client.force_login(user)
+        url = reverse('chapter_detail', args=[chapter.slug])
+        latencies = []
+        client.get(f'{url}?restart=1')
+        for _ in range(answers):
+            for method, data in (('get', None), ('post', {'mark_as': 'learned', 'action': 'next'})):
+                started = time.perf_counter()
+                response = getattr(client, method)(url, data)
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code in (200, 302), response.status_code
+        return latencies
+
+    return run
+
+
+async def asgi_loop(user, chapter, answers):
+    from django.test import AsyncClient
+    from django.urls import reverse
+
+    client = AsyncClient()
+    await client.aforce_login(user)
+    url = reverse('chapter_detail', args=[chapter.slug])
+    latencies = []
+    await client.get(f'{url}?restart=1')
+    for _ in range(answers):
+        for method, data in (('get', None), ('post', {'mark_as': 'learned', 'action': 'next'})):
+            started = time.perf_counter()
+            response = await getattr(client, method)(url, data)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code in (200, 302), response.status_code
+    return latencies
+
+
+async def run_asgi(users, chapter, answers):
+    started = time.perf_counter()
+    results = await asyncio.gather(*(asgi_loop(user, chapter, answers) for user in users))
+    return time.perf_counter() - started, [latency for worker in results for latency in worker]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--learners', type=int, default=50)
+    parser.add_argument('--answers', type=int, default=20)
+    parser.add_argument('--modes', default=','.join(MODES))
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test.utils import override_settings
+
+    users = make_users(args.learners)
+    rows = []
+    for mode in args.modes.split(','):
+        if mode not in MODES:
+            parser.error(f'modo desconocido: {mode}')
+        chapter = make_deck(f'bench {mode}', args.answers)
+        with override_settings(ROOT_URLCONF=study_urlconf(mode == 'asgi')):
+            if mode == 'wsgi':
+                elapsed, latencies = run_concurrently([wsgi_loop(user, chapter, args.answers) for user in users])
+            else:
+                elapsed, latencies = asyncio.run(run_asgi(users, chapter, args.answers))
+        rows.append(summarize(f'{mode} ({args.learners} usuarios)', elapsed, latencies))
+
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
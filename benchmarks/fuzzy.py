@@ -0,0 +1,98 @@
+"""
+Construcción, memoria y consultas del índice de flashcard/fuzzy.py.
+
+Construye el índice en memoria con un vocabulario sintético (palabras de
+sílabas al azar, español con tildes, IPA inventada) sin pasar por la base,
+y mide consultas con faltas de ortografía (una o dos ediciones al azar).
+
+    python -m benchmarks.fuzzy [--entries 500000] [--queries 1000] [--memory]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from .harness import percentile
+from .search import SYLLABLES_EN, SYLLABLES_ES, word
+
+IPA_SYMBOLS = 'æɑəɛɪʊʌɔθðʃʒŋaeioubdfgklmnprstvwz'
+
+
+def misspell(rng, text):
+    chars = list(text)
+    for _ in range(rng.randint(1, 2)):
+        i = rng.randrange(len(chars))
+        kind = rng.choice('sid')
+        if kind == 's':
+            chars[i] = rng.choice('abcdefghijklmnopqrstuvwxyz')
+        elif kind == 'i':
+            chars.insert(i, rng.choice('abcdefghijklmnopqrstuvwxyz'))
+        elif len(chars) > 3:
+            del chars[i]
+    return ''.join(chars)
+
+
+def rows(n, rng):
+    for card_id in range(1, n + 1):
+        ipa = '/' + ''.join(rng.choice(IPA_SYMBOLS) for _ in range(rng.randint(3, 8))) + '/'
+        yield card_id, word(rng, SYLLABLES_EN), word(rng, SYLLABLES_ES), ipa
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=500_000, help="Tarjetas (3 textos cada una).")
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--memory', action='store_true', help="Mide también la memoria (tracemalloc).")
+    args = parser.parse_args()
+
+    # solo los módulos puros de fuzzy.py; no hace falta base de datos
+    import os
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    import django
+    django.setup()
+    from flashcard.fuzzy import build_index, levenshtein
+
+    rng = random.Random(args.seed)
+    data = list(rows(args.entries, rng))
+
+    started = time.perf_counter()
+    index = build_index(data)
+    build_s = time.perf_counter() - started
+    print(f"{len(index)} entradas ({args.entries} tarjetas): construcción {build_s:.1f}s, "
+          f"{len(index.postings)} trigramas")
+
+    if args.memory:
+        # segunda construcción bajo tracemalloc (que la hace varias veces más lenta)
+        del index
+        tracemalloc.start()
+        index = build_index(data)
+        print(f"memoria del índice: {tracemalloc.get_traced_memory()[0] / 2**20:.0f} MB")
+        tracemalloc.stop()
+
+    queries = [misspell(rng, rng.choice(data)[rng.randint(1, 2)]) for _ in range(args.queries)]
+    for n in (1, 10):
+        latencies = []
+        for query in queries:
+            t = time.perf_counter()
+            index.closest(query, n)
+            latencies.append(time.perf_counter() - t)
+        print(f"closest(n={n}): p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+              f"p95 {percentile(latencies, 95) * 1000:.1f} ms, p99 {percentile(latencies, 99) * 1000:.1f} ms")
+
+    # con vocabulario sintético hay muchas palabras parecidas: se mide si la
+    # palabra original está entre las 10 primeras y si la primera está al
+    # menos tan cerca de la falta como la original
+    found = closest_enough = 0
+    for _ in range(args.queries):
+        original = rng.choice(data)[1]
+        typo = misspell(rng, original)
+        matches = index.closest(typo, 10)
+        found += any(m.text == original for m in matches)
+        closest_enough += bool(matches) and matches[0].distance <= levenshtein(original, typo)
+    print(f"original entre las 10 primeras: {found / args.queries:.0%}; "
+          f"primera a distancia <= la de la original: {closest_enough / args.queries:.0%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# benchmarks/harness.py
+
+import os
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+def setup_django(db_path=None):
+    """
+    Configura Django contra una base SQLite temporal y aplica las migraciones.
+    Devuelve la ruta de la base creada.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    from django.conf import settings
+
+    if db_path is None:
+        db_path = Path(tempfile.mkdtemp(prefix='quibly-bench-')) / 'bench.sqlite3'
+    settings.DATABASES['default']['NAME'] = str(db_path)
+    # varias hebras escriben a la vez: esperamos al lock en vez de fallar
+    settings.DATABASES['default'].setdefault('OPTIONS', {}).setdefault('timeout', 30)
+
+    import django
+    from django.core.management import call_command
+    from django.test.utils import setup_test_environment
+
+    django.setup()
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+    return db_path
+
+
+def make_users(n, prefix='learner'):
+    from django.contrib.auth.models import User
+
+    User.objects.bulk_create(
+        [User(username=f'{prefix}{i}', password='!') for i in range(n)],
+        ignore_conflicts=True,
+    )
+    return list(User.objects.filter(username__startswith=prefix).order_by('pk')[:n])
+
+
+def make_deck(title, n_cards):
+    """Crea un capítulo con ``n_cards`` tarjetas en bloque."""
+    from flashcard.models import Chapter, ChapterCard, Flashcard
+
+    chapter = Chapter.objects.create(title=title)
+    cards = Flashcard.objects.bulk_create([
+        Flashcard(
+            word_english=f'{title} word {i}',
+            word_spanish=f'{title} palabra {i}',
+            slug=f'{chapter.slug}-{i}',
+        )
+        for i in range(n_cards)
+    ])
+    ChapterCard.objects.bulk_create([
+        ChapterCard(chapter=chapter, flashcard=card, position=i)
+        for i, card in enumerate(cards)
+    ])
+    return chapter
+
+
+def run_concurrently(workers):
+    """
+    Ejecuta cada callable de ``workers`` en su propia hebra y devuelve
+    (segundos totales, lista de latencias en segundos de todas las hebras).
+    Cada worker debe devolver su lista de latencias. Si alguno falla, se
+    relanza su excepción al terminar todos (no se dan medidas incompletas).
+    """
+    results = [None] * len(workers)
+    errors = []
+    barrier = threading.Barrier(len(workers))
+
+    def target(i, fn):
+        from django.db import connection
+
+        barrier.wait()
+        try:
+            results[i] = fn()
+        except BaseException as exc:
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=target, args=(i, fn)) for i, fn in enumerate(workers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+    latencies = [lat for worker in results for lat in (worker or [])]
+    return elapsed, latencies
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(label, elapsed, latencies):
+    return {
+        'label': label,
+        'requests': len(latencies),
+        'seconds': round(elapsed, 3),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(statistics.median(latencies) * 1000, 2) if latencies else 0.0,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def print_table(rows, headers=('label', 'requests', 'seconds', 'rps', 'p50_ms', 'p95_ms', 'p99_ms')):
+    widths = [max(len(h), *(len(str(r[h])) for r in rows)) for h in headers]
+    print('  '.join(h.ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print('  '.join(str(row[h]).ljust(w) for h, w in zip(headers, widths)))
@@ -0,0 +1,140 @@
+"""
+Logins por segundo y memoria máxima con Argon2 bajo una ráfaga de logins.
+
+200 usuarios hacen login a la vez (POST a la vista de login con el cliente
+de pruebas de Django, una hebra cada uno) con distintos límites de hashes
+simultáneos (``PASSWORD_HASHING_CONCURRENCY``, login/hashing.py). Una hebra
+aparte lee el RSS del proceso cada pocos milisegundos para sacar el máximo
+de cada pasada: cada hash Argon2 reserva ``ARGON2_MEMORY_COST`` KiB mientras
+dura. El límite por IP de login/throttle.py se desactiva (todos los
+intentos vienen de la misma "IP").
+
+    python -m benchmarks.login [--attempts 200] [--concurrency 0,1,2,4,8] [--queue 200]
+
+``0`` en ``--concurrency`` es sin límite (tantos hashes como hebras). Con
+``--queue`` menor que los intentos, los que no caben reciben un 503: salen
+en la columna ``busy``.
+"""
+
+import argparse
+import os
+import threading
+import time
+
+from .harness import print_table, run_concurrently, setup_django, summarize
+
+HEADERS = ['label', 'requests', 'seconds', 'rps', 'p50_ms', 'p95_ms', 'p99_ms', 'ok', 'busy', 'peak_hashes', 'peak_rss_mb']
+PASSWORD = 'contraseña-de-prueba'
+
+
+def rss_mb():
+    """RSS actual del proceso en MB (Linux), o el máximo histórico si no hay /proc."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class RssMonitor:
+    """Muestrea el RSS en una hebra mientras dura el bloque ``with``."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0.0
+        self.done = threading.Event()
+
+    def sample(self):
+        while not self.done.is_set():
+            self.peak = max(self.peak, rss_mb())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.done.set()
+        self.thread.join()
+
+
+def make_login_users(n):
+    """``n`` usuarios con la misma contraseña (un solo hash: crearlos es instantáneo)."""
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+
+    encoded = make_password(PASSWORD)
+    User.objects.bulk_create(
+        [User(username=f'login{i}', password=encoded) for i in range(n)],
+        ignore_conflicts=True,
+    )
+    return [f'login{i}' for i in range(n)]
+
+
+def login_worker(username, statuses):
+    from django.test import Client
+    from django.urls import reverse
+
+    def run():
+        client = Client()
+        started = time.perf_counter()
+        response = client.post(reverse('login'), {'username': username, 'password': PASSWORD})
+        latency = time.perf_counter() - started
+        statuses.append(response.status_code)
+        assert response.status_code in (302, 503), (username, response.status_code)
+        return [latency]
+
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--attempts', type=int, default=200)
+    parser.add_argument('--concurrency', default='0,1,2,4,8',
+                        help="Límites de hashes simultáneos a probar, separados por comas (0 = sin límite)")
+    parser.add_argument('--queue', type=int, help="PASSWORD_HASHING_QUEUE (por defecto, todos los intentos)")
+    parser.add_argument('--timeout', type=float, default=120.0, help="PASSWORD_HASHING_TIMEOUT en segundos")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.test.utils import override_settings
+
+    from login import hashing
+
+    usernames = make_login_users(args.attempts)
+    print(f"Argon2: t={settings.ARGON2_TIME_COST} m={settings.ARGON2_MEMORY_COST} KiB "
+          f"p={settings.ARGON2_PARALLELISM}; {os.cpu_count()} CPUs; RSS inicial {rss_mb():.0f} MB")
+
+    rows = []
+    for limit in (int(value) for value in args.concurrency.split(',')):
+        with override_settings(
+            PASSWORD_HASHING_CONCURRENCY=limit or args.attempts,
+            PASSWORD_HASHING_QUEUE=args.attempts if args.queue is None else args.queue,
+            PASSWORD_HASHING_TIMEOUT=args.timeout,
+            LOGIN_THROTTLE_IP=0,
+            LOGIN_THROTTLE_USERNAME=0,
+        ):
+            hashing.gate.peak = 0
+            statuses = []
+            with RssMonitor() as monitor:
+                elapsed, latencies = run_concurrently([login_worker(name, statuses) for name in usernames])
+        row = summarize(f'concurrency={limit or "sin límite"}', elapsed, latencies)
+        row['ok'] = statuses.count(302)
+        row['busy'] = statuses.count(503)
+        row['rps'] = round(row['ok'] / elapsed, 1) if elapsed else 0.0
+        row['peak_hashes'] = hashing.gate.peak
+        row['peak_rss_mb'] = round(monitor.peak)
+        rows.append(row)
+
+    print_table(rows, HEADERS)
+
+
+if __name__ == '__main__':
+    main()
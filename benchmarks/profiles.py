@@ -0,0 +1,93 @@
+"""
+Latencia del flujo de estudio con cada perfil de despliegue (core/profiles.py).
+
+Varios usuarios simulados estudian a la vez (GET de la tarjeta + POST
+"siguiente" con el cliente de pruebas de Django) sobre SQLite, una vez por
+perfil: sesiones, caché, conexiones persistentes y modo WAL cambian según
+el perfil. Tras cada petición se llama a ``close_old_connections`` como
+hace el manejador de peticiones de Django, para que ``CONN_MAX_AGE`` cuente.
+
+    python -m benchmarks.profiles [--learners 20] [--steps 30] [--profiles dev,single,multi,stateless]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from .harness import make_deck, make_users, print_table, run_concurrently, setup_django, summarize
+
+
+def apply_profile(name, cache_dir):
+    """Ajustes del perfil ``name``: override_settings + conexión a la base."""
+    from django.db import connections
+    from django.test.utils import override_settings
+
+    from core import profiles
+
+    profile = profiles.PROFILES[name]
+    db = connections.settings['default']
+    options = profiles.sqlite_options(profile['sqlite_wal'])
+    # sin WAL hay que volver explícitamente al journal clásico: el modo se guarda en el fichero
+    db['OPTIONS'] = options or {'init_command': 'PRAGMA journal_mode=DELETE', 'timeout': 30}
+    db['CONN_MAX_AGE'] = profile['conn_max_age']
+    db['CONN_HEALTH_CHECKS'] = profile['conn_max_age'] > 0
+    connections.close_all()
+    return override_settings(
+        SESSION_ENGINE=profiles.SESSION_ENGINES[profile['sessions']],
+        CACHES=profiles.caches(profile['cache'], location=Path(cache_dir) / name),
+    )
+
+
+def study_loop(user, chapter, steps):
+    from django.db import close_old_connections
+    from django.test import Client
+    from django.urls import reverse
+
+    def run():
+        client = Client()
+        client.force_login(user)
+        url = reverse('chapter_detail', args=[chapter.slug])
+        client.get(f'{url}?restart=1')
+        close_old_connections()
+        latencies = []
+        for _ in range(steps):
+            started = time.perf_counter()
+            assert client.get(url).status_code == 200
+            close_old_connections()
+            response = client.post(url, {'mark_as': 'learned', 'action': 'next'})
+            close_old_connections()
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 302, response.status_code
+        return latencies
+
+    return run
+
+
+def main():
+    from core.profiles import PROFILES
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--learners', type=int, default=20)
+    parser.add_argument('--steps', type=int, default=30)
+    parser.add_argument('--profiles', default=','.join(PROFILES))
+    args = parser.parse_args()
+
+    setup_django()
+    users = make_users(args.learners)
+    cache_dir = tempfile.mkdtemp(prefix='quibly-bench-cache-')
+    rows = []
+    for name in args.profiles.split(','):
+        # un capítulo por perfil: todos empiezan con las mismas filas
+        chapter = make_deck(f'bench {name}', args.steps + 1)
+        with apply_profile(name, cache_dir):
+            workers = [study_loop(user, chapter, args.steps) for user in users]
+            elapsed, latencies = run_concurrently(workers)
+        rows.append(summarize(name, elapsed, latencies))
+
+    print("Latencia por paso de estudio (GET tarjeta + POST siguiente):")
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
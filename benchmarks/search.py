@@ -0,0 +1,94 @@
+"""
+Latencia del autocompletado y de la búsqueda (flashcard/search.py).
+
+Genera un vocabulario sintético (palabras de sílabas al azar, con tildes en
+español), lo carga en bloque, reconstruye el índice y mide
+``search.typeahead`` y ``search.search`` con prefijos de 2 a 5 letras
+tomados de palabras existentes.
+
+    python -m benchmarks.search [--cards 200000] [--queries 2000] [--target-ms 20]
+
+Sale con código 1 si el p95 del autocompletado supera ``--target-ms``.
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from .harness import print_table, setup_django, summarize
+
+SYLLABLES_EN = ['ba', 'con', 'de', 'fi', 'gra', 'ho', 'ing', 'ka', 'lo', 'mer', 'no', 'pre', 'qui', 'ro', 'st', 'ter', 'un', 'vo', 'wa', 'zy']
+SYLLABLES_ES = ['ca', 'ción', 'do', 'é', 'fa', 'gí', 'ja', 'le', 'mó', 'ña', 'pe', 'que', 'rí', 'sa', 'tú', 'va', 'xo', 'ya', 'zá', 'bre']
+
+
+def word(rng, syllables):
+    return ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+
+
+def load_cards(n, rng, batch=5000):
+    from flashcard import search
+    from flashcard.models import Flashcard
+
+    started = time.perf_counter()
+    words = []
+    for start in range(0, n, batch):
+        cards = []
+        for i in range(start, min(n, start + batch)):
+            english, spanish = word(rng, SYLLABLES_EN), word(rng, SYLLABLES_ES)
+            words.append(english if i % 2 else spanish)
+            cards.append(Flashcard(
+                word_english=english,
+                word_spanish=spanish,
+                mean_english=f'{english} {word(rng, SYLLABLES_EN)} {word(rng, SYLLABLES_EN)}',
+                mean_espanish=f'{spanish} {word(rng, SYLLABLES_ES)} {word(rng, SYLLABLES_ES)}',
+                slug=f'bench-{i}',
+            ))
+        Flashcard.objects.bulk_create(cards)
+    loaded = time.perf_counter()
+    search.rebuild()
+    return words, loaded - started, time.perf_counter() - loaded
+
+
+def measure(fn, queries):
+    latencies = []
+    started = time.perf_counter()
+    for query in queries:
+        t = time.perf_counter()
+        fn(query)
+        latencies.append(time.perf_counter() - t)
+    return time.perf_counter() - started, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cards', type=int, default=200_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--target-ms', type=float, default=20.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    from flashcard import search
+
+    rng = random.Random(args.seed)
+    words, load_s, index_s = load_cards(args.cards, rng)
+    print(f"{args.cards} tarjetas: carga {load_s:.1f}s, índice {index_s:.1f}s (motor {search.engine()})")
+
+    prefixes = [rng.choice(words)[:rng.randint(2, 5)] for _ in range(args.queries)]
+    # sin tildes, como las escribe quien no las pone
+    plain = [search.strip_accents(prefix) for prefix in prefixes]
+    rows = [
+        summarize('typeahead', *measure(lambda q: search.typeahead(q, 10), prefixes)),
+        summarize('typeahead sin tildes', *measure(lambda q: search.typeahead(q, 10), plain)),
+        summarize('search', *measure(lambda q: search.search(q, 20), prefixes)),
+    ]
+    print_table(rows)
+
+    worst = max(rows[0]['p95_ms'], rows[1]['p95_ms'])
+    print(f"p95 autocompletado: {worst} ms (objetivo {args.target_ms} ms)")
+    sys.exit(0 if worst <= args.target_ms else 1)
+
+
+if __name__ == '__main__':
+    main()
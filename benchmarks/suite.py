@@ -0,0 +1,231 @@
+"""
+Suite de benchmarks del flujo de estudio, con resultados en JSON.
+
+Genera un conjunto de datos grande (flashcard/sampledata.py) y, con el
+cliente de pruebas de Django y una hebra por usuario simulado, ejecuta:
+
+- ``study``: chapter_detail -> POST "siguiente" ... -> chapter_finished,
+  recorriendo un capítulo entero;
+- ``chapter_list``: las primeras páginas de la lista de capítulos;
+- ``chapter_restart``: reiniciar un capítulo y abrir su primera tarjeta.
+
+Por escenario informa de peticiones por segundo, p50/p95/p99 y consultas
+SQL por petición (del registro de flashcard/metrics.py), y guarda todo en
+``benchmarks/results/<commit>.json``. Con ``--compare`` contrasta con otro
+resultado y sale con código 1 si algún escenario empeora más de
+``--threshold`` por ciento en rps o en p95.
+
+    python -m benchmarks.suite [--chapters 1000] [--cards 500] [--threads 16] [--iterations 5]
+    python -m benchmarks.suite --compare benchmarks/results/abc1234.json
+"""
+
+import argparse
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from .harness import make_deck, print_table, run_concurrently, setup_django, summarize
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+SCENARIOS = ('study', 'chapter_list', 'chapter_restart')
+HEADERS = ['label', 'requests', 'seconds', 'rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries']
+
+
+def timed(latencies, client, method, url, data=None, status=None):
+    started = time.perf_counter()
+    response = getattr(client, method)(url, data or {})
+    latencies.append(time.perf_counter() - started)
+    if status is not None:
+        assert response.status_code == status, (url, response.status_code)
+    return response
+
+
+def logged_client(user):
+    from django.test import Client
+
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def study_worker(user, chapter, iterations):
+    """Recorre el capítulo entero ``iterations`` veces."""
+    from django.urls import reverse
+
+    def run():
+        client = logged_client(user)
+        detail = reverse('chapter_detail', args=[chapter.slug])
+        latencies = []
+        for _ in range(iterations):
+            timed(latencies, client, 'get', f'{detail}?restart=1', status=200)
+            while True:
+                response = timed(latencies, client, 'post', detail, {'mark_as': 'learned', 'action': 'next'}, 302)
+                if 'finished' in response['Location']:
+                    break
+                timed(latencies, client, 'get', response['Location'], status=200)
+            timed(latencies, client, 'get', response['Location'], status=200)
+        return latencies
+
+    return run
+
+
+def list_worker(user, pages, iterations):
+    from django.urls import reverse
+
+    def run():
+        client = logged_client(user)
+        url = reverse('chapter_list')
+        latencies = []
+        for _ in range(iterations):
+            for page in range(1, pages + 1):
+                timed(latencies, client, 'get', url, {'page': page}, status=200)
+        return latencies
+
+    return run
+
+
+def restart_worker(user, chapters, iterations):
+    from django.urls import reverse
+
+    def run():
+        client = logged_client(user)
+        latencies = []
+        for _ in range(iterations):
+            for chapter in chapters:
+                response = timed(latencies, client, 'get', reverse('chapter_restart', args=[chapter.slug]), status=302)
+                timed(latencies, client, 'get', response['Location'], status=200)
+        return latencies
+
+    return run
+
+
+def run_scenario(name, workers):
+    """Ejecuta ``workers`` a la vez y añade las consultas por petición."""
+    from flashcard import metrics
+
+    metrics.registry.reset()
+    elapsed, latencies = run_concurrently(workers)
+    row = summarize(name, elapsed, latencies)
+    views = metrics.registry.views
+    requests = sum(series['db_queries'].total for series in views.values())
+    row['queries'] = round(sum(series['db_queries'].sum for series in views.values()) / requests, 2) if requests else 0
+    row['views'] = {
+        view: {
+            'requests': series['db_queries'].total,
+            'queries': round(series['db_queries'].mean(), 2),
+            'p95_ms': round((series['request_seconds'].percentile(95) or 0) * 1000, 2),
+        }
+        for view, series in sorted(views.items())
+    }
+    return row
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+    return commit, dirty
+
+
+def compare(rows, baseline_path, threshold):
+    """Imprime la diferencia con otro resultado. Devuelve los escenarios que empeoran."""
+    baseline = {row['label']: row for row in json.loads(Path(baseline_path).read_text())['results']}
+    print(f"\nFrente a {baseline_path}:")
+    worse = []
+    for row in rows:
+        old = baseline.get(row['label'])
+        if old is None:
+            continue
+        rps = (row['rps'] - old['rps']) / old['rps'] * 100 if old['rps'] else 0.0
+        p95 = (row['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0.0
+        regression = rps < -threshold or p95 > threshold
+        if regression:
+            worse.append(row['label'])
+        print(f"  {row['label']:<16} rps {rps:+6.1f}%  p95 {p95:+6.1f}%  "
+              f"consultas {old['queries']} -> {row['queries']}{'  PEOR' if regression else ''}")
+    return worse
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chapters', type=int, default=1000)
+    parser.add_argument('--cards', type=int, default=500, help="Tarjetas por capítulo del conjunto de datos")
+    parser.add_argument('--threads', type=int, default=16, help="Usuarios simulados a la vez")
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--study-cards', type=int, default=20, help="Tarjetas del capítulo que se estudia entero")
+    parser.add_argument('--pages', type=int, default=3, help="Páginas de la lista de capítulos por iteración")
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help="Solo estos escenarios")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', help="Reutilizar esta base SQLite (con los datos ya generados)")
+    parser.add_argument('--output', help="Fichero JSON (por defecto benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', help="Resultado JSON con el que comparar")
+    parser.add_argument('--threshold', type=float, default=10.0, help="Empeoramiento tolerado, en %%")
+    args = parser.parse_args()
+
+    reuse = bool(args.db) and Path(args.db).exists()
+    db_path = setup_django(args.db)
+    import django
+    from django.db import connection
+
+    from flashcard import sampledata
+    from flashcard.models import Chapter
+    from flashcard.views import ChapterListView
+
+    if not reuse:
+        started = time.perf_counter()
+        created = sampledata.generate(
+            chapters=args.chapters, cards=args.cards, users=args.threads, seed=args.seed,
+            log=lambda message: print(message, file=sys.stderr),
+        )
+        print(f"Datos: {created} en {time.perf_counter() - started:.0f}s ({db_path})", file=sys.stderr)
+
+    from django.contrib.auth.models import User
+
+    users = list(User.objects.filter(username__startswith=sampledata.PREFIX).order_by('pk')[:args.threads])
+    rng = random.Random(args.seed)
+    chapters = list(Chapter.objects.filter(slug__startswith=f'{sampledata.PREFIX}-').only('pk', 'slug'))
+    rows = []
+    for name in args.scenario or SCENARIOS:
+        if name == 'study':
+            # un capítulo corto por usuario: se recorre entero hasta chapter_finished
+            decks = [make_deck(f'suite {time.time_ns()} {i}', args.study_cards) for i in range(len(users))]
+            workers = [study_worker(user, deck, args.iterations) for user, deck in zip(users, decks)]
+        elif name == 'chapter_list':
+            pages = min(args.pages, math.ceil(Chapter.objects.count() / ChapterListView.paginate_by))
+            workers = [list_worker(user, pages, args.iterations) for user in users]
+        else:
+            workers = [restart_worker(user, rng.sample(chapters, min(5, len(chapters))), args.iterations)
+                       for user in users]
+        rows.append(run_scenario(name, workers))
+
+    commit, dirty = git_revision()
+    result = {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'params': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'results': rows,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{commit}{'-dirty' if dirty else ''}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2, ensure_ascii=False))
+
+    print_table(rows, HEADERS)
+    print(f"\nResultados en {output}")
+    if args.compare and compare(rows, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
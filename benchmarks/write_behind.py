@@ -0,0 +1,75 @@
+"""
+Escritura síncrona vs. diferida (STUDY_WRITE_BEHIND) en el flujo de estudio.
+
+50 usuarios simulados estudian a la vez el mismo capítulo (POST "siguiente"
+con el cliente de pruebas de Django) sobre SQLite, primero con escritura
+inmediata y luego en modo write-behind.
+
+    python -m benchmarks.write_behind [--learners 50] [--answers 40] [--sessions db|signed_cookies]
+
+Con sesiones en base de datos cada paso sigue guardando la sesión, así que
+la mejora es moderada; con ``--sessions signed_cookies`` el modo diferido
+deja el paso de estudio sin ninguna escritura en la base.
+"""
+
+import argparse
+import time
+
+from .harness import make_deck, make_users, print_table, run_concurrently, setup_django, summarize
+
+
+def study_loop(user, chapter, answers):
+    from django.test import Client
+    from django.urls import reverse
+
+    client = Client()
+    client.force_login(user)
+    url = reverse('chapter_detail', args=[chapter.slug])
+    client.get(f'{url}?restart=1')
+
+    def run():
+        latencies = []
+        for _ in range(answers):
+            started = time.perf_counter()
+            response = client.post(url, {'mark_as': 'learned', 'action': 'next'})
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 302, response.status_code
+        # la página final vuelca lo pendiente en modo write-behind
+        client.get(reverse('chapter_finished', args=[chapter.slug]))
+        return latencies
+
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--learners', type=int, default=50)
+    parser.add_argument('--answers', type=int, default=40)
+    parser.add_argument('--batch', type=int, default=20)
+    parser.add_argument('--sessions', choices=['db', 'signed_cookies'], default='db')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test.utils import override_settings
+    from flashcard.models import CardProgress
+
+    users = make_users(args.learners)
+    rows = []
+    for label, enabled in (('sync', False), ('write-behind', True)):
+        chapter = make_deck(f'bench {label}', args.answers)
+        with override_settings(
+            STUDY_WRITE_BEHIND=enabled,
+            STUDY_WRITE_BEHIND_BATCH=args.batch,
+            SESSION_ENGINE=f'django.contrib.sessions.backends.{args.sessions}',
+        ):
+            workers = [study_loop(user, chapter, args.answers) for user in users]
+            elapsed, latencies = run_concurrently(workers)
+        stored = CardProgress.objects.filter(chapter=chapter).count()
+        assert stored == args.learners * args.answers, stored
+        rows.append(summarize(f'{label} ({args.sessions})', elapsed, latencies))
+
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
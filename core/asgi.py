@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# vistas de estudio asíncronas (flashcard/async_views.py); ASYNC_VIEWS=False las desactiva
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
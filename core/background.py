@@ -0,0 +1,73 @@
+# core/background.py
+
+"""
+Hebra de segundo plano dentro del proceso web.
+
+La usan la bandeja de salida (``OUTBOX_THREAD``, login/mail.py) y las
+acciones masivas (``BULK_JOB_THREAD``, flashcard/bulk.py) cuando no hay un
+worker aparte. ``kick()`` (normalmente desde ``transaction.on_commit``)
+pide una pasada de ``work`` y arranca la hebra si no hay ninguna; la hebra
+repite mientras haya avisos nuevos. Si ``next_run`` dice cuántos segundos
+faltan para el siguiente trabajo programado (un reintento), la hebra espera
+ese tiempo en vez de terminar.
+
+La hebra decide terminar con el mismo cerrojo que toma ``kick()``: un aviso
+llega antes (y la hebra da otra vuelta) o después (y ``kick()`` arranca una
+nueva), nunca se pierde entre medias.
+"""
+
+import logging
+import threading
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """Hebra perezosa que ejecuta ``work()`` al recibir avisos."""
+
+    def __init__(self, name, work, next_run=None):
+        self.name = name
+        self.work = work
+        self.next_run = next_run
+        self.thread = None
+        self._lock = threading.Lock()
+        self._pending = threading.Event()
+
+    def kick(self):
+        """Despierta (o arranca) la hebra. Devuelve la hebra que atenderá el aviso."""
+        with self._lock:
+            self._pending.set()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self.thread.start()
+            return self.thread
+
+    def _pass(self):
+        """Una pasada de ``work``. Devuelve los segundos hasta la siguiente, o None."""
+        try:
+            self.work()
+            return self.next_run() if self.next_run else None
+        except Exception:
+            logger.exception('Error en la hebra %s', self.name)
+            return None
+        finally:
+            # mientras espera no se queda con una conexión abierta
+            connections.close_all()
+
+    def _run(self):
+        try:
+            while True:
+                self._pending.clear()
+                delay = self._pass()
+                with self._lock:
+                    if delay is None and not self._pending.is_set():
+                        self.thread = None
+                        return
+                if delay is not None:
+                    self._pending.wait(max(delay, 1))
+        except BaseException:
+            with self._lock:
+                self.thread = None
+            raise
@@ -19,13 +19,22 @@ from django.contrib import admin
 from django.conf.urls.static import static
 from django.urls import path, include
 
+from flashcard import metrics
+from flashcard.media import serve_immutable
+
 urlpatterns = [
+    # métricas por vista (flashcard/metrics.py); antes de admin.site.urls
+    path('admin/metricas/', metrics.dashboard, name='metrics_dashboard'),
+    path('admin/metricas/perfiles/<str:name>', metrics.download_profile, name='metrics_profile'),
+    path('metrics', metrics.prometheus, name='metrics_prometheus'),
      path('admin/', admin.site.urls),
     path('', include('flashcard.urls')),
     # login urls
     path('login/', include('login.urls')),
     # Google allauth urls
     path('accounts/', include('allauth.urls')),
+    # medios procesados (nombre con hash): caché immutable, también sin DEBUG
+    path(f"{settings.MEDIA_URL.strip('/')}/v/<path:path>", serve_immutable, name='media_immutable'),
 ]
 
 if settings.DEBUG:
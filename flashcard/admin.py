@@ -1,12 +1,67 @@
 # flashcard/admin.py
 
-from django.contrib import admin
-from .models import Flashcard, Chapter
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.utils import unquote
+from django.contrib.admin.widgets import AutocompleteSelect, AutocompleteSelectMultiple
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseRedirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from . import bulk, fuzzy, media, search
+from .cache import invalidate_chapter
+from .models import BulkJob, CardProgress, Flashcard, Chapter, ChapterCard
+
+# filas por página en la lista de tarjetas de un capítulo
+CHAPTER_CARDS_PER_PAGE = 100
+
+
+class ChapterAdminForm(forms.ModelForm):
+    """
+    Capítulo sin la lista de tarjetas: las nuevas se eligen con el
+    autocompletado del admin de Flashcard (índice de búsqueda, 20 por página)
+    y las ya enlazadas se ordenan en su propia página paginada.
+    """
+    add_cards = forms.ModelMultipleChoiceField(
+        label='Añadir tarjetas',
+        queryset=Flashcard.objects.all(),
+        required=False,
+        widget=AutocompleteSelectMultiple(Chapter._meta.get_field('cards'), admin.site),
+        help_text='Se añaden al final del capítulo.',
+    )
+
+    class Meta:
+        model = Chapter
+        fields = ('title', 'description', 'slug')
+
+
+class SetCategoryForm(forms.Form):
+    """Categoría nueva de la acción "Cambiar categoría"."""
+    category = forms.ChoiceField(label='Categoría', choices=Flashcard.CATEGORY_CHOICES)
+
+
+class AddToChapterForm(forms.Form):
+    """Capítulo destino de la acción "Añadir a un capítulo"."""
+    chapter = forms.ModelChoiceField(
+        label='Capítulo',
+        queryset=Chapter.objects.all(),
+        widget=AutocompleteSelect(ChapterCard._meta.get_field('chapter'), admin.site),
+    )
 
 
 @admin.register(Chapter)
 class ChapterAdmin(admin.ModelAdmin):
-    """Configuración del admin para los capítulos."""
+    """
+    Configuración del admin para los capítulos.
+
+    La página de edición no lista las tarjetas (con miles se volvía lenta):
+    muestra cuántas hay y enlaza a ``cards_view``, que pagina por posición y
+    permite reordenar arrastrando y quitar tarjetas.
+    """
+    form = ChapterAdminForm
     list_display = (
         'title',
         'slug',
@@ -19,19 +74,114 @@ class ChapterAdmin(admin.ModelAdmin):
     prepopulated_fields = {
         'slug': ('title',),
     }
-    filter_horizontal = (
-        'cards',
+    readonly_fields = (
+        'card_summary',
     )
     fieldsets = (
         ('Datos generales', {
             'fields': ('title', 'description', 'slug'),
         }),
-        ('Tarjetas del capítulo', {
-            'fields': ('cards',),
+        ('Tarjetas', {
+            'fields': ('card_summary', 'add_cards'),
         }),
-            
     )
 
+    @admin.display(description='Tarjetas del capítulo')
+    def card_summary(self, obj):
+        if obj is None or obj.pk is None:
+            return 'Guarda el capítulo para añadir tarjetas.'
+        url = reverse('admin:flashcard_chapter_cards', args=[obj.pk])
+        return format_html('{} tarjetas · <a href="{}">Ordenar o quitar</a>', obj.card_links.count(), url)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        cards = form.cleaned_data.get('add_cards')
+        if cards:
+            form.instance.add_matching_cards(cards)
+            form.instance.touch()
+            invalidate_chapter(form.instance.pk)
+
+    def get_urls(self):
+        return [
+            path(
+                '<path:object_id>/cards/',
+                self.admin_site.admin_view(self.cards_view),
+                name='flashcard_chapter_cards',
+            ),
+            *super().get_urls(),
+        ]
+
+    def cards_view(self, request, object_id):
+        """
+        Una página de tarjetas del capítulo, leída por rango de posiciones
+        (índice ``chaptercard_pos_card_idx``): cuesta lo mismo en la primera
+        página que en la última. El POST guarda el orden nuevo de la página
+        y quita las marcadas.
+        """
+        chapter = self.get_object(request, unquote(object_id))
+        if chapter is None:
+            return self._get_obj_does_not_exist_redirect(request, self.opts, object_id)
+        if not self.has_view_or_change_permission(request, chapter):
+            raise PermissionDenied
+        can_change = self.has_change_permission(request, chapter)
+
+        if request.method == 'POST':
+            if not can_change:
+                raise PermissionDenied
+            self.save_card_page(request, chapter)
+            return HttpResponseRedirect(request.get_full_path())
+
+        total = chapter.card_links.count()
+        num_pages = max(1, -(-total // CHAPTER_CARDS_PER_PAGE))
+        try:
+            page = min(max(int(request.GET.get('p', 1)), 1), num_pages)
+        except ValueError:
+            page = 1
+        start = (page - 1) * CHAPTER_CARDS_PER_PAGE
+        links = (
+            chapter.card_links
+            .filter(position__gte=start, position__lt=start + CHAPTER_CARDS_PER_PAGE)
+            .select_related('flashcard')
+            .only('position', 'flashcard__category', 'flashcard__word_english', 'flashcard__word_spanish')
+            .order_by('position')
+        )
+        return TemplateResponse(request, 'admin/flashcard/chapter/cards.html', {
+            **self.admin_site.each_context(request),
+            'title': f'Tarjetas de «{chapter}»',
+            'opts': self.opts,
+            'chapter': chapter,
+            'links': links,
+            'total': total,
+            'page': page,
+            'num_pages': num_pages,
+            'can_change': can_change,
+        })
+
+    def save_card_page(self, request, chapter):
+        """Aplica el orden (``order``: ids de ChapterCard) y las bajas (``remove``) de una página."""
+        def ids(name):
+            return [int(value) for value in request.POST.getlist(name) if value.isdigit()]
+
+        order = ids('order')
+        links = {link.pk: link for link in chapter.card_links.filter(pk__in=order).only('position')}
+        changed = []
+        if len(links) == len(order):
+            # las posiciones de la página se reparten en el orden nuevo
+            positions = sorted(link.position for link in links.values())
+            for position, pk in zip(positions, order):
+                if links[pk].position != position:
+                    links[pk].position = position
+                    changed.append(links[pk])
+            ChapterCard.objects.bulk_update(changed, ['position'])
+
+        removed, _ = chapter.card_links.filter(pk__in=ids('remove')).delete()
+        if removed:
+            chapter.renumber_cards()
+        if changed or removed:
+            chapter.touch()
+            invalidate_chapter(chapter.pk)
+            self.message_user(request, 'Orden de tarjetas guardado.', messages.SUCCESS)
+
 
 @admin.register(Flashcard)
 class FlashcardAdmin(admin.ModelAdmin):
@@ -63,13 +213,26 @@ class FlashcardAdmin(admin.ModelAdmin):
     prepopulated_fields = {
         'slug': ('category', 'word_english'),
     }
+    # con el id al final Django no añade '-pk' al ORDER BY y la página sale
+    # directamente del índice (categoría, palabra), sin ordenar toda la tabla
     ordering = (
         'category',
         'word_english',
+        'id',
     )
+    # sin el "(N en total)" del listado filtrado: un COUNT(*) menos por página
+    show_full_result_count = False
     readonly_fields = (
         'id',
     )
+    actions = (
+        'set_category',
+        'mark_learned',
+        'mark_review',
+        'reset_viewed',
+        'regenerate_slugs',
+        'add_to_chapter',
+    )
     fieldsets = (
         ('Identidad', {
             'fields': ('id', 'category', 'slug'),
@@ -96,3 +259,168 @@ class FlashcardAdmin(admin.ModelAdmin):
             'fields': ('viewed', 'mark_as'),
         }),
     )
+
+    def save_model(self, request, obj, form, change):
+        if change and form.changed_data and set(form.changed_data) <= set(self.list_editable):
+            # viewed/mark_as (list_editable del listado): ni cachés ni índice
+            # de búsqueda dependen de ellos, basta un UPDATE de esas columnas
+            Flashcard.objects.filter(pk=obj.pk).update(
+                **{name: getattr(obj, name) for name in form.changed_data}
+            )
+            return
+        super().save_model(request, obj, form, change)
+        # audio subido o imagen nueva: se convierten ya (flashcard/media.py)
+        changed_media = [name for name in (*media.AUDIO_FIELDS, 'image_url') if name in form.changed_data]
+        if changed_media:
+            media.process_card(obj, changed_media)
+        if change:
+            return
+        # alta nueva: avisamos de tarjetas casi iguales (no se bloquea el guardado)
+        duplicates = fuzzy.find_duplicates(obj.word_english, obj.word_spanish, exclude=obj.pk)
+        if duplicates:
+            cards = Flashcard.objects.in_bulk([match.card_id for match in duplicates])
+            self.message_user(
+                request,
+                "Posibles duplicados: " + ", ".join(str(cards[m.card_id]) for m in duplicates if m.card_id in cards),
+                messages.WARNING,
+            )
+
+    def get_search_results(self, request, queryset, search_term):
+        # índice de texto completo (flashcard/search.py) en vez de icontains;
+        # la categoría no está en el índice y se busca por su valor o etiqueta
+        results = search.filter_queryset(queryset, search_term)
+        categories = search.matching_categories(search_term)
+        if categories:
+            results = results | queryset.filter(category__in=categories)
+        return results, False
+
+    def intermediate_form(self, request, form, intro, submit_label):
+        """Página intermedia de una acción que necesita datos (capítulo, categoría...)."""
+        return TemplateResponse(request, 'admin/flashcard/flashcard/action_form.html', {
+            **self.admin_site.each_context(request),
+            'title': submit_label,
+            'opts': self.opts,
+            'form': form,
+            'media': self.media + form.media,
+            'intro': intro,
+            'submit_label': submit_label,
+            'action': request.POST['action'],
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across') == '1',
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
+
+    def run_bulk(self, request, queryset, action, **params):
+        """Lanza una acción de flashcard/bulk.py y avisa del resultado o del trabajo creado."""
+        changed, job = bulk.apply(action, queryset, params, user=request.user)
+        if job is None:
+            self.message_user(request, f'{changed} flashcards actualizadas.', messages.SUCCESS)
+            return
+        url = reverse('admin:flashcard_bulkjob_change', args=[job.pk])
+        self.message_user(request, format_html(
+            'Son {} flashcards: la acción sigue en segundo plano. <a href="{}">Ver el progreso</a>.',
+            job.total, url,
+        ), messages.INFO)
+
+    @admin.action(description='Añadir a un capítulo', permissions=['change'])
+    def add_to_chapter(self, request, queryset):
+        """
+        Pide el capítulo y añade la selección al final con un solo INSERT
+        ... SELECT (``Chapter.add_matching_cards``). Con "seleccionar todas"
+        el queryset es el filtro entero del listado: no se lee en Python.
+        """
+        form = AddToChapterForm(request.POST if 'apply' in request.POST else None)
+        if form.is_valid():
+            chapter = form.cleaned_data['chapter']
+            added = chapter.add_matching_cards(queryset)
+            chapter.touch()
+            invalidate_chapter(chapter.pk)
+            self.message_user(request, f'{added} tarjetas añadidas a «{chapter}».', messages.SUCCESS)
+            return None
+        return self.intermediate_form(
+            request, form,
+            f'Se añadirán al final del capítulo las {queryset.count()} flashcards seleccionadas que aún no tenga.',
+            'Añadir a un capítulo',
+        )
+
+    @admin.action(description='Cambiar categoría', permissions=['change'])
+    def set_category(self, request, queryset):
+        form = SetCategoryForm(request.POST if 'apply' in request.POST else None)
+        if form.is_valid():
+            return self.run_bulk(request, queryset, 'set_category', category=form.cleaned_data['category'])
+        return self.intermediate_form(
+            request, form,
+            f'Nueva categoría para las {queryset.count()} flashcards seleccionadas.',
+            'Cambiar categoría',
+        )
+
+    @admin.action(description='Marcar como aprendidas', permissions=['change'])
+    def mark_learned(self, request, queryset):
+        return self.run_bulk(request, queryset, 'mark', mark_as='learned')
+
+    @admin.action(description='Marcar para repasar', permissions=['change'])
+    def mark_review(self, request, queryset):
+        return self.run_bulk(request, queryset, 'mark', mark_as='review')
+
+    @admin.action(description='Marcar como no vistas', permissions=['change'])
+    def reset_viewed(self, request, queryset):
+        return self.run_bulk(request, queryset, 'reset_viewed')
+
+    @admin.action(description='Regenerar slugs', permissions=['change'])
+    def regenerate_slugs(self, request, queryset):
+        return self.run_bulk(request, queryset, 'regenerate_slugs')
+
+
+@admin.register(BulkJob)
+class BulkJobAdmin(admin.ModelAdmin):
+    """Acciones masivas en segundo plano (flashcard/bulk.py), solo consulta."""
+    list_display = ('__str__', 'status', 'progress', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'action')
+    list_select_related = ('created_by',)
+    readonly_fields = ('action', 'params', 'status', 'progress', 'error', 'created_by', 'created_at', 'finished_at')
+    fields = readonly_fields
+
+    @admin.display(description='Progreso')
+    def progress(self, obj):
+        return format_html(
+            '<progress max="{}" value="{}"></progress> {} / {} ({} %)',
+            obj.total or 1, obj.done, obj.done, obj.total, obj.percent,
+        )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CardProgress)
+class CardProgressAdmin(admin.ModelAdmin):
+    """Progreso de estudio por usuario (solo consulta)."""
+    list_display = (
+        'user',
+        'card',
+        'chapter',
+        'status',
+        'viewed',
+        'last_seen',
+    )
+    list_filter = (
+        'status',
+        'viewed',
+    )
+    search_fields = (
+        'user__username',
+        'card__word_english',
+    )
+    list_select_related = (
+        'user',
+        'card',
+        'chapter',
+    )
+    show_full_result_count = False
+    raw_id_fields = (
+        'user',
+        'card',
+        'chapter',
+    )
@@ -0,0 +1,326 @@
+# flashcard/api.py
+
+"""
+API JSON del flujo de estudio.
+
+Permite al cliente (static/js/custom.js) descargar el mazo de un capítulo
+por páginas y enviar varias respuestas en una sola petición, en lugar de un
+POST + redirect + render completo por cada tarjeta.
+
+Para estudiar sin conexión el cliente descarga el capítulo entero de una
+vez (``chapter_bundle``: tarjetas y URLs de sus medios, comprimido con gzip
+y versionado con el ETag del mazo); el service worker (``flashcard/sw.js``)
+guarda el paquete y los medios, y las respuestas dadas sin red se envían
+después a ``chapter_answers`` con la hora en que se respondieron.
+"""
+
+import gzip
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import wraps
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.models import Count, Max
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET, require_POST
+
+from . import cache, fuzzy, search
+from .media import media_url
+from .models import Chapter, ChapterCard
+from .progress import flush_pending, record_answers, save_position
+from .views import StudyForm
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_ANSWERS = 200
+# respuestas sin conexión: se acepta su hora si no es más antigua que esto
+MAX_OFFLINE_AGE = timedelta(days=30)
+# variante de imagen que se guarda para estudiar sin conexión
+OFFLINE_IMAGE_WIDTH = 640
+TYPEAHEAD_LIMIT = 10
+MAX_TYPEAHEAD_LIMIT = 25
+
+
+def api_login_required(view):
+    """Como login_required, pero responde 401 en JSON en vez de redirigir."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Autenticación requerida.'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def deck_etag(chapter):
+    """
+    ETag del mazo a partir de las fechas de modificación del capítulo y de
+    sus tarjetas (``chapter`` debe venir anotado con ``total_cards`` y
+    ``cards_updated_at``).
+    """
+    parts = [
+        chapter.pk,
+        chapter.total_cards,
+        chapter.updated_at.isoformat(),
+        chapter.cards_updated_at.isoformat() if chapter.cards_updated_at else '',
+    ]
+    digest = hashlib.md5(':'.join(map(str, parts)).encode(), usedforsecurity=False)
+    return f'"{digest.hexdigest()}"'
+
+
+def deck_queryset():
+    return Chapter.objects.annotate(
+        total_cards=Count('card_links'),
+        cards_updated_at=Max('cards__updated_at'),
+    )
+
+
+def card_payload(card, position):
+    return {
+        'id': card.pk,
+        'position': position,
+        'category': card.category,
+        'category_display': card.get_category_display(),
+        'word_english': card.word_english,
+        'word_spanish': card.word_spanish,
+        'ipa_english': card.ipa_english,
+        'ipa_spanish': card.ipa_spanish,
+        'mean_english': card.mean_english,
+        'mean_espanish': card.mean_espanish,
+        'content': card.content,
+        'image_url': card.image_src or None,
+        'image_srcset': card.image_srcset,
+        'audio_english': card.audio_english.url if card.audio_english else None,
+        'audio_spanish': card.audio_spanish.url if card.audio_spanish else None,
+    }
+
+
+def offline_image(card):
+    """
+    Imagen para el modo sin conexión: una sola variante (la primera de al
+    menos OFFLINE_IMAGE_WIDTH px, o la mayor), para no guardar todo el srcset.
+    """
+    sizes = card.local_image_sizes()
+    if not sizes:
+        return card.image_url or None
+    name = next((name for width, name in sizes if width >= OFFLINE_IMAGE_WIDTH), sizes[-1][1])
+    return media_url(name)
+
+
+def build_bundle(chapter, version):
+    """Paquete del capítulo completo para estudiar sin conexión (JSON con gzip)."""
+    links = (
+        ChapterCard.objects
+        .filter(chapter=chapter)
+        .select_related('flashcard')
+        .order_by('position')
+    )
+    cards = []
+    media = []
+    for link in links:
+        payload = card_payload(link.flashcard, link.position)
+        # sin conexión solo hay una imagen por tarjeta: la que se descargó
+        payload['image_url'] = offline_image(link.flashcard)
+        payload['image_srcset'] = ''
+        cards.append(payload)
+        media.extend(url for url in (payload['image_url'], payload['audio_english'], payload['audio_spanish']) if url)
+    bundle = {
+        'version': version,
+        'chapter': {'slug': chapter.slug, 'title': chapter.title, 'total': len(cards)},
+        'cards': cards,
+        'media': list(dict.fromkeys(media)),
+    }
+    return gzip.compress(json.dumps(bundle, separators=(',', ':')).encode(), compresslevel=6)
+
+
+def read_int(value, default, minimum=0, maximum=None):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    value = max(minimum, value)
+    return min(value, maximum) if maximum is not None else value
+
+
+@require_GET
+@api_login_required
+def chapter_deck(request, slug):
+    """
+    Página del mazo: ``?offset=<posición inicial>&limit=<tarjetas>``.
+
+    Responde 304 si el ``If-None-Match`` coincide con la versión actual del
+    mazo, sin consultar las tarjetas.
+    """
+    chapter = get_object_or_404(deck_queryset(), slug=slug)
+    etag = deck_etag(chapter)
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    offset = read_int(request.GET.get('offset'), 0)
+    limit = read_int(request.GET.get('limit'), DEFAULT_PAGE_SIZE, minimum=1, maximum=MAX_PAGE_SIZE)
+    # las posiciones son contiguas: la página es un rango sobre (chapter, position)
+    links = (
+        ChapterCard.objects
+        .filter(chapter=chapter, position__gte=offset, position__lt=offset + limit)
+        .select_related('flashcard')
+        .order_by('position')
+    )
+    response = JsonResponse({
+        'chapter': {
+            'slug': chapter.slug,
+            'title': chapter.title,
+            'total': chapter.total_cards,
+        },
+        'offset': offset,
+        'limit': limit,
+        'next_offset': offset + limit if offset + limit < chapter.total_cards else None,
+        'cards': [card_payload(link.flashcard, link.position) for link in links],
+    })
+    response['ETag'] = etag
+    # el navegador guarda la respuesta pero la revalida siempre (304 si no cambió)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@require_GET
+@api_login_required
+def chapter_bundle(request, slug):
+    """
+    Capítulo completo en un solo paquete, para el modo sin conexión.
+
+    El cuerpo es el JSON comprimido con gzip, tal cual sale de la caché
+    (``Content-Encoding: gzip``); solo se descomprime para clientes que no
+    lo aceptan. Misma versión (ETag) y revalidación que ``chapter_deck``.
+    """
+    chapter = get_object_or_404(deck_queryset(), slug=slug)
+    etag = deck_etag(chapter)
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    version = etag.strip('"')
+    body = cache.cached(
+        'bundle', f'{cache.PREFIX}:bundle:{chapter.pk}:{version}', lambda: build_bundle(chapter, version),
+    )
+    response = HttpResponse(content_type='application/json')
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response.content = body
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response.content = gzip.decompress(body)
+    response['ETag'] = etag
+    response['Vary'] = 'Accept-Encoding'
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def read_answered_at(value, now):
+    """
+    Hora de una respuesta dada sin conexión (milisegundos desde epoch). Se
+    descarta si falta, es futura o demasiado antigua: vale ``now``.
+    """
+    millis = read_int(value, None)
+    if millis is None:
+        return now
+    try:
+        answered_at = datetime.fromtimestamp(millis / 1000, tz=dt_timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        return now
+    return answered_at if now - MAX_OFFLINE_AGE <= answered_at <= now else now
+
+
+@require_POST
+@api_login_required
+def chapter_answers(request, slug):
+    """
+    Guarda varias respuestas de una vez.
+
+    Cuerpo JSON: ``{"answers": [{"card": <id>, "mark_as": "learned",
+    "seconds": <tiempo en la tarjeta>}, ...], "position": <siguiente posición>}``. Las respuestas de tarjetas que no
+    son del capítulo se ignoran. Las dadas sin conexión traen además
+    ``"answered_at"`` (ms desde epoch) y se aplican en ese orden.
+    """
+    chapter = get_object_or_404(Chapter.objects.only('pk', 'slug', 'updated_at'), slug=slug)
+    try:
+        payload = json.loads(request.body or b'{}')
+        answers = payload.get('answers', [])
+        if not isinstance(answers, list):
+            raise ValueError
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'JSON inválido.'}, status=400)
+    if len(answers) > MAX_ANSWERS:
+        return JsonResponse({'error': f'Máximo {MAX_ANSWERS} respuestas por envío.'}, status=400)
+
+    cleaned = []
+    for answer in answers:
+        if not isinstance(answer, dict):
+            return JsonResponse({'error': 'Respuesta inválida.', 'answer': answer}, status=400)
+        # mismas opciones y validación que el formulario de estudio
+        form = StudyForm({'mark_as': answer.get('mark_as')})
+        card_id = read_int(answer.get('card'), None)
+        if card_id is None or not form.is_valid():
+            return JsonResponse({'error': 'Respuesta inválida.', 'answer': answer}, status=400)
+        cleaned.append((
+            card_id, form.cleaned_data['mark_as'], read_int(answer.get('seconds'), 0), answer.get('answered_at'),
+        ))
+
+    valid_ids = set(
+        chapter.card_links
+        .filter(flashcard_id__in={answer[0] for answer in cleaned})
+        .values_list('flashcard_id', flat=True)
+    )
+    now = timezone.now()
+    rows = sorted(
+        (
+            (card_id, chapter.pk, mark_as, read_answered_at(answered_at, now), seconds)
+            for card_id, mark_as, seconds, answered_at in cleaned
+            if card_id in valid_ids
+        ),
+        key=lambda row: row[3],
+    )
+
+    flush_pending(request.session, request.user.pk)
+    saved = record_answers(request.user.pk, rows) if rows else 0
+
+    total = chapter.card_links.count()
+    position = read_int(payload.get('position'), None, maximum=total)
+    if position is not None:
+        save_position(request.user.pk, chapter, position)
+
+    return JsonResponse({
+        'saved': saved,
+        'position': position,
+        'finished': position is not None and position >= total,
+        'finished_url': reverse('chapter_finished', args=[chapter.slug]),
+    })
+
+
+@require_GET
+@api_login_required
+def typeahead(request):
+    """Sugerencias de autocompletado: ``?q=<texto>&limit=<n>``."""
+    limit = read_int(request.GET.get('limit'), TYPEAHEAD_LIMIT, minimum=1, maximum=MAX_TYPEAHEAD_LIMIT)
+    return JsonResponse({'results': search.typeahead(request.GET.get('q', ''), limit)})
+
+
+@require_GET
+@api_login_required
+def similar_words(request):
+    """
+    Palabras más parecidas a ``?q=`` (faltas de ortografía, IPA): ``&limit=<n>``.
+    """
+    limit = read_int(request.GET.get('limit'), TYPEAHEAD_LIMIT, minimum=1, maximum=MAX_TYPEAHEAD_LIMIT)
+    matches = fuzzy.closest(request.GET.get('q', ''), limit)
+    return JsonResponse({'results': [match._asdict() for match in matches]})
+
+
+@require_GET
+@staff_member_required
+def cache_stats(request):
+    """Aciertos/fallos de flashcard/cache.py en el proceso que responde."""
+    return JsonResponse({'backend': cache.get_cache().__class__.__name__, 'stats': cache.stats()})
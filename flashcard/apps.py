@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class FlashcardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'flashcard'
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import signals  # noqa: F401
+
+        if getattr(settings, 'METRICS_ENABLED', True):
+            from .metrics import instrument_queries, instrument_templates
+
+            instrument_queries()
+            instrument_templates()
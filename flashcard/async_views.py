@@ -0,0 +1,176 @@
+# flashcard/async_views.py
+
+"""
+Versiones asíncronas de las vistas de estudio, para servir con ASGI
+(core/asgi.py activa ``ASYNC_VIEWS`` y flashcard/urls.py las enruta en
+lugar de las de flashcard/views.py).
+
+Mismas URLs, plantillas, contexto y comportamiento que las síncronas. Las
+consultas van por el ORM asíncrono (``afirst``, ``acount``, ``aupdate``,
+``async for``...), la sesión por ``aget``/``aset`` y el usuario se resuelve
+con ``request.auser()`` antes de nada, así la plantilla se renderiza sin
+tocar la base y sin salir del bucle de eventos.
+
+Con WSGI siguen valiendo las síncronas: una vista asíncrona bajo WSGI
+abre un bucle de eventos por petición y vuelve a la hebra en cada consulta.
+"""
+
+import time
+
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.mixins import AccessMixin
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.http import Http404
+from django.shortcuts import aget_object_or_404, redirect, render
+from django.urls import reverse
+from django.views import View
+
+from . import views
+from .cache import achapter_by_slug, achapter_card_ids, acard_fragment
+from .models import Chapter
+from .progress import abuffer_answer, aflush_pending, aload_position, areset_chapter, asave_position
+from .stats import achapter_stats
+from .views import StudyForm, chapter_list_queryset
+
+
+class AsyncLoginRequiredMixin(AccessMixin):
+    """``LoginRequiredMixin`` para vistas asíncronas: resuelve ``request.user`` con ``auser()``."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class ChapterListView(AsyncLoginRequiredMixin, View):
+    """``views.ChapterListView``: la página se cuenta y se lee con el ORM asíncrono."""
+    template_name = views.ChapterListView.template_name
+    paginate_by = views.ChapterListView.paginate_by
+
+    async def get(self, request, *args, **kwargs):
+        await aflush_pending(request.session, request.user.pk)
+        queryset = chapter_list_queryset(request.user)
+
+        paginator = Paginator(queryset, self.paginate_by)
+        # count es un cached_property: se rellena sin la consulta síncrona
+        paginator.count = await queryset.acount()
+        page_number = request.GET.get('page') or 1
+        try:
+            number = paginator.num_pages if page_number == 'last' else paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise Http404(f'Página no válida ({page_number}): {exc}')
+        bottom = (number - 1) * paginator.per_page
+        chapters = [chapter async for chapter in queryset[bottom:bottom + paginator.per_page]]
+        for ch in chapters:
+            # consideramos terminado si no quedan flashcards sin ver
+            ch.finished = ch.unseen_cards == 0
+
+        page = Page(chapters, number, paginator)
+        return render(request, self.template_name, {
+            'view': self,
+            'paginator': paginator,
+            'page_obj': page,
+            'is_paginated': paginator.num_pages > 1,
+            'object_list': chapters,
+            'chapters': chapters,
+        })
+
+
+class ChapterDetailView(AsyncLoginRequiredMixin, View):
+    """``views.ChapterDetailView``: una tarjeta por petición, con posición en StudyCursor."""
+    template_name = views.ChapterDetailView.template_name
+
+    async def load(self, slug):
+        """Capítulo, orden de tarjetas y posición (de flashcard/cache.py y StudyCursor)."""
+        self.object = await achapter_by_slug(slug)
+        if self.object is None:
+            raise Http404('Capítulo no encontrado.')
+        self.card_ids = await achapter_card_ids(self.object)
+        self.total = len(self.card_ids)
+        if self.request.GET.get('restart') == '1':
+            await self.set_position(0)
+        else:
+            self.position = await aload_position(self.request.user.pk, self.object, self.total)
+
+    async def set_position(self, position):
+        await asave_position(self.request.user.pk, self.object, position)
+        self.position = position
+
+    def card_id_at(self, pos):
+        return self.card_ids[pos] if pos < self.total else None
+
+    async def get(self, request, *args, **kwargs):
+        await self.load(kwargs['slug'])
+        if self.total and self.position >= self.total:
+            return redirect('chapter_finished', slug=self.object.slug)
+        return await self.render_card(StudyForm(initial={'shown_at': int(time.time())}))
+
+    async def post(self, request, *args, **kwargs):
+        await self.load(kwargs['slug'])
+        form = StudyForm(request.POST)
+        if not form.is_valid():
+            return await self.render_card(form)
+
+        pos = self.position
+        if request.POST.get('action', 'next') == 'prev':
+            await self.set_position(max(pos - 1, 0))
+            return redirect('chapter_detail', slug=self.object.slug)
+
+        card_id = self.card_id_at(pos)
+        if card_id is not None:
+            await abuffer_answer(
+                request, card_id, self.object.pk, form.cleaned_data['mark_as'], form.seconds_spent(),
+            )
+            await self.set_position(pos + 1)
+
+        if self.position >= self.total:
+            return redirect(reverse('chapter_finished', args=[self.object.slug]))
+        return redirect(f"{reverse('chapter_detail', args=[self.object.slug])}?pos={self.position + 1}")
+
+    async def render_card(self, form):
+        pos, total = self.position, self.total
+        card_id = self.card_id_at(pos)
+        fragment = await acard_fragment(card_id) if card_id is not None else None
+        ctx = {'view': self, 'object': self.object, 'chapter': self.object, 'form': form}
+        if fragment is not None:
+            ctx.update({
+                'card_id': card_id,
+                'card_html': fragment['html'],
+                'card_category': fragment['category_display'],
+                'pos': pos + 1,
+                'total': total,
+                'progress_percent': round(((pos + 1) / total) * 100) if total else 0,
+            })
+        else:
+            ctx.update({'card_id': None, 'pos': total, 'total': total, 'progress_percent': 100})
+        return render(self.request, self.template_name, ctx)
+
+
+class ChapterFinishedView(AsyncLoginRequiredMixin, View):
+    template_name = views.ChapterFinishedView.template_name
+
+    async def get(self, request, *args, **kwargs):
+        # el capítulo terminó: volcamos lo pendiente antes de calcular estadísticas
+        await aflush_pending(request.session, request.user.pk)
+        chapter = await aget_object_or_404(Chapter, slug=kwargs['slug'])
+        stats = await achapter_stats(request.user, chapter)
+        return render(request, self.template_name, {
+            'view': self,
+            'chapter': chapter,
+            'stats': stats,
+            'total': stats['total'],
+            'learned': stats['learned'],
+            'review': stats['review'],
+        })
+
+
+@login_required
+async def chapter_restart(request, slug):
+    """``views.chapter_restart``: progreso del capítulo a no visto y posición a 0."""
+    user = await request.auser()
+    chapter = await aget_object_or_404(Chapter, slug=slug)
+    await aflush_pending(request.session, user.pk)
+    await areset_chapter(user, chapter)
+    await asave_position(user.pk, chapter, 0)
+    return redirect('chapter_detail', slug=chapter.slug)
@@ -0,0 +1,227 @@
+# flashcard/bulk.py
+
+"""
+Acciones masivas del admin sobre flashcards (flashcard/admin.py).
+
+Cada acción recibe un bloque de ids y lo cambia con un solo ``update()``
+(los slugs, con un ``executemany``; nunca ``save()`` por tarjeta) y hace
+ella misma lo que harían las señales: solo la categoría sale en los
+fragmentos cacheados, en el mazo de la API y en el desglose por categoría
+de las estadísticas (flashcard/stats.py), así que es la única que cambia
+``updated_at`` e invalida las tarjetas y las categorías. ``viewed``,
+``mark_as`` y ``slug`` no están en ninguna caché ni en el índice de búsqueda.
+
+Hasta ``BULK_ACTION_SYNC_LIMIT`` tarjetas se hace en la propia petición,
+en bloques de ``BULK_ACTION_CHUNK_SIZE`` (una transacción corta cada uno:
+con SQLite un solo UPDATE de un millón de filas bloquearía las escrituras
+del estudio mientras dura). Con más se crea un BulkJob: la selección se
+copia a BulkJobItem con un INSERT ... SELECT y los bloques los procesa
+``manage.py run_bulk_jobs`` (cron o ``--loop``) o, con ``BULK_JOB_THREAD``,
+una hebra del proceso (core/background.py). El admin muestra el progreso.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.background import Worker
+
+from .cache import invalidate_cards, invalidate_categories
+from .importer import SLUG_MAX_LENGTH, base_slug, unique_slugs
+from .models import BulkJob, BulkJobItem, Flashcard
+
+logger = logging.getLogger(__name__)
+
+# un trabajo "en curso" sin avanzar en este tiempo se da por abandonado
+STALE_AFTER = timedelta(minutes=10)
+
+
+def chunk_size():
+    return getattr(settings, 'BULK_ACTION_CHUNK_SIZE', 1000)
+
+
+def _chunks(ids):
+    size = chunk_size()
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+# Acciones: bloque de ids -> tarjetas cambiadas
+
+def set_category(ids, category):
+    updated = Flashcard.objects.filter(pk__in=ids).exclude(category=category).update(
+        category=category, updated_at=timezone.now(),
+    )
+    if updated:
+        invalidate_cards(ids)
+        invalidate_categories()
+    return updated
+
+
+def mark(ids, mark_as):
+    return Flashcard.objects.filter(pk__in=ids).exclude(mark_as=mark_as).update(mark_as=mark_as)
+
+
+def reset_viewed(ids):
+    return Flashcard.objects.filter(pk__in=ids, viewed=True).update(viewed=False)
+
+
+def _is_variant(slug, base):
+    """``slug`` ya es ``base`` o ``base-<n>`` (el sufijo que pone ``unique_slugs``)."""
+    return slug == base or (slug.startswith(base + '-') and slug[len(base) + 1:].isdigit())
+
+
+def regenerate_slugs(ids):
+    """Slug de categoría y palabra en inglés, como ``Flashcard.save()``, sin chocar con otros."""
+    stale = []
+    for pk, category, word, slug in Flashcard.objects.filter(pk__in=ids).values_list(
+        'pk', 'category', 'word_english', 'slug',
+    ):
+        base = base_slug(category, word)[:SLUG_MAX_LENGTH]
+        if not _is_variant(slug, base):
+            stale.append((pk, base))
+    if not stale:
+        return 0
+    # un executemany con un UPDATE por clave primaria: bulk_update arma un
+    # CASE con una rama por fila y aquí solo cambia una columna de texto
+    slugs = unique_slugs([base for _, base in stale])
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {connection.ops.quote_name(Flashcard._meta.db_table)} SET slug = %s WHERE id = %s",
+            [(slug, pk) for (pk, _), slug in zip(stale, slugs)],
+        )
+    return len(stale)
+
+
+ACTIONS = {
+    'set_category': set_category,
+    'mark': mark,
+    'reset_viewed': reset_viewed,
+    'regenerate_slugs': regenerate_slugs,
+}
+
+
+def run(action, ids, params=None):
+    """Aplica ``action`` a ``ids`` por bloques. Devuelve cuántas tarjetas cambiaron."""
+    changed = 0
+    for chunk in _chunks(ids):
+        with transaction.atomic():
+            changed += ACTIONS[action](chunk, **(params or {}))
+    return changed
+
+
+def apply(action, queryset, params=None, user=None):
+    """
+    Aplica ``action`` a las flashcards de ``queryset``: ya mismo si son
+    pocas o con un BulkJob si pasan de ``BULK_ACTION_SYNC_LIMIT``.
+    Devuelve ``(cambiadas, job)``; ``job`` es None si ya está hecho.
+    """
+    limit = getattr(settings, 'BULK_ACTION_SYNC_LIMIT', 5000)
+    # limit + 1 ids bastan para decidir, sin contar todo el filtro
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:limit + 1])
+    if len(ids) <= limit:
+        return run(action, ids, params), None
+    return 0, enqueue(action, queryset, params, user)
+
+
+def enqueue(action, queryset, params=None, user=None):
+    """Crea el BulkJob y copia la selección a BulkJobItem con un INSERT ... SELECT."""
+    conn = connections[queryset.db]
+    qn = conn.ops.quote_name
+    subquery, sub_params = queryset.order_by().values('pk').query.get_compiler(queryset.db).as_sql()
+    with transaction.atomic(using=queryset.db):
+        job = BulkJob.objects.create(action=action, params=params or {}, created_by=user)
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {qn(BulkJobItem._meta.db_table)} (job_id, card_id) "
+                f"SELECT %s, f.id FROM {qn(Flashcard._meta.db_table)} f WHERE f.id IN ({subquery})",
+                [job.pk, *sub_params],
+            )
+            job.total = cursor.rowcount
+        job.save(update_fields=['total'])
+        if getattr(settings, 'BULK_JOB_THREAD', False):
+            transaction.on_commit(kick, using=queryset.db)
+    return job
+
+
+# Worker
+
+def _take(job, now):
+    """
+    Reserva ``job`` con un UPDATE condicional: solo si sigue como se leyó
+    (mismo estado y sin avanzar). False si otro worker se adelantó.
+    """
+    taken = BulkJob.objects.filter(pk=job.pk, status=job.status, updated_at=job.updated_at).update(
+        status=BulkJob.RUNNING, updated_at=now,
+    )
+    job.status, job.updated_at = BulkJob.RUNNING, now
+    return taken == 1
+
+
+def claim(now=None):
+    """
+    Reserva el siguiente trabajo pendiente (o abandonado) para este worker.
+    Sin ``SELECT ... FOR UPDATE``, que SQLite no tiene: dos workers pueden
+    leer el mismo trabajo, pero solo el UPDATE de uno lo encuentra igual.
+    """
+    now = now or timezone.now()
+    candidates = (
+        BulkJob.objects
+        .filter(Q(status=BulkJob.PENDING) | Q(status=BulkJob.RUNNING, updated_at__lt=now - STALE_AFTER))
+        .order_by('created_at', 'pk')
+    )
+    for job in candidates:
+        if _take(job, now):
+            return job
+    return None
+
+
+def process(job):
+    """Procesa los bloques que le quedan a ``job`` hasta terminarlo."""
+    function = ACTIONS[job.action]
+    items = BulkJobItem.objects.filter(job=job)
+    try:
+        while True:
+            ids = list(items.order_by('card_id').values_list('card_id', flat=True)[:chunk_size()])
+            if not ids:
+                break
+            with transaction.atomic():
+                function(ids, **job.params)
+                # un rango sobre el índice (job, card_id): el bloque entero en
+                # un DELETE, y cuenta lo que de verdad borró este worker
+                deleted, _ = items.filter(card_id__lte=ids[-1]).delete()
+                BulkJob.objects.filter(pk=job.pk).update(done=F('done') + deleted, updated_at=timezone.now())
+    except Exception as exc:
+        logger.exception('Acción masiva %s fallida', job.pk)
+        BulkJob.objects.filter(pk=job.pk).update(
+            status=BulkJob.FAILED, error=f'{type(exc).__name__}: {exc}'[:2000], finished_at=timezone.now(),
+        )
+    else:
+        BulkJob.objects.filter(pk=job.pk).update(status=BulkJob.DONE, finished_at=timezone.now())
+    job.refresh_from_db()
+    return job
+
+
+def run_pending(max_jobs=None):
+    """Procesa los trabajos pendientes. Devuelve los trabajos terminados o fallidos."""
+    finished = []
+    while max_jobs is None or len(finished) < max_jobs:
+        job = claim()
+        if job is None:
+            break
+        finished.append(process(job))
+    return finished
+
+
+# Hebra del proceso (BULK_JOB_THREAD)
+
+worker = Worker('bulk-jobs', run_pending)
+
+
+def kick():
+    """Despierta (o arranca) la hebra que procesa los trabajos en segundo plano."""
+    worker.kick()
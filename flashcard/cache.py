@@ -0,0 +1,323 @@
+# flashcard/cache.py
+
+"""
+Caché de capítulos, listas ordenadas de tarjetas y fragmentos HTML de cada
+flashcard.
+
+Las claves llevan la versión del contenido (``chapter:<pk>:<versión>``,
+``card:<pk>:<versión>``). Las señales de ``flashcard/signals.py`` solo
+cambian la versión del capítulo o de la tarjeta afectados, así las entradas
+viejas dejan de leerse y caducan solas. La versión es un token aleatorio: si
+el backend la expulsa se genera otro y nunca se reutiliza uno anterior.
+
+Las funciones ``a*`` son las mismas lecturas para las vistas asíncronas
+(flashcard/async_views.py): consultas con el ORM asíncrono y la caché con
+sus métodos ``aget``/``aset``, salvo la de memoria (locmem), que no
+bloquea y se llama directamente para no saltar de hebra en cada clave.
+"""
+
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.template.loader import render_to_string
+
+from .models import Chapter, Flashcard
+
+PREFIX = 'flashcard'
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.FLASHCARD_CACHE_ALIAS]
+
+
+def timeout():
+    return settings.FLASHCARD_CACHE_TIMEOUT
+
+
+def _count(kind, hit):
+    with _stats_lock:
+        _stats[f'{kind}_{"hits" if hit else "misses"}'] += 1
+
+
+def stats():
+    """Contadores de aciertos/fallos por tipo de entrada (en este proceso)."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+# Versiones
+
+def _version_key(kind, pk):
+    return f'{PREFIX}:{kind}:{pk}:version'
+
+
+def _version(kind, pk):
+    cache = get_cache()
+    key = _version_key(kind, pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex[:12], None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(kind, pk):
+    get_cache().set(_version_key(kind, pk), uuid.uuid4().hex[:12], None)
+
+
+def invalidate_chapter(pk):
+    _bump('chapter', pk)
+
+
+def invalidate_card(pk):
+    _bump('card', pk)
+
+
+def invalidate_cards(pks):
+    """``invalidate_card`` de muchas tarjetas con un solo ``set_many``."""
+    get_cache().set_many({_version_key('card', pk): uuid.uuid4().hex[:12] for pk in pks}, None)
+
+
+def invalidate_progress(user_id):
+    """Nueva respuesta del usuario: caducan sus estadísticas cacheadas."""
+    _bump('progress', user_id)
+
+
+def invalidate_lookup():
+    """Tarjetas nuevas, editadas o borradas: los índices de fuzzy.py deben ponerse al día."""
+    _bump('lookup', 'cards')
+
+
+def invalidate_categories():
+    """
+    Alguna tarjeta cambió de categoría (o se editó sin saber cuál cambió): el
+    desglose por categoría de las estadísticas cacheadas deja de valer. Los
+    cambios de categoría son cosa del admin o de importaciones, así que una
+    sola versión para todo el catálogo basta.
+    """
+    _bump('categories', 'cards')
+
+
+def categories_version():
+    return _version('categories', 'cards')
+
+
+def lookup_version():
+    return _version('lookup', 'cards')
+
+
+def progress_version(user_id):
+    return _version('progress', user_id)
+
+
+def chapter_version(chapter_id):
+    return _version('chapter', chapter_id)
+
+
+def cached(kind, key, loader):
+    cache = get_cache()
+    value = cache.get(key)
+    if value is not None:
+        _count(kind, True)
+        return value
+    _count(kind, False)
+    value = loader()
+    if value is not None:
+        cache.set(key, value, timeout())
+    return value
+
+
+# Entradas
+
+def chapter_by_slug(slug):
+    """Chapter por slug (sin anotaciones), o None si no existe."""
+    cache = get_cache()
+    pk = cache.get(f'{PREFIX}:slug:{slug}')
+    if pk is not None:
+        chapter = _chapter_by_pk(pk)
+        # si el slug cambió, la entrada vieja apunta a un capítulo con otro slug
+        if chapter is not None and chapter.slug == slug:
+            _count('chapter', True)
+            return chapter
+
+    _count('chapter', False)
+    chapter = Chapter.objects.filter(slug=slug).first()
+    if chapter is not None:
+        cache.set(f'{PREFIX}:slug:{slug}', chapter.pk, timeout())
+        cache.set(f'{PREFIX}:chapter:{chapter.pk}:{_version("chapter", chapter.pk)}', chapter, timeout())
+    return chapter
+
+
+def _chapter_by_pk(pk):
+    return get_cache().get(f'{PREFIX}:chapter:{pk}:{_version("chapter", pk)}')
+
+
+def _cursor_key(user_id, chapter_id):
+    return f'{PREFIX}:cursor:{user_id}:{chapter_id}'
+
+
+def shared_cache():
+    """¿La ven todos los procesos? La de memoria (locmem) es propia de cada worker."""
+    return not isinstance(get_cache(), LocMemCache)
+
+
+def study_cursor(user_id, chapter_id, loader):
+    """
+    ``(position, deck_version)`` del usuario en el capítulo (ver progress.py).
+
+    Solo se cachea si la caché es compartida: con locmem y varios workers,
+    uno que no vio el último avance serviría una posición vieja y la
+    respuesta se apuntaría a otra tarjeta. Entonces se lee la fila
+    StudyCursor (una búsqueda por su clave única).
+    """
+    if not shared_cache():
+        return loader()
+    return cached('cursor', _cursor_key(user_id, chapter_id), loader)
+
+
+def remember_cursor(user_id, chapter_id, value):
+    """Escritura directa: la fila StudyCursor acaba de guardarse con ``value``."""
+    if shared_cache():
+        get_cache().set(_cursor_key(user_id, chapter_id), value, timeout())
+
+
+def chapter_card_ids(chapter):
+    """Ids de las tarjetas del capítulo en orden de estudio."""
+    key = f'{PREFIX}:chapter:{chapter.pk}:{_version("chapter", chapter.pk)}:card_ids'
+    return cached('card_ids', key, chapter.card_ids)
+
+
+def card_fragment(card_id, card=None):
+    """
+    HTML de ``flashcard/_card.html`` para la tarjeta, junto con los datos que
+    la página necesita fuera del fragmento. Solo consulta la base (por clave
+    primaria) si no está en caché y no se pasa ``card``.
+    """
+    key = f'{PREFIX}:card:{card_id}:{_version("card", card_id)}:fragment'
+
+    def render():
+        obj = card or Flashcard.objects.filter(pk=card_id).first()
+        if obj is None:
+            return None
+        return {
+            'id': obj.pk,
+            'html': render_to_string('flashcard/_card.html', {'card': obj}),
+            'category_display': obj.get_category_display(),
+        }
+
+    return cached('fragment', key, render)
+
+
+
+# Versiones asíncronas
+
+async def _acache(method, *args):
+    cache = get_cache()
+    if isinstance(cache, LocMemCache):
+        return getattr(cache, method)(*args)
+    return await getattr(cache, f'a{method}')(*args)
+
+
+async def _aversion(kind, pk):
+    key = _version_key(kind, pk)
+    version = await _acache('get', key)
+    if version is None:
+        await _acache('add', key, uuid.uuid4().hex[:12], None)
+        version = await _acache('get', key)
+    return version
+
+
+async def ainvalidate_progress(user_id):
+    await _acache('set', _version_key('progress', user_id), uuid.uuid4().hex[:12], None)
+
+
+async def aprogress_version(user_id):
+    return await _aversion('progress', user_id)
+
+
+async def achapter_version(chapter_id):
+    return await _aversion('chapter', chapter_id)
+
+
+async def acategories_version():
+    return await _aversion('categories', 'cards')
+
+
+async def acached(kind, key, loader):
+    """Como ``cached``, con ``loader`` asíncrono."""
+    value = await _acache('get', key)
+    if value is not None:
+        _count(kind, True)
+        return value
+    _count(kind, False)
+    value = await loader()
+    if value is not None:
+        await _acache('set', key, value, timeout())
+    return value
+
+
+async def achapter_by_slug(slug):
+    pk = await _acache('get', f'{PREFIX}:slug:{slug}')
+    if pk is not None:
+        chapter = await _acache('get', f'{PREFIX}:chapter:{pk}:{await _aversion("chapter", pk)}')
+        if chapter is not None and chapter.slug == slug:
+            _count('chapter', True)
+            return chapter
+
+    _count('chapter', False)
+    chapter = await Chapter.objects.filter(slug=slug).afirst()
+    if chapter is not None:
+        await _acache('set', f'{PREFIX}:slug:{slug}', chapter.pk, timeout())
+        version = await _aversion('chapter', chapter.pk)
+        await _acache('set', f'{PREFIX}:chapter:{chapter.pk}:{version}', chapter, timeout())
+    return chapter
+
+
+async def astudy_cursor(user_id, chapter_id, loader):
+    if not shared_cache():
+        return await loader()
+    return await acached('cursor', _cursor_key(user_id, chapter_id), loader)
+
+
+async def aremember_cursor(user_id, chapter_id, value):
+    if shared_cache():
+        await _acache('set', _cursor_key(user_id, chapter_id), value, timeout())
+
+
+async def achapter_card_ids(chapter):
+    key = f'{PREFIX}:chapter:{chapter.pk}:{await _aversion("chapter", chapter.pk)}:card_ids'
+
+    async def load():
+        links = chapter.card_links.order_by('position').values_list('flashcard_id', flat=True)
+        return [card_id async for card_id in links]
+
+    return await acached('card_ids', key, load)
+
+
+async def acard_fragment(card_id, card=None):
+    key = f'{PREFIX}:card:{card_id}:{await _aversion("card", card_id)}:fragment'
+
+    async def render():
+        obj = card or await Flashcard.objects.filter(pk=card_id).afirst()
+        if obj is None:
+            return None
+        # la plantilla solo lee campos de la tarjeta: se renderiza sin salir del bucle
+        return {
+            'id': obj.pk,
+            'html': render_to_string('flashcard/_card.html', {'card': obj}),
+            'category_display': obj.get_category_display(),
+        }
+
+    return await acached('fragment', key, render)
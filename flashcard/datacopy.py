@@ -0,0 +1,229 @@
+# flashcard/datacopy.py
+
+"""
+Copia de los datos de una base a otra (SQLite -> PostgreSQL).
+
+Las dos bases se registran como alias extra de ``django.db.connections``;
+el destino se migra primero y luego se copian los modelos de ``MODELS`` en
+orden de dependencias, por bloques ordenados por clave primaria (keyset,
+sin OFFSET) con ``bulk_create``. Se conservan las claves primarias, así que
+al terminar se recolocan las secuencias del destino.
+
+Se copian todas las tablas con datos de los usuarios: además de las del
+estudio, sus grupos y permisos, los correos y las cuentas sociales de
+allauth (sin ellas, quien entra con Google chocaría por el email o tendría
+una cuenta nueva) y el correo pendiente. Los tipos de contenido y los
+permisos los crea ``migrate`` con otros ids, así que en el destino se
+reemplazan por los del origen. Los trabajos de acciones masivas no se
+copian: son una cola de trabajo y se vuelven a lanzar desde el admin. Los
+contadores de intentos de login (``login.LoginAttempt``) tampoco: caducan
+en minutos.
+
+La verificación compara, modelo a modelo, el número de filas y un md5 de
+todas las filas en orden de clave primaria calculado igual en las dos bases.
+"""
+
+import hashlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from allauth.account.models import EmailAddress
+from allauth.socialaccount.models import SocialAccount, SocialApp, SocialToken
+from django.contrib.auth.models import Group, Permission, User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connections, transaction
+
+from core.profiles import POSTGRES_SCHEMES, database_from_url
+
+from login.models import QueuedEmail
+
+from .models import CardProgress, Chapter, ChapterCard, Flashcard, StudyCursor
+
+SOURCE_ALIAS = 'copy_source'
+TARGET_ALIAS = 'copy_target'
+
+# los rellena migrate: en el destino se sustituyen por los del origen
+PREPOPULATED = (ContentType, Permission)
+
+# en orden: cada modelo solo apunta a los anteriores
+MODELS = (
+    *PREPOPULATED,
+    Group, Group.permissions.through,
+    User, User.groups.through, User.user_permissions.through,
+    EmailAddress, SocialApp, SocialAccount, SocialToken,
+    Chapter, Flashcard, ChapterCard, CardProgress, StudyCursor,
+    QueuedEmail,
+)
+
+DEFAULT_BATCH_SIZE = 2000
+
+
+class CopyError(Exception):
+    """La copia no se puede hacer o no coincide con el origen."""
+
+
+@dataclass
+class ModelReport:
+    label: str
+    rows: int
+    checksum: str
+
+
+def register(alias, url):
+    """Da de alta ``url`` como conexión ``alias`` (o la reemplaza)."""
+    release(alias)
+    # configure_settings completa las claves que faltan (TIME_ZONE, TEST...)
+    configured = connections.configure_settings({'default': {}, alias: database_from_url(url)})
+    connections.settings[alias] = configured[alias]
+    return connections[alias]
+
+
+def release(alias):
+    """Cierra y da de baja una conexión creada con ``register``."""
+    if alias in connections.settings:
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+
+def sqlite_url(path):
+    return f'sqlite:///{path}'
+
+
+def columns(model):
+    """Columnas concretas (``attname``: ``chapter_id`` y no ``chapter``)."""
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _normalize(value):
+    # cada backend devuelve los mismos datos con tipos ligeramente distintos
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).hex()
+    if isinstance(value, dict):
+        return {key: _normalize(value[key]) for key in sorted(value)}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def iter_rows(model, alias, batch_size=DEFAULT_BATCH_SIZE):
+    """Filas (tuplas de ``columns``) por orden de clave primaria, en bloques."""
+    names = columns(model)
+    pk = model._meta.pk.attname
+    queryset = model._base_manager.using(alias).order_by(pk).values_list(*names)
+    last = None
+    while True:
+        batch = list((queryset if last is None else queryset.filter(**{f'{pk}__gt': last}))[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1][names.index(pk)]
+
+
+def checksum(model, alias, batch_size=DEFAULT_BATCH_SIZE):
+    """(filas, md5) de la tabla de ``model`` en ``alias``."""
+    digest = hashlib.md5()
+    rows = 0
+    for batch in iter_rows(model, alias, batch_size):
+        for row in batch:
+            digest.update(repr(_normalize(row)).encode())
+            digest.update(b'\n')
+        rows += len(batch)
+    return rows, digest.hexdigest()
+
+
+def is_empty(alias):
+    return not any(model._base_manager.using(alias).exists()
+                   for model in MODELS if model not in PREPOPULATED)
+
+
+def flush(alias):
+    """Vacía las tablas copiadas del destino, de la última a la primera."""
+    with transaction.atomic(using=alias):
+        for model in reversed(MODELS):
+            model._base_manager.using(alias).all()._raw_delete(alias)
+    ContentType.objects.clear_cache()
+
+
+@contextmanager
+def keep_timestamps(model):
+    """Sin ``auto_now``/``auto_now_add``: la copia conserva las fechas del origen."""
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def copy_model(model, source, target, batch_size=DEFAULT_BATCH_SIZE):
+    """Copia todas las filas de ``model``. Devuelve cuántas."""
+    names = columns(model)
+    copied = 0
+    with keep_timestamps(model):
+        for batch in iter_rows(model, source, batch_size):
+            objects = [model(**dict(zip(names, row))) for row in batch]
+            with transaction.atomic(using=target):
+                model._base_manager.using(target).bulk_create(objects, batch_size=batch_size)
+            copied += len(objects)
+    return copied
+
+
+def reset_sequences(alias):
+    """Tras insertar con clave primaria explícita (solo PostgreSQL hace algo)."""
+    connection = connections[alias]
+    statements = connection.ops.sequence_reset_sql(no_style(), MODELS)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def verify(source, target, batch_size=DEFAULT_BATCH_SIZE):
+    """Compara filas y md5 de cada modelo; ``CopyError`` si algo no cuadra."""
+    reports = []
+    for model in MODELS:
+        expected = checksum(model, source, batch_size)
+        found = checksum(model, target, batch_size)
+        if expected != found:
+            raise CopyError(
+                f"{model._meta.label}: origen {expected[0]} filas ({expected[1]}), "
+                f"destino {found[0]} filas ({found[1]})"
+            )
+        reports.append(ModelReport(model._meta.label, *found))
+    return reports
+
+
+def copy_database(source_url, target_url, batch_size=DEFAULT_BATCH_SIZE, replace=False, log=None):
+    """
+    Migra el esquema del destino, copia ``MODELS`` y verifica la copia.
+    Con ``replace`` vacía antes el destino; si no, exige que esté vacío.
+    Devuelve un ``ModelReport`` por modelo.
+    """
+    log = log or (lambda message: None)
+    register(SOURCE_ALIAS, source_url)
+    register(TARGET_ALIAS, target_url)
+    try:
+        log("Migrando el esquema del destino...")
+        call_command('migrate', database=TARGET_ALIAS, interactive=False, verbosity=0)
+        if not replace and not is_empty(TARGET_ALIAS):
+            raise CopyError("El destino ya tiene datos (usa --flush para reemplazarlos).")
+        # también los tipos de contenido y permisos que acaba de crear migrate
+        flush(TARGET_ALIAS)
+        for model in MODELS:
+            copied = copy_model(model, SOURCE_ALIAS, TARGET_ALIAS, batch_size)
+            log(f"{model._meta.label}: {copied} filas")
+        reset_sequences(TARGET_ALIAS)
+        return verify(SOURCE_ALIAS, TARGET_ALIAS, batch_size)
+    finally:
+        connections[SOURCE_ALIAS].close()
+        connections[TARGET_ALIAS].close()
@@ -0,0 +1,145 @@
+# flashcard/explain.py
+
+"""
+Plan de ejecución de las consultas calientes (``explain_queries``).
+
+Cada entrada de ``HOT_QUERIES`` construye, para un usuario y un capítulo,
+el mismo queryset que usa la aplicación. El informe pide el plan a la base
+(``EXPLAIN QUERY PLAN`` en SQLite, ``EXPLAIN`` en PostgreSQL), mide una
+ejecución y marca los recorridos secuenciales de tablas: con 500 000
+tarjetas un ``SCAN`` de ``flashcard_flashcard`` es lo que hay que evitar.
+
+Los planes dependen de las estadísticas de la base: tras una carga grande
+hay que ejecutar ``ANALYZE`` (``explain_queries --analyze``).
+"""
+
+import re
+import time
+from dataclasses import dataclass, field
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import CardProgress, ChapterCard, Flashcard, StudyCursor
+
+# SQLite: "SCAN tabla" sin índice; PostgreSQL: "Seq Scan on tabla"
+SQLITE_SCAN = re.compile(r'\bSCAN (\w+)(?: AS \w+)?$')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+SQLITE_SORT = 'USE TEMP B-TREE'
+
+# tablas que se pueden recorrer enteras sin problema (pocas filas)
+SMALL_TABLES = {'flashcard_chapter'}
+
+
+def chapter_list(user, chapter):
+    from .views import chapter_list_queryset
+
+    return chapter_list_queryset(user)[:20]
+
+
+def chapter_card_ids(user, chapter):
+    return chapter.card_links.order_by('position').values_list('flashcard_id', flat=True)
+
+
+def chapter_page(user, chapter):
+    return (
+        ChapterCard.objects
+        .filter(chapter=chapter, position__gte=0, position__lt=50)
+        .select_related('flashcard')
+        .order_by('position')
+    )
+
+
+def study_cursor(user, chapter):
+    return StudyCursor.objects.filter(user=user, chapter=chapter).values('position', 'deck_version')
+
+
+def due_cards(user, chapter):
+    return (
+        CardProgress.objects
+        .filter(user=user, due_at__lte=timezone.now())
+        .order_by('due_at')
+        .select_related('card')[:50]
+    )
+
+
+def reset_chapter(user, chapter):
+    return CardProgress.objects.filter(user=user, card__chapter_links__chapter=chapter).values('pk')
+
+
+def flashcard_admin_list(user, chapter):
+    # FlashcardAdmin.ordering termina en id: el orden entero sale del índice
+    return Flashcard.objects.order_by(*Flashcard._meta.ordering, 'pk')[:100]
+
+
+def flashcard_admin_filter(user, chapter):
+    return Flashcard.objects.filter(mark_as='review', viewed=False).order_by(*Flashcard._meta.ordering)[:100]
+
+
+HOT_QUERIES = {
+    'chapter_list': chapter_list,
+    'chapter_card_ids': chapter_card_ids,
+    'chapter_page': chapter_page,
+    'study_cursor': study_cursor,
+    'due_cards': due_cards,
+    'reset_chapter': reset_chapter,
+    'flashcard_admin_list': flashcard_admin_list,
+    'flashcard_admin_filter': flashcard_admin_filter,
+}
+
+
+@dataclass
+class QueryReport:
+    name: str
+    plan: str
+    seconds: float
+    rows: int
+    scans: list = field(default_factory=list)
+    sorts: int = 0
+
+    @property
+    def ok(self):
+        return not self.scans
+
+
+def sequential_scans(plan, vendor=None):
+    """Tablas grandes que el plan recorre enteras."""
+    vendor = vendor or connection.vendor
+    tables = []
+    for line in plan.splitlines():
+        line = line.strip(' -|`')
+        match = (POSTGRES_SCAN.search(line) if vendor == 'postgresql'
+                 else SQLITE_SCAN.search(line))
+        if match and match.group(1) not in SMALL_TABLES:
+            tables.append(match.group(1))
+    return tables
+
+
+def explain(name, queryset):
+    vendor = connection.vendor
+    plan = queryset.explain()
+    started = time.perf_counter()
+    rows = len(list(queryset))
+    return QueryReport(
+        name=name,
+        plan=plan,
+        seconds=time.perf_counter() - started,
+        rows=rows,
+        scans=sequential_scans(plan, vendor),
+        sorts=plan.count(SQLITE_SORT) + plan.count('Sort Key'),
+    )
+
+
+def analyze():
+    """
+    Actualiza las estadísticas del planificador. Sin ellas SQLite no sabe
+    qué índice es más selectivo (y puede recorrer el progreso entero de un
+    usuario en vez de las 500 tarjetas del capítulo).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def report(user, chapter, names=None):
+    """Un ``QueryReport`` por consulta de ``HOT_QUERIES`` (o de ``names``)."""
+    return [explain(name, HOT_QUERIES[name](user, chapter)) for name in names or HOT_QUERIES]
@@ -0,0 +1,177 @@
+# flashcard/export.py
+
+"""
+Exportación en streaming de mazos y del historial de progreso.
+
+Las filas salen de ``values_list(...).iterator(chunk_size=...)``: nunca se
+instancian objetos Flashcard ni se carga el resultado completo. Las líneas
+se agrupan en bloques de ``ROWS_PER_CHUNK`` filas para no escribir fila a
+fila. Bajo ASGI el generador se consume por bloques en un hilo
+(``sync_to_async``), así la exportación no bloquea el bucle de eventos ni
+se acumula en memoria.
+
+Formatos: ``csv`` y ``jsonl`` (los mismos que lee ``import_flashcards``) y,
+solo para mazos, ``anki`` (texto separado por tabuladores con cabeceras de
+Anki: anverso, reverso y categoría como etiqueta).
+"""
+
+import csv
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.html import escape
+from django.views.decorators.http import require_GET
+
+from .importer import IMPORT_FIELDS
+from .models import CardProgress, Chapter, ChapterCard
+
+ITERATOR_CHUNK_SIZE = 2000
+ROWS_PER_CHUNK = 500
+
+DECK_FIELDS = ('slug', *IMPORT_FIELDS, 'chapter')
+PROGRESS_FIELDS = (
+    'card', 'word_english', 'chapter', 'status', 'viewed', 'last_seen',
+    'seconds_spent', 'ease', 'interval', 'repetitions', 'due_at',
+)
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson; charset=utf-8', 'jsonl'),
+    'anki': ('text/plain; charset=utf-8', 'txt'),
+}
+DECK_FORMATS = ('csv', 'jsonl', 'anki')
+PROGRESS_FORMATS = ('csv', 'jsonl')
+
+
+# Filas
+
+def deck_rows(chapter):
+    """Tarjetas del capítulo en orden de estudio, como tuplas de DECK_FIELDS."""
+    return (
+        ChapterCard.objects
+        .filter(chapter=chapter)
+        .order_by('position')
+        .values_list(
+            'flashcard__slug', *(f'flashcard__{name}' for name in IMPORT_FIELDS), 'chapter__slug',
+        )
+        .iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    )
+
+
+def progress_rows(user):
+    """Historial de ``user``, como tuplas de PROGRESS_FIELDS."""
+    return (
+        CardProgress.objects
+        .filter(user=user)
+        .order_by('pk')
+        .values_list(
+            'card__slug', 'card__word_english', 'chapter__slug', 'status', 'viewed', 'last_seen',
+            'seconds_spent', 'ease', 'interval', 'repetitions', 'due_at',
+        )
+        .iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    )
+
+
+# Formatos
+
+def _batched(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= ROWS_PER_CHUNK:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def csv_lines(fields, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # la cabecera sola si no hay filas
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def jsonl_lines(fields, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def anki_lines(fields, rows):
+    yield '#separator:tab\n#html:true\n#tags column:3\n'
+    index = {name: i for i, name in enumerate(fields)}
+
+    def field(row, name):
+        value = row[index[name]] or ''
+        return escape(value).replace('\t', ' ').replace('\n', '<br>')
+
+    for row in rows:
+        front = field(row, 'word_english')
+        if row[index['ipa_english']]:
+            front += f"<br>/{field(row, 'ipa_english')}/"
+        back = field(row, 'word_spanish')
+        if row[index['mean_espanish']]:
+            back += f"<br>{field(row, 'mean_espanish')}"
+        yield f"{front}\t{back}\t{row[index['category']]}\n"
+
+
+WRITERS = {'csv': csv_lines, 'jsonl': jsonl_lines, 'anki': anki_lines}
+
+
+def export_chunks(fmt, fields, rows):
+    """Bloques de texto (varias filas cada uno) del fichero exportado."""
+    return _batched(WRITERS[fmt](fields, rows))
+
+
+# Vistas
+
+def _async_chunks(chunks):
+    async def iterate():
+        next_chunk = sync_to_async(lambda: next(chunks, None))
+        while (chunk := await next_chunk()) is not None:
+            yield chunk
+    return iterate()
+
+
+def streaming_export(request, chunks, fmt, filename):
+    content_type, extension = FORMATS[fmt]
+    if isinstance(request, ASGIRequest):
+        chunks = _async_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    return response
+
+
+@require_GET
+@login_required
+def export_chapter(request, slug):
+    """Mazo de un capítulo: ``?format=csv|jsonl|anki``."""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in DECK_FORMATS:
+        return HttpResponseBadRequest(f"Formato no soportado: {', '.join(DECK_FORMATS)}.")
+    chapter = get_object_or_404(Chapter.objects.only('pk', 'slug'), slug=slug)
+    return streaming_export(request, export_chunks(fmt, DECK_FIELDS, deck_rows(chapter)), fmt, chapter.slug)
+
+
+@require_GET
+@login_required
+def export_progress(request):
+    """Historial de progreso del usuario: ``?format=csv|jsonl``."""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in PROGRESS_FORMATS:
+        return HttpResponseBadRequest(f"Formato no soportado: {', '.join(PROGRESS_FORMATS)}.")
+    chunks = export_chunks(fmt, PROGRESS_FIELDS, progress_rows(request.user))
+    return streaming_export(request, chunks, fmt, f'progreso-{request.user.username}')
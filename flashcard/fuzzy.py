@@ -0,0 +1,318 @@
+# flashcard/fuzzy.py
+
+"""
+Búsqueda aproximada ("¿quisiste decir...?") sobre el vocabulario.
+
+Índice de trigramas en memoria de cada worker, construido la primera vez
+que se usa a partir de ``word_english``, ``word_spanish`` e
+``ipa_english``. Representación compacta:
+
+- los textos viven concatenados en una sola cadena (``pool``) con sus
+  offsets en un ``array('I')``, en vez de un objeto str por texto;
+- cada entrada es una posición en arrays paralelos (tarjeta, campo,
+  longitud, viva);
+- las listas de apariciones de cada trigrama son ``array('I')``, 4 bytes
+  por entrada en vez de un objeto int.
+
+Las altas, cambios y borrados de tarjetas cambian una versión en la caché
+compartida (``cache.invalidate_lookup``); cada worker, al ver una versión
+nueva, lee solo las tarjetas con ``updated_at`` posterior a su última
+sincronización y las reindexa, y compara los ids del índice con los de la
+tabla (un recorrido de la clave primaria) para quitar las borradas. Así
+las borradas cuentan como entradas muertas y acaban en una compactación.
+"""
+
+import heapq
+import itertools
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter, namedtuple
+
+from . import cache
+from .models import Flashcard
+
+FIELDS = ('word_english', 'word_spanish', 'ipa_english')
+FIELD_IPA = FIELDS.index('ipa_english')
+
+# candidatos (por trigramas) que se reordenan por distancia de edición
+RERANK_FACTOR = 8
+# fracción mínima de trigramas de la consulta que debe tener un candidato
+MIN_OVERLAP = 0.3
+# apariciones que se cuentan como máximo por consulta (empezando por los
+# trigramas más raros), pero al menos MIN_GRAMS trigramas
+POSTINGS_BUDGET = 40_000
+MIN_GRAMS = 3
+# reconstrucción completa si más de esta fracción de entradas está muerta
+COMPACT_RATIO = 0.25
+# textos nuevos que se acumulan antes de pasarlos al pool
+PENDING_LIMIT = 10_000
+
+Match = namedtuple('Match', 'card_id text field distance score')
+
+_IPA_MARKS = re.compile(r"[/\[\]ˈˌ.ː'\s]+")
+
+
+def normalize(text, field=0):
+    """Minúsculas sin tildes; en IPA se quitan barras, acentos y alargamientos."""
+    text = (text or '').strip()
+    if field == FIELD_IPA:
+        return _IPA_MARKS.sub('', text)
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def levenshtein(a, b):
+    """Distancia de edición (inserción, borrado y sustitución)."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def looks_like_ipa(text):
+    return any(ord(ch) > 0x24F for ch in text) or text.strip().startswith('/')
+
+
+class LookupIndex:
+    """
+    Índice de trigramas. No toca la base: ``add`` recibe filas
+    ``(card_id, word_english, word_spanish, ipa_english)``.
+    """
+
+    def __init__(self):
+        # entradas (un texto de una tarjeta) en arrays paralelos
+        self.entry_card = array('I')
+        self.entry_field = array('B')
+        self.entry_len = array('B')
+        self.alive = bytearray()
+        # textos: los ya compactados en ``pool`` (con sus offsets) y los
+        # añadidos después, pendientes de compactar, en ``pending``
+        self.pool = ''
+        self.offsets = array('I', [0])
+        self.pending = []
+        self.postings = {}
+        # tarjetas en orden de alta con el inicio de sus entradas; las que
+        # se reindexan después van a ``moved``
+        self.card_ids = array('I')
+        self.card_start = array('I')
+        self.moved = {}
+        self.dead = 0
+
+    def __len__(self):
+        return len(self.entry_card) - self.dead
+
+    def text(self, index):
+        frozen = len(self.offsets) - 1
+        if index < frozen:
+            return self.pool[self.offsets[index]:self.offsets[index + 1]]
+        return self.pending[index - frozen]
+
+    def compact_texts(self):
+        """Pasa los textos pendientes al pool (una sola cadena)."""
+        if not self.pending:
+            return
+        position = self.offsets[-1]
+        for text in self.pending:
+            position += len(text)
+            self.offsets.append(position)
+        self.pool += ''.join(self.pending)
+        self.pending = []
+
+    def _append(self, card_id, values):
+        start = len(self.entry_card)
+        for field, value in enumerate(values):
+            text = normalize(value, field)
+            if not text:
+                continue
+            index = len(self.entry_card)
+            self.entry_card.append(card_id)
+            self.entry_field.append(field)
+            self.entry_len.append(min(len(text), 255))
+            self.alive.append(1)
+            self.pending.append(text)
+            for gram in trigrams(text):
+                postings = self.postings.get(gram)
+                if postings is None:
+                    postings = self.postings[gram] = array('I')
+                postings.append(index)
+        return start, len(self.entry_card)
+
+    def _entries_of(self, card_id):
+        if card_id in self.moved:
+            return self.moved[card_id]
+        i = bisect_left(self.card_ids, card_id)
+        if i < len(self.card_ids) and self.card_ids[i] == card_id:
+            end = self.card_start[i + 1] if i + 1 < len(self.card_start) else len(self.entry_card)
+            return self.card_start[i], end
+        return None
+
+    def add(self, row):
+        """Añade o reemplaza una tarjeta."""
+        card_id, *values = row
+        self.remove(card_id)
+        if card_id not in self.moved and (not self.card_ids or card_id > self.card_ids[-1]):
+            # alta en orden (construcción inicial o pk nuevo)
+            self.card_ids.append(card_id)
+            self.card_start.append(len(self.entry_card))
+            self._append(card_id, values)
+        else:
+            self.moved[card_id] = self._append(card_id, values)
+        if len(self.pending) >= PENDING_LIMIT:
+            self.compact_texts()
+
+    def remove(self, card_id):
+        span = self._entries_of(card_id)
+        if span is None:
+            return
+        for index in range(*span):
+            if self.alive[index] and self.entry_card[index] == card_id:
+                self.alive[index] = 0
+                self.dead += 1
+
+    def card_id_set(self):
+        """Tarjetas con alguna entrada viva."""
+        return set(itertools.compress(self.entry_card, self.alive))
+
+    def needs_compaction(self):
+        return self.dead > COMPACT_RATIO * max(len(self.entry_card), 1)
+
+    def closest(self, text, n=10, fields=None):
+        """Las ``n`` tarjetas con algún texto más parecido a ``text``."""
+        field_filter = None
+        if fields is not None:
+            field_filter = {FIELDS.index(name) for name in fields}
+        query_field = FIELD_IPA if looks_like_ipa(text) else 0
+        query = normalize(text, query_field)
+        grams = trigrams(query) if query else set()
+        if not grams:
+            return []
+
+        # candidatos: se cuentan primero los trigramas más raros, hasta
+        # POSTINGS_BUDGET apariciones (los trigramas muy comunes apenas
+        # discriminan y son los que más cuestan)
+        lists = sorted(
+            (self.postings[gram] for gram in grams if gram in self.postings), key=len,
+        )
+        counts = Counter()
+        used = total = 0
+        for postings in lists:
+            if used >= MIN_GRAMS and total + len(postings) > POSTINGS_BUDGET:
+                break
+            counts.update(postings)
+            used += 1
+            total += len(postings)
+        if not used:
+            return []
+
+        min_common = max(1, int(used * MIN_OVERLAP))
+        alive, entry_field, entry_len = self.alive, self.entry_field, self.entry_len
+        candidates = heapq.nlargest(
+            n * RERANK_FACTOR,
+            (
+                (common / (used + entry_len[index]), index)
+                for index, common in counts.items()
+                if common >= min_common and alive[index]
+                and (field_filter is None or entry_field[index] in field_filter)
+            ),
+        )
+
+        best = {}
+        for _, index in candidates:
+            card_id = self.entry_card[index]
+            candidate = self.text(index)
+            other = trigrams(candidate)
+            score = 2 * len(grams & other) / (len(grams) + len(other))
+            match = Match(card_id, candidate, FIELDS[entry_field[index]], levenshtein(query, candidate), round(score, 3))
+            current = best.get(card_id)
+            if current is None or (match.distance, -match.score) < (current.distance, -current.score):
+                best[card_id] = match
+        return sorted(best.values(), key=lambda m: (m.distance, -m.score, m.text))[:n]
+
+
+def build_index(rows):
+    index = LookupIndex()
+    for row in rows:
+        index.add(row)
+    index.compact_texts()
+    return index
+
+
+def card_rows(queryset=None):
+    queryset = Flashcard.objects.all() if queryset is None else queryset
+    return queryset.order_by('pk').values_list('pk', *FIELDS).iterator(chunk_size=5000)
+
+
+# Índice del proceso
+
+_lock = threading.Lock()
+_state = {'index': None, 'version': None, 'synced_at': None}
+
+
+def _max_updated_at():
+    return Flashcard.objects.order_by('-updated_at').values_list('updated_at', flat=True).first()
+
+
+def get_index():
+    """
+    Índice de este proceso: se construye la primera vez y se pone al día
+    con las tarjetas modificadas cuando cambia la versión compartida.
+    """
+    version = cache.lookup_version()
+    if _state['index'] is not None and _state['version'] == version:
+        return _state['index']
+    with _lock:
+        index = _state['index']
+        if index is None or index.needs_compaction():
+            synced_at = _max_updated_at()
+            index = build_index(card_rows())
+        elif _state['version'] != version:
+            synced_at = _max_updated_at()
+            if _state['synced_at'] is not None:
+                # >=: varias tarjetas pueden compartir el último instante
+                for row in card_rows(Flashcard.objects.filter(updated_at__gte=_state['synced_at'])):
+                    index.add(row)
+            # un borrado no vuelve en la consulta anterior: se busca por ids
+            existing = set(Flashcard.objects.values_list('pk', flat=True).iterator(chunk_size=5000))
+            for card_id in index.card_id_set() - existing:
+                index.remove(card_id)
+            if index.needs_compaction():
+                index = build_index(card_rows())
+        else:
+            return index
+        _state.update(index=index, version=version, synced_at=synced_at)
+        return index
+
+
+def reset():
+    with _lock:
+        _state.update(index=None, version=None, synced_at=None)
+
+
+def closest(text, n=10, fields=None):
+    """Sugerencias para ``text``."""
+    return get_index().closest(text, n, fields)
+
+
+def find_duplicates(word_english, word_spanish='', exclude=None, max_distance=1, n=5):
+    """Tarjetas cuya palabra en inglés (o en español) está a ``max_distance`` ediciones o menos."""
+    found = {}
+    for text, field in ((word_english, 'word_english'), (word_spanish, 'word_spanish')):
+        if not text:
+            continue
+        for match in closest(text, n, fields=[field]):
+            if match.distance <= max_distance and match.card_id != exclude:
+                found.setdefault(match.card_id, match)
+    return list(found.values())[:n]
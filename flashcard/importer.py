@@ -0,0 +1,283 @@
+# flashcard/importer.py
+
+"""
+Importación masiva de flashcards desde CSV o JSONL.
+
+Las filas se leen en streaming y se procesan por bloques: cada bloque es
+una transacción con un ``bulk_create`` de tarjetas y otro de enlaces en la
+tabla intermedia. En memoria solo vive el bloque actual (más un contador de
+posición por capítulo), así que el tamaño del fichero no importa.
+
+Columnas reconocidas: las de ``IMPORT_FIELDS`` más ``slug`` (opcional) y
+``chapter`` (título o slug del capítulo; opcional).
+"""
+
+import csv
+import io
+import json
+import sys
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils.text import slugify
+
+from .cache import invalidate_card, invalidate_categories, invalidate_chapter, invalidate_lookup
+from .models import Chapter, ChapterCard, Flashcard
+from .search import index_cards
+
+IMPORT_FIELDS = (
+    'category', 'word_english', 'word_spanish', 'ipa_english', 'ipa_spanish',
+    'mean_english', 'mean_espanish', 'content', 'image_url',
+)
+REQUIRED_FIELDS = ('word_english', 'word_spanish')
+CATEGORIES = {value for value, _ in Flashcard.CATEGORY_CHOICES}
+SLUG_MAX_LENGTH = Flashcard._meta.get_field('slug').max_length
+CHAPTER_SLUG_MAX_LENGTH = Chapter._meta.get_field('slug').max_length
+
+DEFAULT_CHUNK_SIZE = 1000
+PREFIX_BATCH = 200
+
+
+class ImportRowError(ValueError):
+    """Fila que no se puede importar (se salta y se informa)."""
+
+    def __init__(self, line, message):
+        super().__init__(f"línea {line}: {message}")
+        self.line = line
+
+
+@dataclass
+class ChunkResult:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    linked: int = 0
+    errors: list = field(default_factory=list)
+
+
+def detect_format(path):
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_rows(stream, fmt):
+    """
+    Genera ``(línea, dict)`` desde un fichero de texto abierto. Las líneas
+    de JSONL que no son un objeto se devuelven como error en vez de cortar
+    la importación.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as exc:
+            yield line, ImportRowError(line, f"JSON inválido ({exc.msg})")
+            continue
+        yield line, row if isinstance(row, dict) else ImportRowError(line, "se esperaba un objeto")
+
+
+def open_text(path):
+    if path == '-':
+        return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+    return open(path, encoding='utf-8-sig', newline='')
+
+
+def clean_row(line, row):
+    if isinstance(row, ImportRowError):
+        raise row
+    data = {name: str(row.get(name) or '').strip() for name in IMPORT_FIELDS}
+    missing = [name for name in REQUIRED_FIELDS if not data[name]]
+    if missing:
+        raise ImportRowError(line, f"faltan campos: {', '.join(missing)}")
+    data['category'] = data['category'] or 'word'
+    if data['category'] not in CATEGORIES:
+        raise ImportRowError(line, f"categoría desconocida '{data['category']}'")
+    data['image_url'] = data['image_url'] or None
+    slug = slugify(str(row.get('slug') or '')) or base_slug(data['category'], data['word_english'])
+    return slug[:SLUG_MAX_LENGTH], data, str(row.get('chapter') or '').strip()
+
+
+def base_slug(category, word_english):
+    # el mismo slug que Flashcard.save()
+    return slugify(f"{category}-{word_english}")
+
+
+def _with_suffix(slug, n, max_length=SLUG_MAX_LENGTH):
+    suffix = f'-{n}'
+    return slug[:max_length - len(suffix)] + suffix
+
+
+def _variants_of(slug, max_length=SLUG_MAX_LENGTH):
+    """
+    Slugs ``<slug>-<n>`` ya usados, como rango sobre el índice único (un
+    ``startswith`` sería LIKE y recorrería la tabla). Los slugs son ASCII,
+    todos menores que ``\x7f``.
+    """
+    prefix = slug + '-' if len(slug) <= max_length - 6 else slug[:max_length - 6]
+    return Q(slug__gte=prefix, slug__lt=prefix + '\x7f')
+
+
+def unique_slugs(slugs, model=Flashcard):
+    """
+    Slugs únicos para un bloque de tarjetas (o capítulos) nuevos: los que
+    chocan con la base o con otra fila del bloque reciben ``-2``, ``-3``...
+    Los bloques anteriores ya están en la base, así que basta con consultarla.
+    """
+    max_length = model._meta.get_field('slug').max_length
+    objects = model.objects
+    taken = set(objects.filter(slug__in=set(slugs)).values_list('slug', flat=True))
+    seen, clashes = set(), set()
+    for slug in slugs:
+        if slug in taken or slug in seen:
+            clashes.add(slug)
+        seen.add(slug)
+    # solo para los que chocan: traemos también sus variantes con sufijo, en
+    # grupos para no pasar el límite de expresiones de SQLite
+    clashes = sorted(clashes)
+    for start in range(0, len(clashes), PREFIX_BATCH):
+        variants = Q()
+        for slug in clashes[start:start + PREFIX_BATCH]:
+            variants |= _variants_of(slug, max_length)
+        taken.update(objects.filter(variants).values_list('slug', flat=True))
+
+    result = []
+    for slug in slugs:
+        candidate, n = slug, 2
+        while candidate in taken:
+            candidate = _with_suffix(slug, n, max_length)
+            n += 1
+        taken.add(candidate)
+        result.append(candidate)
+    return result
+
+
+class Importer:
+    """
+    Importa bloques de filas. ``chapter`` es el capítulo por defecto para
+    las filas sin columna ``chapter``; con ``update`` las filas cuyo slug ya
+    existe actualizan esa tarjeta en lugar de crear otra.
+    """
+
+    def __init__(self, chapter=None, update=False, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.default_chapter = chapter
+        self.update = update
+        self.chunk_size = chunk_size
+        self.chapters = {}       # nombre en el fichero -> Chapter
+        self.next_position = {}  # chapter.pk -> siguiente posición libre
+
+    def run(self, rows):
+        """Procesa ``rows`` (pares ``(línea, dict)``) y genera un ChunkResult por bloque."""
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                return
+            yield self.import_chunk(chunk)
+
+    def chapter_for(self, name):
+        """
+        Capítulo por título o slug exactos, o si no por ``slugify(name)``
+        ("verbos irregulares!" es el capítulo "Verbos irregulares"). Si no
+        existe se crea con un slug libre, como los de las tarjetas.
+        """
+        if not name:
+            return self.default_chapter
+        if name not in self.chapters:
+            slug = slugify(name)[:CHAPTER_SLUG_MAX_LENGTH]
+            found = list(Chapter.objects.filter(Q(slug=name) | Q(title=name) | Q(slug=slug)).order_by('pk'))
+            exact = [chapter for chapter in found if name in (chapter.slug, chapter.title)]
+            chapter = (exact or found or [None])[0]
+            if chapter is None:
+                slug = unique_slugs([slug or 'capitulo'], Chapter)[0]
+                chapter = Chapter.objects.create(title=name, slug=slug)
+            self.chapters[name] = chapter
+        return self.chapters[name]
+
+    @transaction.atomic
+    def import_chunk(self, chunk):
+        result = ChunkResult(rows=len(chunk))
+        cleaned = []
+        for line, row in chunk:
+            try:
+                cleaned.append(clean_row(line, row))
+            except ImportRowError as exc:
+                result.errors.append(exc)
+        if not cleaned:
+            return result
+
+        if self.update:
+            # la última fila de cada slug gana
+            by_slug = {slug: (slug, data, chapter) for slug, data, chapter in cleaned}
+            cleaned = list(by_slug.values())
+            existing = set(
+                Flashcard.objects.filter(slug__in=by_slug).values_list('slug', flat=True)
+            )
+            cards = [Flashcard(slug=slug, **data) for slug, data, _ in cleaned]
+            Flashcard.objects.bulk_create(
+                cards,
+                update_conflicts=True,
+                unique_fields=['slug'],
+                update_fields=[*IMPORT_FIELDS, 'updated_at'],
+            )
+            result.updated = len(existing)
+            result.created = len(cards) - len(existing)
+        else:
+            slugs = unique_slugs([slug for slug, _, _ in cleaned])
+            cleaned = [(slug, data, chapter) for slug, (_, data, chapter) in zip(slugs, cleaned)]
+            cards = [Flashcard(slug=slug, **data) for slug, data, _ in cleaned]
+            Flashcard.objects.bulk_create(cards)
+            result.created = len(cards)
+
+        # los pk no siempre vuelven del INSERT (p. ej. con ON CONFLICT): los leemos por slug
+        ids = dict(
+            Flashcard.objects.filter(slug__in=[slug for slug, _, _ in cleaned]).values_list('slug', 'pk')
+        )
+        if self.update:
+            for slug, _, _ in cleaned:
+                invalidate_card(ids[slug])
+            invalidate_categories()
+        # bulk_create no emite post_save: los índices de búsqueda se actualizan aquí
+        index_cards(ids.values())
+        invalidate_lookup()
+
+        result.linked = self.link_cards(
+            (self.chapter_for(name), ids[slug]) for slug, _, name in cleaned
+        )
+        return result
+
+    def link_cards(self, pairs):
+        """Añade al final de cada capítulo las tarjetas que aún no tiene."""
+        wanted = {}
+        for chapter, card_id in pairs:
+            if chapter is not None:
+                wanted.setdefault(chapter, {}).setdefault(card_id, None)
+
+        links = []
+        for chapter, card_ids in wanted.items():
+            present = set(
+                chapter.card_links.filter(flashcard_id__in=card_ids).values_list('flashcard_id', flat=True)
+            )
+            if chapter.pk not in self.next_position:
+                last = chapter.card_links.aggregate(last=Max('position'))['last']
+                self.next_position[chapter.pk] = 0 if last is None else last + 1
+            for card_id in card_ids:
+                if card_id in present:
+                    continue
+                links.append(ChapterCard(
+                    chapter=chapter, flashcard_id=card_id, position=self.next_position[chapter.pk],
+                ))
+                self.next_position[chapter.pk] += 1
+
+        # bulk_create no emite m2m_changed: versionamos los capítulos a mano
+        ChapterCard.objects.bulk_create(links)
+        for chapter in wanted:
+            chapter.touch()
+            invalidate_chapter(chapter.pk)
+        return len(links)
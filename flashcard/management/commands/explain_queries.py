@@ -0,0 +1,69 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from flashcard import explain
+from flashcard.models import Chapter, StudyCursor
+
+
+class Command(BaseCommand):
+    help = (
+        "Muestra el plan (EXPLAIN) y el tiempo de las consultas calientes del estudio "
+        "y marca los recorridos secuenciales de tablas grandes (flashcard/explain.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Usuario con el que consultar (por defecto, uno con progreso)")
+        parser.add_argument('--chapter', help="Slug del capítulo (por defecto, el último creado)")
+        parser.add_argument('--query', action='append', choices=list(explain.HOT_QUERIES),
+                            help="Solo estas consultas (se puede repetir)")
+        parser.add_argument('--plans', action='store_true', help="Mostrar el plan completo de cada consulta")
+        parser.add_argument('--analyze', action='store_true',
+                            help="Ejecutar ANALYZE antes (estadísticas del planificador)")
+        parser.add_argument('--fail-on-scan', action='store_true',
+                            help="Salir con error si alguna consulta recorre una tabla entera")
+
+    def handle(self, *args, **options):
+        user = self.pick_user(options['user'])
+        chapter = self.pick_chapter(options['chapter'])
+        if options['analyze']:
+            explain.analyze()
+        self.stdout.write(f"{connection.vendor}: usuario {user}, capítulo {chapter.slug}\n")
+
+        reports = explain.report(user, chapter, options['query'])
+        for item in reports:
+            status = self.style.SUCCESS('ok  ') if item.ok else self.style.ERROR('SCAN')
+            extra = f"  recorre: {', '.join(item.scans)}" if item.scans else ''
+            if item.sorts:
+                extra += f"  ordena sin índice: {item.sorts}"
+            self.stdout.write(f"{status} {item.name:<24} {item.seconds * 1000:8.1f} ms {item.rows:>6} filas{extra}")
+            if options['plans'] or not item.ok:
+                for line in item.plan.splitlines():
+                    self.stdout.write(f"       {line}")
+
+        scans = [item.name for item in reports if not item.ok]
+        if scans and options['fail_on_scan']:
+            raise CommandError(f"Recorridos secuenciales en: {', '.join(scans)}")
+
+    def pick_user(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f"No existe el usuario {username!r}")
+            return user
+        cursor = StudyCursor.objects.select_related('user').order_by('pk').first()
+        user = cursor.user if cursor else User.objects.order_by('pk').first()
+        if user is None:
+            raise CommandError("No hay usuarios: crea datos con generate_sample_data")
+        return user
+
+    def pick_chapter(self, slug):
+        if slug:
+            chapter = Chapter.objects.filter(slug=slug).first()
+            if chapter is None:
+                raise CommandError(f"No existe el capítulo {slug!r}")
+            return chapter
+        chapter = Chapter.objects.order_by('-pk').first()
+        if chapter is None:
+            raise CommandError("No hay capítulos: crea datos con generate_sample_data")
+        return chapter
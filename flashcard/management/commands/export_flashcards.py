@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from flashcard.export import (
+    DECK_FIELDS, DECK_FORMATS, PROGRESS_FIELDS, PROGRESS_FORMATS,
+    deck_rows, export_chunks, progress_rows,
+)
+from flashcard.models import Chapter
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta en streaming las tarjetas de un capítulo (CSV, JSONL o Anki) o el "
+        "historial de progreso de un usuario (CSV o JSONL)."
+    )
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('--chapter', help="Slug del capítulo a exportar.")
+        source.add_argument('--user', help="Nombre de usuario cuyo progreso se exporta.")
+        parser.add_argument('--format', dest='fmt', choices=DECK_FORMATS, default='csv')
+        parser.add_argument('--output', '-o', default='-', help="Fichero de salida ('-' para stdout).")
+
+    def handle(self, *args, chapter, user, fmt, output, **options):
+        if chapter:
+            obj = Chapter.objects.filter(slug=chapter).only('pk').first()
+            if obj is None:
+                raise CommandError(f"No existe el capítulo '{chapter}'.")
+            chunks = export_chunks(fmt, DECK_FIELDS, deck_rows(obj))
+        else:
+            if fmt not in PROGRESS_FORMATS:
+                raise CommandError(f"El progreso solo se exporta en {', '.join(PROGRESS_FORMATS)}.")
+            obj = get_user_model().objects.filter(username=user).first()
+            if obj is None:
+                raise CommandError(f"No existe el usuario '{user}'.")
+            chunks = export_chunks(fmt, PROGRESS_FIELDS, progress_rows(obj))
+
+        if output == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(output, 'w', encoding='utf-8', newline='') as stream:
+            for chunk in chunks:
+                stream.write(chunk)
@@ -0,0 +1,40 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from flashcard.progress import PENDING_KEY, flush_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Vuelca las respuestas de estudio diferidas (STUDY_WRITE_BEHIND) que "
+        "quedaron en sesiones abandonadas. Solo aplica a sesiones en base de datos."
+    )
+
+    def handle(self, *args, **options):
+        engine = import_module(settings.SESSION_ENGINE)
+        now = timezone.now()
+        sessions = answers = 0
+
+        for session in Session.objects.iterator(chunk_size=500):
+            data = session.get_decoded()
+            user_id = data.get('_auth_user_id')
+            if not data.get(PENDING_KEY) or user_id is None:
+                continue
+
+            if session.expire_date > now:
+                store = engine.SessionStore(session_key=session.session_key)
+                answers += flush_pending(store, user_id)
+                store.save()
+            else:
+                # la sesión caducó: volcamos y la borramos para no repetir el volcado
+                answers += flush_pending(data, user_id)
+                session.delete()
+            sessions += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{answers} respuestas volcadas desde {sessions} sesiones."
+        ))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from flashcard import sampledata
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera capítulos, tarjetas y progreso sintéticos para medir consultas "
+        "e índices (flashcard/sampledata.py). No borra nada: se añade a lo que haya."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chapters', type=int, default=1000)
+        parser.add_argument('--cards', type=int, default=500, help="Tarjetas por capítulo")
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--studied', type=int, default=20, help="Capítulos estudiados por usuario")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=sampledata.DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created = sampledata.generate(
+            chapters=options['chapters'], cards=options['cards'], users=options['users'],
+            studied=options['studied'], seed=options['seed'], batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{created['chapters']} capítulos, {created['cards']} tarjetas, {created['users']} usuarios "
+            f"y {created['progress']} filas de progreso en {time.perf_counter() - started:.1f}s."
+        ))
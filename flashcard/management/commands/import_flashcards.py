@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from flashcard.importer import DEFAULT_CHUNK_SIZE, Importer, detect_format, open_text, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa flashcards desde un fichero CSV o JSONL (o '-' para stdin) por "
+        "bloques, con bulk_create y enlaces masivos a capítulos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichero .csv/.jsonl, o '-' para leer de stdin.")
+        parser.add_argument('--format', dest='fmt', choices=['csv', 'jsonl'], help="Por defecto, según la extensión.")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument(
+            '--chapter',
+            help="Capítulo (slug o título) para las filas sin columna 'chapter'. Se crea si no existe.",
+        )
+        parser.add_argument(
+            '--update', action='store_true',
+            help="Upsert por slug: las tarjetas existentes se actualizan en vez de duplicarse.",
+        )
+
+    def handle(self, *args, path, fmt, chunk_size, chapter, update, **options):
+        if chunk_size < 1:
+            raise CommandError("--chunk-size debe ser mayor que 0.")
+        importer = Importer(update=update, chunk_size=chunk_size)
+        importer.default_chapter = importer.chapter_for(chapter)
+        fmt = fmt or detect_format(path)
+        rows = created = updated = linked = errors = 0
+        started = time.perf_counter()
+
+        try:
+            stream = open_text(path)
+        except OSError as exc:
+            raise CommandError(f"No se puede abrir {path}: {exc}")
+        with stream:
+            for result in importer.run(read_rows(stream, fmt)):
+                rows += result.rows
+                created += result.created
+                updated += result.updated
+                linked += result.linked
+                errors += len(result.errors)
+                for error in result.errors:
+                    self.stderr.write(str(error))
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"{rows} filas ({rows / (time.perf_counter() - started):.0f} filas/s)")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{rows} filas en {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f} filas/s): "
+            f"{created} creadas, {updated} actualizadas, {linked} enlazadas a capítulos, "
+            f"{errors} con errores."
+        ))
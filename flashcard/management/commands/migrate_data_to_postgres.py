@@ -0,0 +1,57 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from flashcard import datacopy
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia usuarios, capítulos, flashcards, enlaces capítulo-tarjeta y progreso "
+        "de una base SQLite a PostgreSQL por bloques y verifica la copia con un checksum "
+        "(flashcard/datacopy.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source', default=str(settings.BASE_DIR / 'db.sqlite3'),
+            help="Fichero SQLite de origen (por defecto, db.sqlite3)",
+        )
+        parser.add_argument(
+            '--target', default=settings.DATABASE_URL,
+            help="URL de la base de destino (por defecto, DATABASE_URL)",
+        )
+        parser.add_argument('--batch-size', type=int, default=datacopy.DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            '--flush', action='store_true',
+            help="Vaciar antes las tablas del destino si ya tienen datos",
+        )
+
+    def handle(self, *args, **options):
+        if not os.path.isfile(options['source']):
+            # SQLite crearía un fichero vacío y la "copia" saldría bien
+            raise CommandError(f"No existe la base de origen: {options['source']}")
+        source = datacopy.sqlite_url(options['source'])
+        target = options['target']
+        if source == target:
+            raise CommandError("El origen y el destino son la misma base.")
+        if not target.startswith(datacopy.POSTGRES_SCHEMES):
+            self.stderr.write(self.style.WARNING(f"El destino no es PostgreSQL: {target}"))
+
+        started = time.perf_counter()
+        try:
+            reports = datacopy.copy_database(
+                source, target, batch_size=options['batch_size'],
+                replace=options['flush'], log=self.stdout.write,
+            )
+        except (datacopy.CopyError, DatabaseError, ValueError) as exc:
+            raise CommandError(exc) from exc
+
+        for report in reports:
+            self.stdout.write(f"  {report.label:<24} {report.rows:>8} filas  md5 {report.checksum}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Copia verificada en {time.perf_counter() - started:.1f}s."
+        ))
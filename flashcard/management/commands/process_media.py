@@ -0,0 +1,52 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from flashcard import media
+from flashcard.models import Flashcard
+
+
+class Command(BaseCommand):
+    help = (
+        "Convierte los medios de las flashcards que aún no se procesaron: audio "
+        "normalizado y variantes de imagen con hash en el nombre (flashcard/media.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Procesos en paralelo (por defecto, uno por CPU; 1 = sin pool)",
+        )
+        parser.add_argument('--limit', type=int, help="Procesar como máximo N tarjetas")
+
+    def handle(self, *args, **options):
+        ids = list(media.pending_cards(Flashcard.objects.order_by('pk')).values_list('pk', flat=True))
+        if options['limit']:
+            ids = ids[:options['limit']]
+        if not ids:
+            self.stdout.write("No hay medios pendientes.")
+            return
+
+        started = time.perf_counter()
+        updated = 0
+        if options['workers'] <= 1:
+            for pk in ids:
+                _, fields = media.process_card_id(pk)
+                updated += bool(fields)
+        else:
+            # cada proceso abre su propia conexión: no heredar la del padre
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                futures = [pool.submit(media.process_card_id, pk) for pk in ids]
+                for future in as_completed(futures):
+                    _, fields = future.result()
+                    updated += bool(fields)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{updated} de {len(ids)} tarjetas actualizadas en {elapsed:.1f}s "
+            f"(las demás se quedan como estaban; ver avisos)."
+        ))
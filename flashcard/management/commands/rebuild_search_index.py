@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from flashcard import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye el índice de búsqueda FTS5 (SQLite) a partir de las flashcards. "
+        "En PostgreSQL el índice GIN se mantiene solo y no hace nada."
+    )
+
+    def handle(self, *args, **options):
+        if search.engine() != 'fts5':
+            self.stdout.write(f"Motor de búsqueda '{search.engine()}': nada que reconstruir.")
+            return
+        total = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"{total} tarjetas indexadas."))
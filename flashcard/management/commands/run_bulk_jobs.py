@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from flashcard.bulk import run_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Procesa las acciones masivas del admin que quedaron en segundo plano "
+        "(flashcard/bulk.py), bloque a bloque. Pensado para cron o, con --loop, como worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="No terminar: volver a mirar cada --interval segundos")
+        parser.add_argument('--interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        while True:
+            jobs = run_pending()
+            for job in jobs:
+                style = self.style.SUCCESS if job.status == job.DONE else self.style.ERROR
+                self.stdout.write(style(f"{job} [{job.get_status_display()}]"))
+            if not options['loop']:
+                if not jobs:
+                    self.stdout.write("No hay acciones pendientes.")
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,282 @@
+# flashcard/media.py
+
+"""
+Procesado y publicación de los medios de las flashcards.
+
+- Audio (``audio_english``/``audio_spanish``): se normaliza con ffmpeg a
+  mono y a un bitrate bajo (Opus por defecto, MP3 con
+  ``MEDIA_AUDIO_FORMAT=mp3``) y el campo pasa a apuntar al fichero nuevo.
+- Imagen (``image_url``): se descarga una vez y se generan variantes WebP
+  de varios anchos (``IMAGE_WIDTHS``) que se guardan en ``image_variants``;
+  la plantilla las sirve con ``srcset`` en vez de enlazar la imagen externa.
+
+Todo lo generado se guarda bajo ``MEDIA_ROOT/v/`` con el hash del contenido
+en el nombre: un fichero nunca cambia, así que se sirve con caché
+``immutable`` de un año (``serve_immutable`` o un CDN delante de
+``MEDIA_CDN_URL``).
+
+Pillow y ffmpeg son opcionales: sin ellos la tarjeta se queda con el medio
+original y se registra un aviso.
+"""
+
+import hashlib
+import io
+import ipaddress
+import logging
+import mimetypes
+import shutil
+import socket
+import subprocess
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.views.decorators.http import require_safe
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow es opcional
+    Image = ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# prefijo (dentro de MEDIA_ROOT) de los ficheros con hash en el nombre
+IMMUTABLE_PREFIX = 'v/'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+AUDIO_FIELDS = ('audio_english', 'audio_spanish')
+AUDIO_FORMATS = {
+    # formato: (extensión, argumentos de ffmpeg)
+    'opus': ('ogg', ['-c:a', 'libopus', '-b:a', '32k', '-f', 'ogg']),
+    'mp3': ('mp3', ['-c:a', 'libmp3lame', '-b:a', '64k', '-f', 'mp3']),
+}
+AUDIO_TIMEOUT = 60
+
+IMAGE_WIDTHS = (320, 640, 960)
+IMAGE_QUALITY = 80
+IMAGE_TIMEOUT = 10
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+MAX_IMAGE_REDIRECTS = 5
+
+
+class MediaError(Exception):
+    """Un medio no se pudo descargar o convertir."""
+
+
+def media_url(name):
+    """URL pública de un fichero de MEDIA_ROOT (a través del CDN si lo hay)."""
+    base = getattr(settings, 'MEDIA_CDN_URL', '') or settings.MEDIA_URL
+    return f"{base.rstrip('/')}/{name}"
+
+
+def hashed_name(kind, data, ext, suffix=''):
+    digest = hashlib.sha256(data).hexdigest()[:20]
+    return f'{IMMUTABLE_PREFIX}{kind}/{digest}{suffix}.{ext}'
+
+
+def store(name, data):
+    """Guarda ``data`` con nombre ya único por contenido (si no existe)."""
+    if not default_storage.exists(name):
+        saved = default_storage.save(name, ContentFile(data))
+        if saved != name:  # pragma: no cover - otro proceso lo escribió a la vez
+            default_storage.delete(saved)
+    return name
+
+
+def is_processed(name):
+    return bool(name) and name.startswith(IMMUTABLE_PREFIX)
+
+
+# Audio
+
+def ffmpeg_binary():
+    return shutil.which(getattr(settings, 'FFMPEG_BINARY', 'ffmpeg'))
+
+
+def transcode_audio(data, fmt=None):
+    """Bytes del audio normalizado (mono, 48 kHz, bitrate bajo)."""
+    binary = ffmpeg_binary()
+    if binary is None:
+        raise MediaError('ffmpeg no está instalado')
+    fmt = fmt or getattr(settings, 'MEDIA_AUDIO_FORMAT', 'opus')
+    ext, codec = AUDIO_FORMATS[fmt]
+    command = [binary, '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0',
+               '-vn', '-ac', '1', '-ar', '48000', *codec, 'pipe:1']
+    try:
+        result = subprocess.run(command, input=data, capture_output=True, timeout=AUDIO_TIMEOUT)
+    except subprocess.TimeoutExpired as exc:
+        raise MediaError('ffmpeg tardó demasiado') from exc
+    if result.returncode != 0 or not result.stdout:
+        raise MediaError(result.stderr.decode(errors='replace').strip() or 'ffmpeg falló')
+    return result.stdout, ext
+
+
+def process_audio(card, field):
+    """Normaliza un audio de la tarjeta. Devuelve True si cambió el campo."""
+    audio = getattr(card, field)
+    if not audio or is_processed(audio.name):
+        return False
+    with audio.open('rb') as source:
+        data = source.read()
+    encoded, ext = transcode_audio(data)
+    old_name = audio.name
+    setattr(card, field, store(hashed_name('audio', encoded, ext), encoded))
+    if old_name != getattr(card, field).name:
+        default_storage.delete(old_name)
+    return True
+
+
+# Imágenes
+
+def check_public_url(url):
+    """
+    ``MediaError`` si ``url`` no es http(s) o su host resuelve a una
+    dirección privada, de loopback, link-local o reservada: aunque
+    ``image_url`` solo la edite el admin, el servidor no debe servir para
+    llegar a su red interna (ni a los metadatos de la nube, 169.254.x.x).
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise MediaError(f'solo se descargan imágenes http(s): {url}')
+    try:
+        infos = socket.getaddrinfo(parts.hostname, None, proto=socket.IPPROTO_TCP)
+    except (OSError, ValueError) as exc:
+        raise MediaError(f'no se pudo resolver {parts.hostname}: {exc}') from exc
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split('%')[0])
+        if not address.is_global or address.is_multicast:
+            raise MediaError(f'dirección no pública ({address}): {url}')
+
+
+def fetch_image(url):
+    """
+    Descarga la imagen, como mucho ``MAX_IMAGE_BYTES``. Las redirecciones
+    se siguen a mano para comprobar también cada destino.
+    """
+    try:
+        for _ in range(MAX_IMAGE_REDIRECTS + 1):
+            check_public_url(url)
+            response = requests.get(url, timeout=IMAGE_TIMEOUT, stream=True, allow_redirects=False)
+            if not response.is_redirect:
+                break
+            url = urljoin(url, response.headers['Location'])
+            response.close()
+        else:
+            raise MediaError(f'demasiadas redirecciones: {url}')
+        response.raise_for_status()
+        data = bytearray()
+        for chunk in response.iter_content(64 * 1024):
+            data += chunk
+            if len(data) > MAX_IMAGE_BYTES:
+                raise MediaError(f'imagen de más de {MAX_IMAGE_BYTES} bytes: {url}')
+        return bytes(data)
+    except requests.RequestException as exc:
+        raise MediaError(f'no se pudo descargar {url}: {exc}') from exc
+
+
+def image_variants(data):
+    """
+    Variantes WebP de la imagen: ``[[ancho, nombre], ...]`` de menor a
+    mayor. Nunca se amplía: si la original es más estrecha que un ancho,
+    ese ancho se sustituye por el de la original.
+    """
+    if Image is None:
+        raise MediaError('Pillow no está instalado')
+    try:
+        image = Image.open(io.BytesIO(data))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except Exception as exc:
+        raise MediaError(f'imagen no válida: {exc}') from exc
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    variants = []
+    for width in sorted({min(width, image.width) for width in IMAGE_WIDTHS}):
+        resized = image if width == image.width else image.resize(
+            (width, max(1, round(image.height * width / image.width))), Image.LANCZOS,
+        )
+        out = io.BytesIO()
+        resized.save(out, 'WEBP', quality=IMAGE_QUALITY, method=4)
+        encoded = out.getvalue()
+        variants.append([width, store(hashed_name('img', encoded, 'webp', f'-{width}'), encoded)])
+    return variants
+
+
+def process_image(card, data=None):
+    """Genera las variantes de ``image_url``. Devuelve True si cambiaron."""
+    source = card.image_url or ''
+    current = card.image_variants or {}
+    if current.get('source', '') == source:
+        return False
+    if not source:
+        card.image_variants = {}
+        return True
+    variants = image_variants(data if data is not None else fetch_image(source))
+    card.image_variants = {'source': source, 'sizes': variants}
+    return True
+
+
+# Tarjetas
+
+def process_card(card, fields=None):
+    """
+    Procesa los medios pendientes de la tarjeta y la guarda si algo cambió.
+    ``fields`` limita a algunos campos (``AUDIO_FIELDS`` e ``image_url``).
+    Devuelve los campos actualizados; los errores se registran y ese medio
+    queda como estaba.
+    """
+    fields = fields or (*AUDIO_FIELDS, 'image_url')
+    updated = []
+    for field in fields:
+        try:
+            if field in AUDIO_FIELDS and process_audio(card, field):
+                updated.append(field)
+            elif field == 'image_url' and process_image(card):
+                updated.append('image_variants')
+        except MediaError as exc:
+            logger.warning('Tarjeta %s, %s: %s', card.pk, field, exc)
+    if updated:
+        card.save(update_fields=[*updated, 'updated_at'])
+    return updated
+
+
+def process_card_id(card_id):
+    """Para el pool de procesos de ``process_media``."""
+    from .models import Flashcard
+
+    card = Flashcard.objects.filter(pk=card_id).first()
+    return card_id, process_card(card) if card is not None else []
+
+
+def pending_cards(queryset):
+    """Tarjetas con algún medio sin procesar."""
+    pending = Q(image_url__gt='') & ~Q(image_variants__source=F('image_url'))
+    for field in AUDIO_FIELDS:
+        pending |= Q(**{f'{field}__gt': ''}) & ~Q(**{f'{field}__startswith': IMMUTABLE_PREFIX})
+    return queryset.filter(pending)
+
+
+# Servir
+
+@require_safe
+def serve_immutable(request, path):
+    """
+    Sirve un fichero de ``MEDIA_ROOT/v/``. El nombre lleva el hash del
+    contenido, así que puede cachearse un año sin revalidar. En producción
+    lo normal es que lo sirva el servidor web o un CDN con la misma cabecera.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, IMMUTABLE_PREFIX, path)
+        handle = open(full_path, 'rb')
+    except (OSError, ValueError) as exc:
+        raise Http404('Fichero no encontrado') from exc
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    response = FileResponse(handle, content_type=content_type)
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
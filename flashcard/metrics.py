@@ -0,0 +1,374 @@
+# flashcard/metrics.py
+
+"""
+Métricas por vista: consultas SQL, tiempo en la base, tiempo de plantillas
+y latencia total.
+
+``MetricsMiddleware`` mide cada petición y la apunta en el histograma de su
+vista (``resolver_match.view_name``). Cada histograma tiene cubetas
+acumuladas desde que arrancó el proceso (para Prometheus) y una ventana de
+las últimas ``METRICS_WINDOW`` muestras para los percentiles del panel.
+Los datos son del proceso que responde: con varios workers, Prometheus
+scrapea cada uno y suma.
+
+- ``/admin/metricas/``: panel para staff.
+- ``/metrics``: formato de texto de Prometheus (staff o
+  ``Authorization: Bearer <METRICS_TOKEN>``).
+
+Con ``METRICS_PROFILE_RATE`` > 0 esa fracción de peticiones se ejecuta bajo
+cProfile; si tarda más de ``METRICS_SLOW_MS`` el volcado se guarda en
+``METRICS_PROFILE_DIR`` y se enlaza desde el panel.
+"""
+
+import bisect
+import contextvars
+import cProfile
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# serie: (cubetas, ayuda)
+SERIES = {
+    'request_seconds': (SECONDS_BUCKETS, 'Latencia total de la petición'),
+    'db_seconds': (SECONDS_BUCKETS, 'Tiempo en consultas SQL'),
+    'template_seconds': (SECONDS_BUCKETS, 'Tiempo renderizando plantillas'),
+    'db_queries': (QUERY_BUCKETS, 'Consultas SQL por petición'),
+}
+PROMETHEUS_PREFIX = 'quibly_'
+UNRESOLVED = '<sin vista>'
+PROFILE_NAME = re.compile(r'^[\w.-]+\.prof$')
+MAX_PROFILES = 50
+
+
+class Histogram:
+    """Cubetas acumuladas (tipo Prometheus) más una ventana de muestras recientes."""
+
+    def __init__(self, buckets, window):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # la última es +Inf
+        self.total = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def percentile(self, p):
+        """Percentil ``p`` (0-100) de la ventana reciente; None si está vacía."""
+        values = sorted(self.recent)
+        if not values:
+            return None
+        return values[min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1)]
+
+    def mean(self):
+        return self.sum / self.total if self.total else 0.0
+
+    def cumulative(self):
+        """[(límite, acumulado), ...] terminando en ('+Inf', total)."""
+        running, rows = 0, []
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            running += count
+            rows.append((bound, running))
+        return rows
+
+
+class Registry:
+    """Histogramas por vista, compartidos por todas las hebras del proceso."""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.views = {}
+        self.lock = threading.Lock()
+
+    def record(self, view, sample):
+        with self.lock:
+            series = self.views.get(view)
+            if series is None:
+                series = self.views[view] = {
+                    name: Histogram(buckets, self.window) for name, (buckets, _) in SERIES.items()
+                }
+            series['request_seconds'].observe(sample.total)
+            series['db_seconds'].observe(sample.db_time)
+            series['template_seconds'].observe(sample.template_time)
+            series['db_queries'].observe(sample.queries)
+
+    def summary(self):
+        """Filas para el panel, de la vista que más tiempo total consume a la que menos."""
+        with self.lock:
+            rows = []
+            for view, series in self.views.items():
+                latency = series['request_seconds']
+                rows.append({
+                    'view': view,
+                    'requests': latency.total,
+                    'total_seconds': latency.sum,
+                    'p50_ms': _ms(latency.percentile(50)),
+                    'p95_ms': _ms(latency.percentile(95)),
+                    'p99_ms': _ms(latency.percentile(99)),
+                    'queries_mean': series['db_queries'].mean(),
+                    'queries_max': max(series['db_queries'].recent, default=0),
+                    'db_ms_mean': series['db_seconds'].mean() * 1000,
+                    'template_ms_mean': series['template_seconds'].mean() * 1000,
+                })
+        return sorted(rows, key=lambda row: row['total_seconds'], reverse=True)
+
+    def prometheus(self):
+        """Todas las series en el formato de texto de Prometheus."""
+        lines = []
+        with self.lock:
+            for name, (_, help_text) in SERIES.items():
+                metric = f'{PROMETHEUS_PREFIX}{name}'
+                lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} histogram']
+                for view, series in sorted(self.views.items()):
+                    histogram = series[name]
+                    label = f'view="{_escape(view)}"'
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {count}')
+                    lines.append(f'{metric}_sum{{{label}}} {histogram.sum:.6f}')
+                    lines.append(f'{metric}_count{{{label}}} {histogram.total}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+
+def _ms(seconds):
+    return None if seconds is None else seconds * 1000
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry(getattr(settings, 'METRICS_WINDOW', 1000))
+
+
+# Medición de una petición
+
+@dataclass
+class Sample:
+    queries: int = 0
+    db_time: float = 0.0
+    template_time: float = 0.0
+    total: float = 0.0
+    # render_to_string dentro de otra plantilla no se cuenta dos veces
+    rendering: bool = False
+
+
+_current = contextvars.ContextVar('flashcard_metrics_sample', default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    # la muestra viaja en el contexto: también llega a las hebras de sync_to_async
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.db_time += time.perf_counter() - started
+
+
+def _install_query_counter(sender, connection, **kwargs):
+    # al principio: execute_wrapper() quita siempre el último de la lista
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _count_query)
+
+
+def instrument_queries():
+    """
+    Cuenta y cronometra las consultas de cada conexión que se abra (con
+    ASGI las consultas corren en otras hebras, así que no basta con envolver
+    las conexiones de la hebra de la petición). Se llama desde
+    ``FlashcardConfig.ready``.
+    """
+    connection_created.connect(_install_query_counter, dispatch_uid='flashcard_metrics_queries')
+    for connection in connections.all(initialized_only=True):
+        _install_query_counter(None, connection)
+
+
+def instrument_templates():
+    """
+    Cronometra ``Template.render`` del backend de Django (el de
+    ``render()`` y de ``TemplateResponse``; los ``{% include %}`` van
+    dentro). Se llama una vez desde ``FlashcardConfig.ready``.
+    """
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'metrics_instrumented', False):
+        return
+    original = Template.render
+
+    def render(self, *args, **kwargs):
+        sample = _current.get()
+        if sample is None or sample.rendering:
+            return original(self, *args, **kwargs)
+        sample.rendering = True
+        started = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            sample.template_time += time.perf_counter() - started
+            sample.rendering = False
+
+    render.metrics_instrumented = True
+    Template.render = render
+
+
+def profile_dir():
+    return Path(getattr(settings, 'METRICS_PROFILE_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def save_profile(profiler, view, sample):
+    """Guarda el volcado de cProfile y borra los más antiguos. Devuelve el nombre."""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    slug = re.sub(r'[^\w.-]+', '_', view)[:60]
+    name = f'{time.strftime("%Y%m%d-%H%M%S")}-{slug}-{round(sample.total * 1000)}ms.prof'
+    profiler.dump_stats(directory / name)
+    for old in list_profiles()[MAX_PROFILES:]:
+        (directory / old['name']).unlink(missing_ok=True)
+    return name
+
+
+def list_profiles():
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    files = sorted(directory.glob('*.prof'), key=lambda path: path.stat().st_mtime, reverse=True)
+    return [{'name': path.name, 'size': path.stat().st_size} for path in files]
+
+
+class MetricsMiddleware:
+    """
+    Mide cada petición y la apunta en ``registry`` (ver el docstring del
+    módulo). Funciona con WSGI y con ASGI; con ASGI no se perfila (cProfile
+    mide la hebra del bucle, que comparten todas las peticiones a la vez).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'METRICS_ENABLED', True)
+        self.profile_rate = getattr(settings, 'METRICS_PROFILE_RATE', 0.0)
+        self.slow_seconds = getattr(settings, 'METRICS_SLOW_MS', 500) / 1000
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        sample = Sample()
+        token = _current.set(sample)
+        profiler = None
+        if self.profile_rate and random.random() < self.profile_rate:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:  # pragma: no cover - ya hay otro perfilador activo
+                profiler = None
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            sample.total = time.perf_counter() - started
+            _current.reset(token)
+        return self.record(request, response, sample, profiler)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        sample = Sample()
+        token = _current.set(sample)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            sample.total = time.perf_counter() - started
+            _current.reset(token)
+        return self.record(request, response, sample)
+
+    def record(self, request, response, sample, profiler=None):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match._func_path) if match else UNRESOLVED
+        registry.record(view, sample)
+        if profiler is not None and sample.total >= self.slow_seconds:
+            response['X-Profile'] = save_profile(profiler, view, sample)
+        return response
+
+
+# Vistas
+
+def _authorized(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    header = request.headers.get('Authorization', '')
+    if token and constant_time_compare(header, f'Bearer {token}'):
+        return True
+    return request.user.is_active and request.user.is_staff
+
+
+@require_GET
+def prometheus(request):
+    if not _authorized(request):
+        return HttpResponse('No autorizado', status=401, content_type='text/plain')
+    return HttpResponse(registry.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@require_GET
+@staff_member_required
+def dashboard(request):
+    from django.contrib import admin
+
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Métricas por vista',
+        'rows': registry.summary(),
+        'profiles': list_profiles()[:20],
+        'profile_rate': getattr(settings, 'METRICS_PROFILE_RATE', 0.0),
+        'slow_ms': getattr(settings, 'METRICS_SLOW_MS', 500),
+        'pid': os.getpid(),
+    }
+    return render(request, 'flashcard/metrics.html', context)
+
+
+@require_GET
+@staff_member_required
+def download_profile(request, name):
+    """Descarga un volcado (se abre con ``python -m pstats`` o snakeviz)."""
+    path = profile_dir() / name
+    if not PROFILE_NAME.match(name) or not path.is_file():
+        raise Http404('Volcado no encontrado')
+    return FileResponse(path.open('rb'), as_attachment=True, filename=name)
@@ -0,0 +1,71 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def number_existing_links(apps, schema_editor):
+    """Numera los enlaces existentes con el orden que se usaba hasta ahora."""
+    ChapterCard = apps.get_model('flashcard', 'ChapterCard')
+    links = (
+        ChapterCard.objects
+        .order_by('chapter_id', 'flashcard__category', 'flashcard__word_english', 'flashcard_id')
+        .only('id', 'chapter_id', 'position')
+    )
+    changed = []
+    current_chapter, position = None, 0
+    for link in links.iterator(chunk_size=2000):
+        if link.chapter_id != current_chapter:
+            current_chapter, position = link.chapter_id, 0
+        link.position = position
+        changed.append(link)
+        position += 1
+        if len(changed) >= 2000:
+            ChapterCard.objects.bulk_update(changed, ['position'])
+            changed = []
+    ChapterCard.objects.bulk_update(changed, ['position'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flashcard', '0001_initial'),
+    ]
+
+    operations = [
+        # La tabla flashcard_chapter_cards ya existe: solo se declara el modelo
+        # intermedio en el estado de migraciones, sin tocar la base de datos.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ChapterCard',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('chapter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='card_links', to='flashcard.chapter')),
+                        ('flashcard', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chapter_links', to='flashcard.flashcard')),
+                    ],
+                    options={
+                        'db_table': 'flashcard_chapter_cards',
+                        'unique_together': {('chapter', 'flashcard')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='chapter',
+                    name='cards',
+                    field=models.ManyToManyField(blank=True, related_name='chapters', through='flashcard.ChapterCard', to='flashcard.flashcard'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='chaptercard',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterModelOptions(
+            name='chaptercard',
+            options={'ordering': ['chapter', 'position'], 'verbose_name': 'Tarjeta del capítulo', 'verbose_name_plural': 'Tarjetas del capítulo'},
+        ),
+        migrations.RunPython(number_existing_links, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='chaptercard',
+            index=models.Index(fields=['chapter', 'position'], name='chaptercard_chapter_pos_idx'),
+        ),
+    ]
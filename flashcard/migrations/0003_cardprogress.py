@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-17 13:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flashcard', '0002_chaptercard_position'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CardProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('review', 'Review'), ('learned', 'Learned')], default='review', max_length=10)),
+                ('viewed', models.BooleanField(default=True)),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now)),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='flashcard.flashcard')),
+                ('chapter', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='flashcard.chapter')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='card_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Progreso',
+                'verbose_name_plural': 'Progresos',
+                'constraints': [models.UniqueConstraint(fields=('user', 'card'), name='cardprogress_user_card_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-17 13:11
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flashcard', '0003_cardprogress'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cardprogress',
+            name='due_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='cardprogress',
+            name='ease',
+            field=models.FloatField(default=2.5),
+        ),
+        migrations.AddField(
+            model_name='cardprogress',
+            name='interval',
+            field=models.PositiveIntegerField(default=0, help_text='Días hasta el siguiente repaso'),
+        ),
+        migrations.AddField(
+            model_name='cardprogress',
+            name='repetitions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='cardprogress',
+            index=models.Index(fields=['user', 'due_at'], name='cardprogress_user_due_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flashcard', '0005_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cardprogress',
+            name='seconds_spent',
+            field=models.PositiveIntegerField(default=0, help_text='Tiempo total de estudio de la tarjeta'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import F, Func, TextField, Value
+
+# Copia fija de la definición de flashcard/search.py en el momento de esta
+# migración: si search.py cambia, la migración debe seguir creando esto.
+SEARCH_TABLE = 'flashcard_search'
+COLUMNS = ('word_english', 'word_spanish', 'mean_english', 'mean_espanish', 'content')
+PG_INDEX_NAME = 'flashcard_search_gin'
+ACCENTED = 'áàäâãéèëêíìïîóòöôõúùüûñçÁÀÄÂÃÉÈËÊÍÌÏÎÓÒÖÔÕÚÙÜÛÑÇ'
+PLAIN = 'aaaaaeeeeiiiiooooouuuuncAAAAAEEEEIIIIOOOOOUUUUNC'
+
+
+def fts5_supported(conn):
+    with conn.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def search_document():
+    def fold(name):
+        return Func(F(name), Value(ACCENTED), Value(PLAIN), function='translate', output_field=TextField())
+
+    return (
+        SearchVector(fold('word_english'), fold('word_spanish'), config='simple', weight='A')
+        + SearchVector(fold('mean_english'), fold('mean_espanish'), config='simple', weight='B')
+        + SearchVector(fold('content'), config='simple', weight='C')
+    )
+
+
+def create_search_index(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor == 'sqlite' and fts5_supported(conn):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            f"{', '.join(COLUMNS)}, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, {', '.join(COLUMNS)}) "
+            f"SELECT id, {', '.join(COLUMNS)} FROM flashcard_flashcard"
+        )
+    elif conn.vendor == 'postgresql':
+        Flashcard = apps.get_model('flashcard', 'Flashcard')
+        schema_editor.add_index(Flashcard, GinIndex(search_document(), name=PG_INDEX_NAME))
+
+
+def drop_search_index(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+    elif conn.vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {PG_INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+    """
+    Índice de búsqueda según el motor: tabla FTS5 en SQLite, índice GIN por
+    expresión en PostgreSQL (ver flashcard/search.py). Fuera del estado de
+    los modelos: no hay nada que cambiar en Flashcard.
+    """
+
+    dependencies = [
+        ('flashcard', '0006_cardprogress_seconds_spent'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
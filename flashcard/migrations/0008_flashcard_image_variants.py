@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 13:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flashcard', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcard',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-17 14:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flashcard', '0009_studycursor'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='chaptercard',
+            name='chaptercard_chapter_pos_idx',
+        ),
+        migrations.AddIndex(
+            model_name='chapter',
+            index=models.Index(fields=['title', 'id'], name='chapter_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chaptercard',
+            index=models.Index(fields=['chapter', 'position', 'flashcard'], name='chaptercard_pos_card_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flashcard',
+            index=models.Index(fields=['category', 'word_english'], name='flashcard_cat_word_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flashcard',
+            index=models.Index(fields=['mark_as', 'viewed', 'category', 'word_english'], name='flashcard_state_idx'),
+        ),
+    ]
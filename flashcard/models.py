@@ -1,7 +1,12 @@
-from django.db import models
+from django.conf import settings
+from django.db import connections, models
+from django.db.models import Max
+from django.utils import timezone
 from django.utils.text import slugify
 from django.urls import reverse
 
+from .media import media_url
+
 
 
 class Chapter(models.Model):
@@ -9,12 +14,21 @@ class Chapter(models.Model):
     description = models.TextField(blank=True)
     slug        = models.SlugField(unique=True, blank=True)
     # Permite elegir libremente un conjunto de flashcards en cada capítulo
-    cards       = models.ManyToManyField('Flashcard', related_name='chapters', blank=True)
+    # El orden de estudio se guarda en la tabla intermedia (ChapterCard.position)
+    cards       = models.ManyToManyField(
+        'Flashcard', related_name='chapters', blank=True, through='ChapterCard',
+    )
+    # cambia al editar el capítulo o su lista de tarjetas (versión del mazo)
+    updated_at  = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['title']
         verbose_name = 'Capítulo'
         verbose_name_plural = 'Capítulos'
+        indexes = [
+            # lista paginada: ORDER BY title, id LIMIT 20 sin ordenar todos
+            models.Index(fields=['title', 'id'], name='chapter_title_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -28,6 +42,97 @@ class Chapter(models.Model):
     def __str__(self):
         return self.title
 
+    def card_ids(self):
+        """Lista ordenada de ids de flashcards del capítulo (orden de estudio)."""
+        return list(
+            self.card_links.order_by('position').values_list('flashcard_id', flat=True)
+        )
+
+    def append_cards(self, card_ids):
+        """
+        Coloca al final del capítulo las tarjetas recién enlazadas, en el orden
+        por defecto de Flashcard (categoría, palabra en inglés).
+        """
+        links = self.card_links.all()
+        last = links.exclude(flashcard_id__in=card_ids).aggregate(last=Max('position'))['last']
+        new_links = list(
+            links.filter(flashcard_id__in=card_ids)
+            .order_by('flashcard__category', 'flashcard__word_english', 'flashcard_id')
+        )
+        start = -1 if last is None else last
+        for offset, link in enumerate(new_links, start=1):
+            link.position = start + offset
+        ChapterCard.objects.bulk_update(new_links, ['position'])
+
+    def add_matching_cards(self, queryset):
+        """
+        Añade al final del capítulo las flashcards de ``queryset`` que aún no
+        tiene, en el orden de ``append_cards``, con un solo INSERT ... SELECT
+        (sin traer las tarjetas a Python). Devuelve cuántas se añadieron.
+
+        No pasa por ``cards.add()``: no hay señal m2m_changed, así que el que
+        llama se encarga de ``touch()`` e ``invalidate_chapter``.
+        """
+        links = ChapterCard._meta
+        cards = Flashcard._meta
+        connection = connections[queryset.db]
+        qn = connection.ops.quote_name
+        table, card_table = qn(links.db_table), qn(cards.db_table)
+        subquery, params = queryset.order_by().values('pk').query.get_compiler(queryset.db).as_sql()
+        sql = (
+            f"INSERT INTO {table} (chapter_id, flashcard_id, position) "
+            f"SELECT %s, f.id, "
+            f"(SELECT COALESCE(MAX(position), -1) FROM {table} WHERE chapter_id = %s) "
+            f"+ ROW_NUMBER() OVER (ORDER BY f.category, f.word_english, f.id) "
+            f"FROM {card_table} f "
+            f"WHERE f.id IN ({subquery}) "
+            f"AND NOT EXISTS (SELECT 1 FROM {table} l WHERE l.chapter_id = %s AND l.flashcard_id = f.id)"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [self.pk, self.pk, *params, self.pk])
+            return cursor.rowcount
+
+    def touch(self):
+        """Marca el mazo como modificado sin pasar por save()."""
+        Chapter.objects.filter(pk=self.pk).update(updated_at=timezone.now())
+
+    def renumber_cards(self):
+        """Compacta las posiciones a 0..N-1 conservando el orden actual."""
+        links = list(self.card_links.order_by('position', 'id').only('id', 'position'))
+        changed = []
+        for position, link in enumerate(links):
+            if link.position != position:
+                link.position = position
+                changed.append(link)
+        ChapterCard.objects.bulk_update(changed, ['position'], batch_size=500)
+
+
+class ChapterCard(models.Model):
+    """
+    Tabla intermedia Chapter <-> Flashcard con la posición de cada tarjeta.
+
+    Las posiciones de un capítulo son contiguas (0..N-1), de modo que cada paso
+    de estudio busca una sola tarjeta por (capítulo, posición).
+    """
+    chapter   = models.ForeignKey(Chapter, on_delete=models.CASCADE, related_name='card_links')
+    flashcard = models.ForeignKey('Flashcard', on_delete=models.CASCADE, related_name='chapter_links')
+    position  = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'flashcard_chapter_cards'
+        unique_together = [('chapter', 'flashcard')]
+        indexes = [
+            # cubre (capítulo, posición) -> tarjeta: la lista de estudio y la
+            # tarjeta de cada paso salen del índice sin leer la tabla
+            models.Index(fields=['chapter', 'position', 'flashcard'], name='chaptercard_pos_card_idx'),
+        ]
+        ordering = ['chapter', 'position']
+        verbose_name = 'Tarjeta del capítulo'
+        verbose_name_plural = 'Tarjetas del capítulo'
+
+    def __str__(self):
+        return f"{self.chapter} #{self.position}: {self.flashcard}"
+
 
 
 
@@ -55,6 +160,9 @@ class Flashcard(models.Model):
     mean_english = models.TextField(blank=True)
     mean_espanish = models.TextField(blank=True)
     image_url = models.URLField(max_length=500, blank=True, null=True)
+    # variantes locales de image_url (ver flashcard/media.py):
+    # {"source": image_url, "sizes": [[ancho, nombre], ...]}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     word_english = models.CharField(max_length=200)
     word_spanish = models.CharField(max_length=200)
     ipa_english = models.CharField('Pronunciation IPA (EN)', max_length=200, blank=True)
@@ -69,11 +177,18 @@ class Flashcard(models.Model):
         default='review',
     )
     slug = models.SlugField(unique=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = 'Flashcard'
         verbose_name_plural = 'Flashcards'
         ordering = ['category', 'word_english']
+        indexes = [
+            # orden por defecto (listas del admin, append_cards)
+            models.Index(fields=['category', 'word_english'], name='flashcard_cat_word_idx'),
+            # filtros del admin por estado, ya en el orden por defecto
+            models.Index(fields=['mark_as', 'viewed', 'category', 'word_english'], name='flashcard_state_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # Generar slug a partir de categoría y palabra en inglés
@@ -85,4 +200,153 @@ class Flashcard(models.Model):
     def __str__(self):
         return f"[{self.get_category_display()}] {self.word_english} - {self.word_spanish}"
 
+    def local_image_sizes(self):
+        variants = self.image_variants or {}
+        if self.image_url and variants.get('source') == self.image_url:
+            return variants.get('sizes') or []
+        return []
+
+    @property
+    def image_src(self):
+        """Imagen a mostrar: la variante local más grande o, si aún no hay, la externa."""
+        sizes = self.local_image_sizes()
+        return media_url(sizes[-1][1]) if sizes else (self.image_url or '')
+
+    @property
+    def image_srcset(self):
+        return ', '.join(f'{media_url(name)} {width}w' for width, name in self.local_image_sizes())
+
+
+
+
+class CardProgress(models.Model):
+    """
+    Progreso de un usuario sobre una flashcard.
+
+    Sustituye a las banderas globales ``Flashcard.viewed``/``mark_as`` en el
+    flujo de estudio: cada usuario escribe solo sus propias filas, con un
+    upsert estrecho por (user, card).
+    """
+    user      = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='card_progress')
+    card      = models.ForeignKey(Flashcard, on_delete=models.CASCADE, related_name='progress')
+    # capítulo en el que se respondió la tarjeta por última vez
+    chapter   = models.ForeignKey(Chapter, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status    = models.CharField(max_length=10, choices=Flashcard.MARCAR_CHOICES, default='review')
+    viewed    = models.BooleanField(default=True)
+    last_seen = models.DateTimeField(default=timezone.now)
+    seconds_spent = models.PositiveIntegerField(default=0, help_text='Tiempo total de estudio de la tarjeta')
+    # repetición espaciada (SM-2), ver flashcard/scheduler.py
+    ease        = models.FloatField(default=2.5)
+    interval    = models.PositiveIntegerField(default=0, help_text='Días hasta el siguiente repaso')
+    repetitions = models.PositiveIntegerField(default=0)
+    due_at      = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Progreso'
+        verbose_name_plural = 'Progresos'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'card'], name='cardprogress_user_card_uniq'),
+        ]
+        indexes = [
+            # cola de repaso: WHERE user = ? AND due_at <= now ORDER BY due_at
+            models.Index(fields=['user', 'due_at'], name='cardprogress_user_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} · {self.card.word_english}: {self.status}"
+
+
+class StudyCursor(models.Model):
+    """
+    Posición de estudio de un usuario en un capítulo.
+
+    Una fila por (user, chapter): se pueden llevar varios capítulos a la vez
+    y cada paso de estudio es un UPDATE de una sola fila (ver
+    ``progress.save_position``), en lugar de reescribir la sesión entera.
+    """
+    user     = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='study_cursors')
+    chapter  = models.ForeignKey(Chapter, on_delete=models.CASCADE, related_name='+')
+    # siguiente tarjeta a mostrar (0..N; N = capítulo terminado)
+    position = models.PositiveIntegerField(default=0)
+    # Chapter.updated_at cuando se guardó la posición: si el mazo cambió
+    # después, la posición puede quedar fuera de rango y se ajusta al leerla
+    deck_version = models.DateTimeField(null=True, blank=True)
+    updated_at   = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Posición de estudio'
+        verbose_name_plural = 'Posiciones de estudio'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'chapter'], name='studycursor_user_chapter_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} · {self.chapter}: {self.position}"
+
+
+class BulkJob(models.Model):
+    """
+    Acción masiva del admin sobre muchas flashcards, hecha por bloques en
+    segundo plano (ver flashcard/bulk.py).
+
+    Las tarjetas que faltan están en BulkJobItem: cada bloque terminado se
+    borra de allí y suma a ``done``, así que un worker que se cae deja el
+    trabajo a medias y otro lo retoma donde iba.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pendiente'),
+        (RUNNING, 'En curso'),
+        (DONE, 'Terminado'),
+        (FAILED, 'Fallido'),
+    ]
+    ACTION_CHOICES = [
+        ('set_category', 'Cambiar categoría'),
+        ('mark', 'Marcar'),
+        ('reset_viewed', 'Marcar como no vistas'),
+        ('regenerate_slugs', 'Regenerar slugs'),
+    ]
+
+    action      = models.CharField(max_length=30, choices=ACTION_CHOICES)
+    # argumentos de la acción (categoría, marca...)
+    params      = models.JSONField(default=dict, blank=True)
+    status      = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    total       = models.PositiveIntegerField(default=0)
+    done        = models.PositiveIntegerField(default=0)
+    error       = models.TextField(blank=True)
+    created_by  = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+    )
+    created_at  = models.DateTimeField(default=timezone.now)
+    # cambia con cada bloque: un trabajo "en curso" que no avanza se da por abandonado
+    updated_at  = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Acción masiva'
+        verbose_name_plural = 'Acciones masivas'
+        ordering = ['-created_at']
 
+    def __str__(self):
+        params = ', '.join(str(value) for value in self.params.values())
+        return f"{self.get_action_display()}{f' ({params})' if params else ''}: {self.done}/{self.total}"
+
+    @property
+    def percent(self):
+        return min(round(self.done * 100 / self.total), 100) if self.total else 100
+
+
+class BulkJobItem(models.Model):
+    """Flashcard pendiente de un BulkJob (se borra al procesar su bloque)."""
+    job     = models.ForeignKey(BulkJob, on_delete=models.CASCADE, related_name='items', db_index=False)
+    # sin clave foránea: si la tarjeta se borra antes, su bloque no la encuentra y ya está
+    card_id = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            # los bloques salen en orden de este índice
+            models.UniqueConstraint(fields=['job', 'card_id'], name='bulkjobitem_job_card_uniq'),
+        ]
@@ -0,0 +1,244 @@
+# flashcard/progress.py
+
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import (
+    ainvalidate_progress, aremember_cursor, astudy_cursor, invalidate_progress, remember_cursor, study_cursor,
+)
+from .models import CardProgress, StudyCursor
+from .scheduler import schedule
+
+
+SCHEDULE_FIELDS = ('ease', 'interval', 'repetitions', 'due_at')
+# campos que se conservan de la fila anterior al hacer el upsert
+CARRIED_FIELDS = (*SCHEDULE_FIELDS, 'seconds_spent')
+# upsert por (user, card) de record_answers
+UPSERT = {
+    'update_conflicts': True,
+    'unique_fields': ['user', 'card'],
+    'update_fields': ['chapter', 'status', 'viewed', 'last_seen', *CARRIED_FIELDS],
+}
+
+# tope de tiempo por respuesta: una pestaña olvidada no infla las estadísticas
+MAX_SECONDS_PER_ANSWER = 600
+
+
+def record_answers(user_id, answers):
+    """
+    Upsert en bloque de respuestas ``(card_id, chapter_id, status, seen_at)``,
+    con un quinto elemento opcional: segundos dedicados a la tarjeta.
+
+    Lee en una sola consulta el estado SM-2 previo de las tarjetas, aplica
+    las respuestas en orden y escribe todo con un único INSERT ... ON CONFLICT.
+    Si una tarjeta aparece varias veces se guarda una sola fila: un mismo
+    INSERT ... ON CONFLICT no puede actualizar dos veces la misma fila.
+    """
+    answers = list(answers)
+    existing = {row['card_id']: row for row in _previous_progress(user_id, answers)}
+    latest = _apply_answers(user_id, answers, existing)
+    CardProgress.objects.bulk_create(list(latest.values()), **UPSERT)
+    # las estadísticas cacheadas del usuario dejan de valer
+    invalidate_progress(user_id)
+    return len(latest)
+
+
+async def arecord_answers(user_id, answers):
+    """``record_answers`` con el ORM asíncrono."""
+    answers = list(answers)
+    existing = {row['card_id']: row async for row in _previous_progress(user_id, answers)}
+    latest = _apply_answers(user_id, answers, existing)
+    await CardProgress.objects.abulk_create(list(latest.values()), **UPSERT)
+    await ainvalidate_progress(user_id)
+    return len(latest)
+
+
+def _previous_progress(user_id, answers):
+    return CardProgress.objects.filter(
+        user_id=user_id, card_id__in={answer[0] for answer in answers},
+    ).values('card_id', *CARRIED_FIELDS)
+
+
+def _apply_answers(user_id, answers, existing):
+    """Aplica las respuestas en orden sobre el estado previo: {card_id: CardProgress}."""
+    latest = {}
+    for card_id, chapter_id, status, seen_at, *extra in answers:
+        if isinstance(seen_at, str):
+            seen_at = datetime.fromisoformat(seen_at)
+        progress = latest.get(card_id)
+        if progress is None:
+            # objetos sin pk: el conflicto se resuelve solo por (user, card)
+            progress = CardProgress(user_id=user_id, card_id=card_id)
+            for field, value in existing.get(card_id, {}).items():
+                if field in CARRIED_FIELDS:
+                    setattr(progress, field, value)
+        progress.chapter_id = chapter_id
+        progress.status = status
+        progress.viewed = True
+        progress.last_seen = seen_at
+        progress.seconds_spent += clamp_seconds(extra[0] if extra else 0)
+        latest[card_id] = schedule(progress, status, now=seen_at)
+    return latest
+
+
+def clamp_seconds(seconds):
+    try:
+        seconds = int(seconds or 0)
+    except (TypeError, ValueError):
+        return 0
+    return min(max(seconds, 0), MAX_SECONDS_PER_ANSWER)
+
+
+# Escritura diferida (write-behind)
+#
+# Con settings.STUDY_WRITE_BEHIND activo, las respuestas se acumulan en la
+# sesión del usuario y se vuelcan en bloque cada STUDY_WRITE_BEHIND_BATCH
+# respuestas, cada STUDY_WRITE_BEHIND_SECONDS segundos, al terminar o
+# reiniciar el capítulo y al cerrar sesión. La sesión es persistente, así que
+# lo pendiente sobrevive a reinicios del proceso y ``manage.py
+# flush_study_answers`` recoge lo que quede en sesiones abandonadas.
+
+PENDING_KEY = 'pending_answers'
+PENDING_SINCE_KEY = 'pending_answers_since'
+
+
+def buffer_answer(request, card_id, chapter_id, status, seconds=0):
+    """Registra una respuesta, en diferido si el modo write-behind está activo."""
+    if not settings.STUDY_WRITE_BEHIND:
+        record_answers(request.user.pk, [(card_id, chapter_id, status, timezone.now(), seconds)])
+        return
+
+    session = request.session
+    pending = session.get(PENDING_KEY, [])
+    pending.append([card_id, chapter_id, status, timezone.now().isoformat(), seconds])
+    session[PENDING_KEY] = pending
+    since = session.setdefault(PENDING_SINCE_KEY, time.time())
+
+    if (len(pending) >= settings.STUDY_WRITE_BEHIND_BATCH
+            or time.time() - since >= settings.STUDY_WRITE_BEHIND_SECONDS):
+        flush_pending(session, request.user.pk)
+
+
+async def abuffer_answer(request, card_id, chapter_id, status, seconds=0):
+    """``buffer_answer`` para las vistas asíncronas (sesión con ``aget``/``aset``)."""
+    if not settings.STUDY_WRITE_BEHIND:
+        await arecord_answers(request.user.pk, [(card_id, chapter_id, status, timezone.now(), seconds)])
+        return
+
+    session = request.session
+    pending = await session.aget(PENDING_KEY, [])
+    pending.append([card_id, chapter_id, status, timezone.now().isoformat(), seconds])
+    await session.aset(PENDING_KEY, pending)
+    since = await session.asetdefault(PENDING_SINCE_KEY, time.time())
+
+    if (len(pending) >= settings.STUDY_WRITE_BEHIND_BATCH
+            or time.time() - since >= settings.STUDY_WRITE_BEHIND_SECONDS):
+        await aflush_pending(session, request.user.pk)
+
+
+def flush_pending(session, user_id):
+    """Vuelca las respuestas pendientes de ``session``. Devuelve cuántas había."""
+    pending = session.pop(PENDING_KEY, None)
+    session.pop(PENDING_SINCE_KEY, None)
+    if not pending:
+        return 0
+    record_answers(user_id, pending)
+    return len(pending)
+
+
+async def aflush_pending(session, user_id):
+    pending = await session.apop(PENDING_KEY, None)
+    await session.apop(PENDING_SINCE_KEY, None)
+    if not pending:
+        return 0
+    await arecord_answers(user_id, pending)
+    return len(pending)
+
+
+def reset_chapter(user, chapter):
+    """Marca como no vistas las tarjetas del capítulo, solo para ``user``."""
+    updated = CardProgress.objects.filter(
+        user=user, card__chapter_links__chapter=chapter,
+    ).update(viewed=False)
+    invalidate_progress(user.pk)
+    return updated
+
+
+async def areset_chapter(user, chapter):
+    updated = await CardProgress.objects.filter(
+        user=user, card__chapter_links__chapter=chapter,
+    ).aupdate(viewed=False)
+    await ainvalidate_progress(user.pk)
+    return updated
+
+
+
+# Posición de estudio
+#
+# Una fila StudyCursor por (usuario, capítulo). Avanzar es un UPDATE de una
+# fila por la clave única (solo la primera vez hace falta insertarla). Si la
+# caché es compartida entre procesos (perfiles multi y stateless) guarda una
+# copia y mostrar una tarjeta no consulta la base; con locmem se lee la fila.
+
+def _cursor_row(user_id, chapter):
+    return (
+        StudyCursor.objects
+        .filter(user_id=user_id, chapter_id=chapter.pk)
+        .values_list('position', 'deck_version')
+    )
+
+
+def _clamp_position(position, deck_version, chapter, total):
+    if total is not None and deck_version != chapter.updated_at:
+        # el mazo cambió (p. ej. se quitaron tarjetas): no pasarse del final
+        position = min(position, total)
+    return position
+
+
+def load_position(user_id, chapter, total=None):
+    """Posición guardada del usuario en el capítulo (0 si nunca empezó)."""
+    def load():
+        return _cursor_row(user_id, chapter).first() or (0, None)
+
+    position, deck_version = study_cursor(user_id, chapter.pk, load)
+    return _clamp_position(position, deck_version, chapter, total)
+
+
+async def aload_position(user_id, chapter, total=None):
+    async def load():
+        return await _cursor_row(user_id, chapter).afirst() or (0, None)
+
+    position, deck_version = await astudy_cursor(user_id, chapter.pk, load)
+    return _clamp_position(position, deck_version, chapter, total)
+
+
+def _cursor_values(position, chapter):
+    return {'position': position, 'deck_version': chapter.updated_at, 'updated_at': timezone.now()}
+
+
+def _cursor_upsert(values):
+    return {'update_conflicts': True, 'unique_fields': ['user', 'chapter'], 'update_fields': list(values)}
+
+
+def save_position(user_id, chapter, position):
+    values = _cursor_values(position, chapter)
+    updated = StudyCursor.objects.filter(user_id=user_id, chapter_id=chapter.pk).update(**values)
+    if not updated:
+        # primera vez en el capítulo (o una carrera con otra pestaña: upsert)
+        StudyCursor.objects.bulk_create(
+            [StudyCursor(user_id=user_id, chapter_id=chapter.pk, **values)], **_cursor_upsert(values),
+        )
+    remember_cursor(user_id, chapter.pk, (position, chapter.updated_at))
+
+
+async def asave_position(user_id, chapter, position):
+    values = _cursor_values(position, chapter)
+    updated = await StudyCursor.objects.filter(user_id=user_id, chapter_id=chapter.pk).aupdate(**values)
+    if not updated:
+        await StudyCursor.objects.abulk_create(
+            [StudyCursor(user_id=user_id, chapter_id=chapter.pk, **values)], **_cursor_upsert(values),
+        )
+    await aremember_cursor(user_id, chapter.pk, (position, chapter.updated_at))
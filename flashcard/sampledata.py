@@ -0,0 +1,102 @@
+# flashcard/sampledata.py
+
+"""
+Datos sintéticos para medir consultas e índices (``generate_sample_data``).
+
+Crea ``chapters`` capítulos con ``cards`` tarjetas propias cada uno, con
+las categorías y estados repartidos, y ``users`` usuarios que han estudiado
+parte de los capítulos (progreso y posición guardada). Todo va por
+``bulk_create`` en bloques: 1000 x 500 son medio millón de tarjetas.
+"""
+
+import random
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache, explain, search
+from .models import CardProgress, Chapter, ChapterCard, Flashcard, StudyCursor
+
+PREFIX = 'sample'
+DEFAULT_BATCH_SIZE = 5000
+CATEGORIES = [value for value, _ in Flashcard.CATEGORY_CHOICES]
+STATUSES = [value for value, _ in Flashcard.MARCAR_CHOICES]
+
+
+def _create(model, objects, batch_size):
+    with transaction.atomic():
+        return model.objects.bulk_create(objects, batch_size=batch_size)
+
+
+def make_chapter(index, n_cards, rng, batch_size=DEFAULT_BATCH_SIZE):
+    """Un capítulo con ``n_cards`` tarjetas nuevas, en posiciones 0..n-1."""
+    slug = f'{PREFIX}-{index}'
+    chapter = Chapter.objects.create(title=f'Sample {index:05d}', slug=slug)
+    cards = _create(Flashcard, [
+        Flashcard(
+            category=CATEGORIES[i % len(CATEGORIES)],
+            word_english=f'{slug} word {i}',
+            word_spanish=f'{slug} palabra {i}',
+            mark_as=rng.choice(STATUSES),
+            viewed=rng.random() < 0.3,
+            slug=f'{slug}-{i}',
+        )
+        for i in range(n_cards)
+    ], batch_size)
+    _create(ChapterCard, [
+        ChapterCard(chapter=chapter, flashcard=card, position=i) for i, card in enumerate(cards)
+    ], batch_size)
+    return chapter, cards
+
+
+def generate(chapters=1000, cards=500, users=10, studied=20, seed=0, batch_size=DEFAULT_BATCH_SIZE, log=None):
+    """
+    Genera el conjunto completo. Cada usuario ha respondido las tarjetas de
+    ``studied`` capítulos al azar (progreso con repasos repartidos en el
+    próximo mes) y tiene una posición guardada en cada uno. Devuelve un
+    dict con lo creado.
+    """
+    log = log or (lambda message: None)
+    rng = random.Random(seed)
+    start = Chapter.objects.filter(slug__startswith=f'{PREFIX}-').count()
+    deck = {}
+    for index in range(start, start + chapters):
+        chapter, chapter_cards = make_chapter(index, cards, rng, batch_size)
+        deck[chapter.pk] = (chapter, [card.pk for card in chapter_cards])
+        if (index - start + 1) % 100 == 0:
+            log(f"{index - start + 1} capítulos")
+
+    learners = User.objects.bulk_create([
+        User(username=f'{PREFIX}{start}-{i}', password='!') for i in range(users)
+    ])
+    now = timezone.now()
+    progress = 0
+    for user in learners:
+        rows, cursors = [], []
+        for chapter, card_ids in rng.sample(list(deck.values()), min(studied, len(deck))):
+            seen = rng.randint(1, len(card_ids)) if card_ids else 0
+            rows.extend(
+                CardProgress(
+                    user=user, card_id=card_id, chapter=chapter,
+                    status=rng.choice(STATUSES),
+                    due_at=now + timedelta(hours=rng.randint(-240, 720)),
+                )
+                for card_id in card_ids[:seen]
+            )
+            cursors.append(StudyCursor(user=user, chapter=chapter, position=seen))
+        _create(CardProgress, rows, batch_size)
+        _create(StudyCursor, cursors, batch_size)
+        progress += len(rows)
+
+    # bulk_create no lanza señales: índice de búsqueda y caché a mano
+    search.rebuild()
+    cache.invalidate_lookup()
+    explain.analyze()
+    return {
+        'chapters': chapters,
+        'cards': chapters * cards,
+        'users': len(learners),
+        'progress': progress,
+    }
@@ -0,0 +1,70 @@
+# flashcard/scheduler.py
+
+"""
+Repetición espaciada estilo SM-2.
+
+La calificación de cada respuesta sale de las opciones de ``StudyForm``
+(``Flashcard.MARCAR_CHOICES``): 'review' cuenta como fallo y 'learned' como
+acierto. El estado (facilidad, intervalo, repeticiones y fecha de repaso)
+vive en ``CardProgress`` de cada usuario.
+"""
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import CardProgress
+
+# calidad SM-2 (0-5) de cada opción de StudyForm
+GRADES = {
+    'review': 2,
+    'learned': 4,
+}
+
+MIN_EASE = 1.3
+
+
+def schedule(progress, status, now=None):
+    """
+    Aplica una respuesta a ``progress`` (sin guardar) y fija su próximo
+    repaso en ``due_at``.
+    """
+    now = now or timezone.now()
+    quality = GRADES[status]
+
+    if quality >= 3:
+        if progress.repetitions == 0:
+            progress.interval = 1
+        elif progress.repetitions == 1:
+            progress.interval = 6
+        else:
+            progress.interval = round(progress.interval * progress.ease)
+        progress.repetitions += 1
+    else:
+        # fallo: vuelve a empezar, pero conserva la facilidad ajustada
+        progress.repetitions = 0
+        progress.interval = 1
+
+    progress.ease = max(
+        MIN_EASE,
+        progress.ease + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)),
+    )
+    progress.due_at = now + timedelta(days=progress.interval)
+    return progress
+
+
+def due_cards(user, limit, now=None):
+    """
+    Próximas ``limit`` tarjetas pendientes de repaso de ``user``, de la más
+    atrasada a la más reciente.
+
+    Es un recorrido por el índice (user, due_at) que se detiene en ``limit``
+    filas: el coste no depende de cuántos repasos acumule el usuario.
+    """
+    now = now or timezone.now()
+    return list(
+        CardProgress.objects
+        .filter(user=user, due_at__lte=now)
+        .order_by('due_at')
+        .select_related('card')[:limit]
+    )
@@ -0,0 +1,287 @@
+# flashcard/search.py
+
+"""
+Búsqueda de texto completo sobre las flashcards.
+
+- SQLite: tabla virtual FTS5 ``flashcard_search`` (rowid = id de la
+  tarjeta) con ``remove_diacritics`` e índices de prefijo de 2 y 3
+  caracteres. Se mantiene con las señales de ``Flashcard`` y con
+  ``index_cards`` en las cargas masivas (``import_flashcards``).
+- PostgreSQL: índice GIN sobre la expresión ``search_document()`` de la
+  propia tabla de flashcards; la base lo mantiene sola.
+- Otros motores (o SQLite sin FTS5): ``icontains`` sobre las palabras.
+
+En los dos índices las palabras (inglés/español) pesan más que los
+significados y éstos más que el contenido. Las tildes se ignoran tanto al
+indexar como al buscar, y el último término se busca como prefijo
+(autocompletado).
+"""
+
+import re
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, Func, Q, TextField, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Flashcard
+
+SEARCH_TABLE = 'flashcard_search'
+COLUMNS = ('word_english', 'word_spanish', 'mean_english', 'mean_espanish', 'content')
+WORD_COLUMNS = ('word_english', 'word_spanish')
+# pesos de bm25 por columna (mismo orden que COLUMNS)
+BM25_WEIGHTS = (10.0, 10.0, 2.0, 2.0, 1.0)
+PG_INDEX_NAME = 'flashcard_search_gin'
+
+# coincidencias que se puntúan como máximo en el autocompletado (FTS5)
+TYPEAHEAD_CANDIDATES = 1000
+
+# SQLite limita los parámetros por consulta
+ID_BATCH = 500
+
+_ACCENTED = 'áàäâãéèëêíìïîóòöôõúùüûñçÁÀÄÂÃÉÈËÊÍÌÏÎÓÒÖÔÕÚÙÜÛÑÇ'
+_PLAIN = 'aaaaaeeeeiiiiooooouuuuncAAAAAEEEEIIIIOOOOOUUUUNC'
+
+_has_fts = {}
+
+
+def strip_accents(text):
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def terms(text):
+    """Términos de búsqueda: sin tildes, en minúsculas, solo letras y dígitos."""
+    return re.findall(r'\w+', strip_accents(text or '').lower())
+
+
+def engine():
+    """'fts5', 'postgres' o 'basic' según la base de datos en uso."""
+    if connection.vendor == 'postgresql':
+        return 'postgres'
+    if connection.vendor == 'sqlite':
+        key = connection.settings_dict['NAME']
+        if key not in _has_fts:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SEARCH_TABLE],
+                )
+                _has_fts[key] = cursor.fetchone() is not None
+        if _has_fts[key]:
+            return 'fts5'
+    return 'basic'
+
+
+# Índice
+
+def fts5_supported(conn):
+    with conn.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def create_fts_table(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            f"{', '.join(COLUMNS)}, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    _has_fts.pop(conn.settings_dict['NAME'], None)
+
+
+def search_document():
+    """
+    Expresión tsvector de una tarjeta (PostgreSQL). La usan el índice GIN y
+    las consultas: debe ser idéntica en ambos para que se use el índice.
+    ``translate`` quita las tildes y, a diferencia de ``unaccent``, es
+    IMMUTABLE, así que puede ir en un índice.
+    """
+    def fold(name):
+        return Func(F(name), Value(_ACCENTED), Value(_PLAIN), function='translate', output_field=TextField())
+
+    return (
+        SearchVector(fold('word_english'), fold('word_spanish'), config='simple', weight='A')
+        + SearchVector(fold('mean_english'), fold('mean_espanish'), config='simple', weight='B')
+        + SearchVector(fold('content'), config='simple', weight='C')
+    )
+
+
+def _batches(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), ID_BATCH):
+        yield ids[start:start + ID_BATCH]
+
+
+def index_cards(card_ids):
+    """(Re)indexa las tarjetas indicadas. En PostgreSQL no hace falta."""
+    if engine() != 'fts5':
+        return
+    table = Flashcard._meta.db_table
+    with connection.cursor() as cursor:
+        for batch in _batches(card_ids):
+            marks = ', '.join(['%s'] * len(batch))
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({marks})", batch)
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, {', '.join(COLUMNS)}) "
+                f"SELECT id, {', '.join(COLUMNS)} FROM {table} WHERE id IN ({marks})",
+                batch,
+            )
+
+
+def unindex_cards(card_ids):
+    if engine() != 'fts5':
+        return
+    with connection.cursor() as cursor:
+        for batch in _batches(card_ids):
+            marks = ', '.join(['%s'] * len(batch))
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({marks})", batch)
+
+
+def rebuild():
+    """Reconstruye el índice FTS5 completo. Devuelve las tarjetas indexadas."""
+    if engine() != 'fts5':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, {', '.join(COLUMNS)}) "
+            f"SELECT id, {', '.join(COLUMNS)} FROM {Flashcard._meta.db_table}"
+        )
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {SEARCH_TABLE}")
+        return cursor.fetchone()[0]
+
+
+# Consultas
+
+def fts_query(words, columns=None):
+    """Consulta MATCH de FTS5: todos los términos, el último como prefijo."""
+    phrases = [f'"{word}"' for word in words]
+    phrases[-1] += '*'
+    query = ' AND '.join(phrases)
+    if columns:
+        query = f"{{{' '.join(columns)}}} : ({query})"
+    return query
+
+
+def pg_query(words, weights=''):
+    """tsquery en bruto: todos los términos, el último como prefijo."""
+    parts = [f"'{word}'" + (f':{weights}' if weights else '') for word in words[:-1]]
+    parts.append(f"'{words[-1]}':*{weights}")
+    return SearchQuery(' & '.join(parts), search_type='raw', config='simple')
+
+
+def matching_categories(text):
+    """
+    Categorías cuyo valor o etiqueta contiene ``text``. La categoría no
+    está en el índice; son pocas y se comparan aquí, sin consultar la base.
+    """
+    def words(value):
+        return ' '.join(terms(value.replace('_', ' ')))
+
+    needle = words(text)
+    if not needle:
+        return []
+    return [
+        value for value, label in Flashcard.CATEGORY_CHOICES
+        if needle in words(value) or needle in words(label)
+    ]
+
+
+def _basic_filter(words, fields=COLUMNS):
+    condition = Q()
+    for word in words:
+        condition &= Q(*(Q(**{f'{name}__icontains': word}) for name in fields), _connector=Q.OR)
+    return condition
+
+
+def filter_queryset(queryset, text):
+    """Filtra un queryset de Flashcard por ``text`` (sin ordenar por relevancia)."""
+    words = terms(text)
+    if not words:
+        return queryset
+    kind = engine()
+    if kind == 'fts5':
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [fts_query(words)],
+        ))
+    if kind == 'postgres':
+        return queryset.annotate(search_document=search_document()).filter(search_document=pg_query(words))
+    return queryset.filter(_basic_filter(words))
+
+
+def _ranked_ids(words, limit, columns=None, candidates=None):
+    """
+    Ids por relevancia (bm25). Con ``candidates`` solo se puntúan las
+    primeras coincidencias en orden de rowid: un prefijo de dos letras
+    puede coincidir con decenas de miles de tarjetas.
+    """
+    weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+    matches = (
+        f"SELECT rowid, bm25({SEARCH_TABLE}, {weights}) AS score "
+        f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s"
+    )
+    params = [fts_query(words, columns)]
+    if candidates:
+        matches += " LIMIT %s"
+        params.append(candidates)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT rowid FROM ({matches}) ORDER BY score LIMIT %s", [*params, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search(text, limit=20):
+    """Tarjetas que coinciden con ``text``, de la más a la menos relevante."""
+    words = terms(text)
+    if not words:
+        return []
+    kind = engine()
+    if kind == 'fts5':
+        ids = _ranked_ids(words, limit)
+        cards = Flashcard.objects.in_bulk(ids)
+        return [cards[pk] for pk in ids if pk in cards]
+    if kind == 'postgres':
+        query = pg_query(words)
+        return list(
+            Flashcard.objects
+            .annotate(search_document=search_document())
+            .filter(search_document=query)
+            .annotate(rank=SearchRank(F('search_document'), query))
+            .order_by('-rank', 'word_english')[:limit]
+        )
+    return list(Flashcard.objects.filter(_basic_filter(words))[:limit])
+
+
+def typeahead(text, limit=10):
+    """
+    Sugerencias para el autocompletado: solo busca en las palabras
+    (inglés/español) y devuelve diccionarios pequeños, sin instanciar
+    modelos.
+    """
+    words = terms(text)
+    if not words:
+        return []
+    fields = ('id', 'word_english', 'word_spanish', 'category')
+    kind = engine()
+    if kind == 'fts5':
+        ids = _ranked_ids(words, limit, columns=WORD_COLUMNS, candidates=TYPEAHEAD_CANDIDATES)
+        rows = {row['id']: row for row in Flashcard.objects.filter(pk__in=ids).values(*fields)}
+        return [rows[pk] for pk in ids if pk in rows]
+    if kind == 'postgres':
+        # peso A = palabras: mismo índice GIN, sin mirar significados ni contenido
+        query = pg_query(words, weights='A')
+        return list(
+            Flashcard.objects
+            .annotate(search_document=search_document())
+            .filter(search_document=query)
+            .annotate(rank=SearchRank(F('search_document'), query))
+            .order_by('-rank', 'word_english')
+            .values(*fields)[:limit]
+        )
+    return list(
+        Flashcard.objects
+        .filter(_basic_filter(words, WORD_COLUMNS))
+        .values(*fields)[:limit]
+    )
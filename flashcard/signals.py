@@ -0,0 +1,93 @@
+# flashcard/signals.py
+
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import invalidate_card, invalidate_categories, invalidate_chapter, invalidate_lookup
+from .models import Chapter, Flashcard
+from .progress import flush_pending
+from .search import index_cards, unindex_cards
+
+
+@receiver(m2m_changed, sender=Chapter.cards.through)
+def keep_chapter_positions(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Mantiene contiguas las posiciones de ChapterCard cuando se usan
+    ``chapter.cards.add/remove/clear`` (o ``flashcard.chapters...``) y
+    actualiza la versión (``updated_at``) de los capítulos afectados.
+    """
+    if reverse and action == 'pre_clear':
+        # flashcard.chapters.clear(): post_clear no trae los capítulos afectados
+        instance._cleared_chapter_ids = list(
+            instance.chapter_links.values_list('chapter_id', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        chapters = [instance]
+        card_ids = pk_set
+    elif action == 'post_clear':
+        chapters = Chapter.objects.filter(pk__in=instance.__dict__.pop('_cleared_chapter_ids', []))
+        card_ids = {instance.pk}
+    else:
+        chapters = Chapter.objects.filter(pk__in=pk_set)
+        card_ids = {instance.pk}
+
+    for chapter in chapters:
+        if action == 'post_add':
+            chapter.append_cards(card_ids)
+        elif reverse or action == 'post_remove':
+            chapter.renumber_cards()
+        # el mazo cambió: nueva versión para ETags y cachés
+        chapter.touch()
+        invalidate_chapter(chapter.pk)
+
+
+@receiver(post_save, sender=Chapter)
+@receiver(post_delete, sender=Chapter)
+def invalidate_chapter_cache(sender, instance, **kwargs):
+    invalidate_chapter(instance.pk)
+
+
+@receiver(post_save, sender=Flashcard)
+def invalidate_card_cache(sender, instance, **kwargs):
+    # solo cambia el fragmento de esta tarjeta; el orden de los capítulos no.
+    # La categoría puede haber cambiado: el desglose de las estadísticas también
+    invalidate_card(instance.pk)
+    invalidate_categories()
+
+
+@receiver(post_save, sender=Flashcard)
+def update_search_index(sender, instance, **kwargs):
+    index_cards([instance.pk])
+    invalidate_lookup()
+
+
+@receiver(pre_delete, sender=Flashcard)
+def remember_card_chapters(sender, instance, **kwargs):
+    instance._deleted_from_chapters = list(
+        instance.chapter_links.values_list('chapter_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Flashcard)
+def close_gaps_after_card_delete(sender, instance, **kwargs):
+    """El borrado en cascada deja huecos en las posiciones: se compactan."""
+    invalidate_card(instance.pk)
+    invalidate_categories()
+    unindex_cards([instance.pk])
+    invalidate_lookup()
+    for chapter in Chapter.objects.filter(pk__in=instance.__dict__.pop('_deleted_from_chapters', [])):
+        chapter.renumber_cards()
+        chapter.touch()
+        invalidate_chapter(chapter.pk)
+
+
+@receiver(user_logged_out)
+def flush_answers_on_logout(sender, request, user, **kwargs):
+    """Vuelca las respuestas diferidas antes de que logout() vacíe la sesión."""
+    if user is not None and request is not None and hasattr(request, 'session'):
+        flush_pending(request.session, user.pk)
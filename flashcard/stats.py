@@ -0,0 +1,165 @@
+# flashcard/stats.py
+
+"""
+Estadísticas de estudio por usuario.
+
+Todo sale de agregaciones condicionales (``COUNT ... FILTER``) sobre un
+LEFT JOIN con el progreso del usuario (``FilteredRelation``), de modo que
+cada consulta trae como mucho una fila de progreso por tarjeta y no crece
+con el número de usuarios. Lo usan la página de capítulo terminado y el
+perfil; la lista de capítulos usa subconsultas por capítulo
+(``with_progress``) para no contar más que la página que se muestra.
+"""
+
+from django.db.models import (
+    Case, Count, F, FilteredRelation, Func, IntegerField, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce
+
+from . import cache
+from .models import CardProgress, ChapterCard, Flashcard
+
+
+def _progress_relation(path, user):
+    return FilteredRelation(path, condition=Q(**{f'{path}__user': user}))
+
+
+def _count(queryset):
+    """``(SELECT COUNT(*) ...)`` correlacionada; 0 si no hay filas."""
+    return Subquery(
+        queryset.order_by().annotate(n=Func(F('pk'), function='COUNT')).values('n'),
+        output_field=IntegerField(),
+    )
+
+
+def with_progress(queryset, user):
+    """
+    Anota un queryset de Chapter con ``total_cards``, ``seen_cards``,
+    ``learned_cards``, ``unseen_cards``, ``review_cards`` y
+    ``percent_complete`` de ``user``.
+
+    Los contadores son subconsultas correlacionadas y no un GROUP BY: con
+    la lista ordenada por el índice (title, id) y paginada, la base solo
+    cuenta las tarjetas de los capítulos de la página, no las de todos.
+    """
+    links = ChapterCard.objects.filter(chapter=OuterRef('pk'))
+    return (
+        queryset
+        .annotate(
+            total_cards=_count(links),
+            seen_cards=_count(links.filter(flashcard__progress__user=user, flashcard__progress__viewed=True)),
+            learned_cards=_count(links.filter(flashcard__progress__user=user, flashcard__progress__status='learned')),
+        )
+        .annotate(
+            unseen_cards=F('total_cards') - F('seen_cards'),
+            review_cards=F('total_cards') - F('learned_cards'),
+            # un capítulo vacío cuenta como completo (no quedan tarjetas sin ver)
+            percent_complete=Case(
+                When(total_cards=0, then=Value(100)),
+                default=F('seen_cards') * 100 / F('total_cards'),
+                output_field=IntegerField(),
+            ),
+        )
+    )
+
+
+def _chapter_stats_query(user, chapter):
+    """(queryset, agregados, categorías) de ``_compute_chapter_stats``."""
+    categories = [value for value, _ in Flashcard.CATEGORY_CHOICES]
+    learned = Q(mine__status='learned')
+    aggregates = {
+        'total': Count('pk'),
+        'seen': Count('mine', filter=Q(mine__viewed=True)),
+        'learned': Count('mine', filter=learned),
+        'seconds': Coalesce(Sum('mine__seconds_spent'), 0),
+    }
+    for category in categories:
+        in_category = Q(flashcard__category=category)
+        aggregates[f'{category}__total'] = Count('pk', filter=in_category)
+        aggregates[f'{category}__learned'] = Count('mine', filter=in_category & learned)
+
+    queryset = ChapterCard.objects.filter(chapter=chapter).alias(mine=_progress_relation('flashcard__progress', user))
+    return queryset, aggregates, categories
+
+
+def _compute_chapter_stats(user, chapter):
+    queryset, aggregates, categories = _chapter_stats_query(user, chapter)
+    return _stats_dict(queryset.aggregate(**aggregates), categories)
+
+
+async def _acompute_chapter_stats(user, chapter):
+    queryset, aggregates, categories = _chapter_stats_query(user, chapter)
+    return _stats_dict(await queryset.aaggregate(**aggregates), categories)
+
+
+def _stats_dict(row, categories):
+    labels = dict(Flashcard.CATEGORY_CHOICES)
+    total, learned = row['total'], row['learned']
+    return {
+        'total': total,
+        'seen': row['seen'],
+        'unseen': total - row['seen'],
+        'learned': learned,
+        'review': total - learned,
+        'percent_complete': round(row['seen'] * 100 / total) if total else 100,
+        'seconds': row['seconds'],
+        'minutes': round(row['seconds'] / 60),
+        'categories': [
+            {
+                'category': category,
+                'label': labels[category],
+                'total': row[f'{category}__total'],
+                'learned': row[f'{category}__learned'],
+            }
+            for category in categories
+            if row[f'{category}__total']
+        ],
+    }
+
+
+def chapter_stats(user, chapter):
+    """
+    Totales, learned/review, desglose por categoría y tiempo dedicado de
+    ``user`` en ``chapter``, con una sola consulta.
+
+    Se cachea por (usuario, capítulo) hasta la siguiente respuesta del
+    usuario, el siguiente cambio en las tarjetas del capítulo o el siguiente
+    cambio de categoría de cualquier tarjeta (el desglose depende de ellas).
+    """
+    key = (
+        f'{cache.PREFIX}:stats:{user.pk}:{cache.progress_version(user.pk)}'
+        f':{chapter.pk}:{cache.chapter_version(chapter.pk)}:{cache.categories_version()}'
+    )
+    return cache.cached('stats', key, lambda: _compute_chapter_stats(user, chapter))
+
+
+async def achapter_stats(user, chapter):
+    """``chapter_stats`` para las vistas asíncronas (misma clave de caché)."""
+    key = (
+        f'{cache.PREFIX}:stats:{user.pk}:{await cache.aprogress_version(user.pk)}'
+        f':{chapter.pk}:{await cache.achapter_version(chapter.pk)}:{await cache.acategories_version()}'
+    )
+    return await cache.acached('stats', key, lambda: _acompute_chapter_stats(user, chapter))
+
+
+def user_stats(user):
+    """Resumen global de ``user`` (todas sus tarjetas estudiadas), en una consulta."""
+    categories = [value for value, _ in Flashcard.CATEGORY_CHOICES]
+    learned = Q(status='learned')
+    aggregates = {
+        'total': Count('pk'),
+        'seen': Count('pk', filter=Q(viewed=True)),
+        'learned': Count('pk', filter=learned),
+        'seconds': Coalesce(Sum('seconds_spent'), 0),
+    }
+    for category in categories:
+        in_category = Q(card__category=category)
+        aggregates[f'{category}__total'] = Count('pk', filter=in_category)
+        aggregates[f'{category}__learned'] = Count('pk', filter=in_category & learned)
+
+    def compute():
+        row = CardProgress.objects.filter(user=user).aggregate(**aggregates)
+        return _stats_dict(row, categories)
+
+    key = f'{cache.PREFIX}:stats:{user.pk}:{cache.progress_version(user.pk)}:{cache.categories_version()}:all'
+    return cache.cached('stats', key, compute)
@@ -0,0 +1,86 @@
+{% load static %}/*
+ * Quibly: service worker del modo sin conexión (se sirve en /sw.js).
+ *
+ * Los capítulos descargados (custom.js, "Descargar capítulo") se guardan en
+ * la caché OFFLINE_CACHE: página de estudio, paquete del mazo y medios.
+ * - páginas y paquetes guardados: red primero; si no hay red, la copia
+ *   guardada (que se refresca con cada respuesta buena de la red);
+ * - medios (/media/v/, con hash en el nombre) y estáticos: caché primero;
+ * - el resto (API, admin...) va siempre a la red.
+ */
+'use strict';
+
+var OFFLINE_CACHE = 'quibly-offline-v1';
+var STATIC_CACHE = 'quibly-static-v1';
+var STATIC_URLS = [
+  '{% static "js/custom.js" %}',
+  '{% static "css/custom.css" %}',
+];
+var MEDIA_PREFIX = '{{ media_url }}v/';
+var STATIC_PREFIX = '{% static "" %}';
+
+self.addEventListener('install', function (event) {
+  event.waitUntil(
+    caches.open(STATIC_CACHE)
+      .then(function (cache) { return cache.addAll(STATIC_URLS); })
+      .then(function () { return self.skipWaiting(); })
+  );
+});
+
+self.addEventListener('activate', function (event) {
+  var keep = [OFFLINE_CACHE, STATIC_CACHE];
+  event.waitUntil(
+    caches.keys()
+      .then(function (names) {
+        return Promise.all(names.filter(function (name) {
+          return name.indexOf('quibly-') === 0 && keep.indexOf(name) === -1;
+        }).map(function (name) { return caches.delete(name); }));
+      })
+      .then(function () { return self.clients.claim(); })
+  );
+});
+
+function cacheFirst(request, cacheName) {
+  return caches.match(request).then(function (cached) {
+    if (cached) return cached;
+    return fetch(request).then(function (response) {
+      if (response.ok) {
+        var copy = response.clone();
+        caches.open(cacheName).then(function (cache) { cache.put(request, copy); });
+      }
+      return response;
+    });
+  });
+}
+
+// solo para lo que ya se descargó: si no está en la caché no se guarda
+function networkFirstIfSaved(request) {
+  return caches.open(OFFLINE_CACHE).then(function (cache) {
+    return cache.match(request, { ignoreSearch: true }).then(function (saved) {
+      if (!saved) return fetch(request);
+      return fetch(request).then(function (response) {
+        if (response.ok && !response.redirected) cache.put(request.url.split('?')[0], response.clone());
+        return response;
+      }, function () {
+        return saved;
+      });
+    });
+  });
+}
+
+self.addEventListener('fetch', function (event) {
+  var request = event.request;
+  if (request.method !== 'GET') return;
+  var url = new URL(request.url);
+
+  if (url.origin === self.location.origin && url.pathname.indexOf(MEDIA_PREFIX) === 0) {
+    event.respondWith(cacheFirst(request, OFFLINE_CACHE));
+  } else if (url.origin === self.location.origin && url.pathname.indexOf(STATIC_PREFIX) === 0) {
+    event.respondWith(cacheFirst(request, STATIC_CACHE));
+  } else if (request.mode === 'navigate' || /\/bundle\/$/.test(url.pathname)) {
+    event.respondWith(networkFirstIfSaved(request));
+  } else if (url.origin !== self.location.origin) {
+    // imágenes externas guardadas al descargar un capítulo
+    event.respondWith(caches.match(request).then(function (cached) { return cached || fetch(request); }));
+  }
+});
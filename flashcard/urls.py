@@ -1,10 +1,37 @@
+from django.conf import settings
 from django.urls import path
-from .views import ChapterListView, ChapterDetailView, ChapterFinishedView, chapter_restart
-from . import views
+from .views import DueCardsView, SearchView
+from . import api, async_views, export, views
+
+
+def study_urls(study):
+    """Rutas del flujo de estudio con las vistas de ``study`` (views o async_views)."""
+    return [
+        path('capitulos/', study.ChapterListView.as_view(), name='chapter_list'),
+        path('capitulos/<slug:slug>/', study.ChapterDetailView.as_view(), name='chapter_detail'),
+        path('capitulos/<slug:slug>/finished/', study.ChapterFinishedView.as_view(), name='chapter_finished'),
+        path('capitulos/<slug:slug>/restart/', study.chapter_restart, name='chapter_restart'),
+    ]
+
+
 urlpatterns = [
     path('', views.home, name='home'),
-    path('capitulos/', ChapterListView.as_view(), name='chapter_list'),
-    path('capitulos/<slug:slug>/', ChapterDetailView.as_view(), name='chapter_detail'),
-    path('capitulos/<slug:slug>/finished/', ChapterFinishedView.as_view(), name='chapter_finished'),
-    path('capitulos/<slug:slug>/restart/', chapter_restart, name='chapter_restart'),
+    # ASGI (core/asgi.py): vistas asíncronas; WSGI: las de siempre
+    *study_urls(async_views if settings.ASYNC_VIEWS else views),
+    path('repaso/', DueCardsView.as_view(), name='due_cards'),
+    path('buscar/', SearchView.as_view(), name='search'),
+    # service worker del modo sin conexión: en la raíz para controlar todo el sitio
+    path('sw.js', views.service_worker, name='service_worker'),
+
+    # API JSON del flujo de estudio
+    path('api/capitulos/<slug:slug>/cards/', api.chapter_deck, name='api_chapter_deck'),
+    path('api/capitulos/<slug:slug>/answers/', api.chapter_answers, name='api_chapter_answers'),
+    path('api/capitulos/<slug:slug>/bundle/', api.chapter_bundle, name='api_chapter_bundle'),
+    path('api/buscar/', api.typeahead, name='api_typeahead'),
+    path('api/similares/', api.similar_words, name='api_similar_words'),
+    path('api/cache/stats/', api.cache_stats, name='api_cache_stats'),
+
+    # exportación en streaming
+    path('exportar/capitulos/<slug:slug>/', export.export_chapter, name='export_chapter'),
+    path('exportar/progreso/', export.export_progress, name='export_progress'),
 ]
\ No newline at end of file
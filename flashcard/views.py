@@ -1,28 +1,75 @@
 # flashcard/views.py
 
+import time
+
 from django import forms
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import OuterRef, Subquery
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.views.generic import ListView, DetailView, FormView, TemplateView
-from .models import Chapter, Flashcard
+from . import fuzzy, search
+from .cache import card_fragment, chapter_by_slug, chapter_card_ids
+from .models import CardProgress, Chapter, Flashcard, StudyCursor
+from .progress import buffer_answer, flush_pending, load_position, record_answers, reset_chapter, save_position
+from .scheduler import due_cards
+from .stats import chapter_stats, with_progress
 
 def home(request):
     return render(request, "flashcard/home.html")
 
 
-class ChapterListView(ListView):
+def service_worker(request):
+    """
+    static/…/sw.js no podría controlar /capitulos/ (un service worker solo
+    controla su ruta y las de debajo): se sirve desde la raíz, sin caché,
+    para que el navegador vea enseguida las versiones nuevas.
+    """
+    response = render(
+        request, 'flashcard/sw.js', {'media_url': settings.MEDIA_URL}, content_type='application/javascript',
+    )
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def chapter_list_queryset(user):
+    """Capítulos con el progreso de ``user`` y su posición guardada, en una consulta."""
+    cursor = StudyCursor.objects.filter(user=user, chapter=OuterRef('pk')).values('position')[:1]
+    return (
+        with_progress(Chapter.objects, user)
+        .annotate(resume_position=Subquery(cursor))
+        .order_by(*Chapter._meta.ordering, 'pk')
+    )
+
+
+class ChapterListView(LoginRequiredMixin, ListView):
     """
-    Lista todos los capítulos y marca cuáles están terminados.
+    Lista los capítulos paginados y marca cuáles terminó el usuario.
+
+    Los contadores por capítulo (total, sin ver, learned, review) y el
+    porcentaje completado salen de una única consulta anotada con el
+    progreso del usuario (``stats.with_progress``), así la plantilla nunca
+    vuelve a tocar la relación ``cards``.
     """
     model = Chapter
     template_name = 'flashcard/chapter_list.html'
     context_object_name = 'chapters'
+    paginate_by = 20
+
+    def get_queryset(self):
+        flush_pending(self.request.session, self.request.user.pk)
+        return chapter_list_queryset(self.request.user)
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         for ch in ctx['chapters']:
             # consideramos terminado si no quedan flashcards sin ver
-            ch.finished = not ch.cards.filter(viewed=False).exists()
+            ch.finished = ch.unseen_cards == 0
         return ctx
 
 
@@ -31,35 +78,85 @@ class StudyForm(forms.Form):
     Formulario para marcar cada flashcard como 'review' o 'learned'.
     """
     mark_as = forms.ChoiceField(choices=Flashcard.MARCAR_CHOICES)
+    # momento en que se mostró la tarjeta, para el tiempo dedicado
+    shown_at = forms.IntegerField(required=False, widget=forms.HiddenInput)
+
+    def seconds_spent(self):
+        shown_at = self.cleaned_data.get('shown_at')
+        return int(time.time()) - shown_at if shown_at else 0
 
 
-class ChapterDetailView(DetailView, FormView):
+class ReviewForm(StudyForm):
+    """
+    Calificación de una tarjeta en el repaso: mismas opciones que StudyForm
+    más la tarjeta respondida.
+    """
+    card = forms.IntegerField(widget=forms.HiddenInput)
+
+
+class ChapterDetailView(LoginRequiredMixin, DetailView, FormView):
     model = Chapter
     template_name = 'flashcard/chapter_detail.html'
     form_class = StudyForm
     context_object_name = 'chapter'
 
     def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
         self.object = self.get_object()
-        pos_key = f'pos_{self.object.pk}'
-        restart = request.GET.get('restart') == '1'
-        if restart or request.session.get('current_chapter') != self.object.slug:
-            request.session[pos_key] = 0
-            request.session['current_chapter'] = self.object.slug
+        if request.GET.get('restart') == '1':
+            self.set_position(0)
         return super().dispatch(request, *args, **kwargs)
 
-    @property
-    def cards(self):
-        return list(self.object.cards.all())
+    def get_object(self, queryset=None):
+        # capítulo, orden de tarjetas y fragmentos salen de flashcard/cache.py
+        if getattr(self, 'object', None) is None:
+            self.object = chapter_by_slug(self.kwargs['slug'])
+            if self.object is None:
+                raise Http404('Capítulo no encontrado.')
+        return self.object
+
+    @cached_property
+    def card_ids(self):
+        return chapter_card_ids(self.object)
+
+    @cached_property
+    def total(self):
+        return len(self.card_ids)
+
+    @cached_property
+    def position(self):
+        # posición por (usuario, capítulo) en StudyCursor: la sesión no se escribe
+        return load_position(self.request.user.pk, self.object, self.total)
+
+    def set_position(self, position):
+        save_position(self.request.user.pk, self.object, position)
+        self.position = position
+
+    def get(self, request, *args, **kwargs):
+        if self.total and self.position >= self.total:
+            # capítulo terminado (p. ej. se vuelve a él desde otro): resumen
+            return redirect('chapter_finished', slug=self.object.slug)
+        return super().get(request, *args, **kwargs)
+
+    def get_initial(self):
+        return {**super().get_initial(), 'shown_at': int(time.time())}
+
+    def card_id_at(self, pos):
+        # una sola tarjeta por posición; nunca el mazo completo
+        return self.card_ids[pos] if pos < self.total else None
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        pos_key = f'pos_{self.object.pk}'
-        pos = self.request.session.get(pos_key, 0)
-        total = len(self.cards)
-        if pos < total:
+        pos = self.position
+        total = self.total
+        card_id = self.card_id_at(pos)
+        fragment = card_fragment(card_id) if card_id is not None else None
+        if fragment is not None:
             ctx.update({
-                'card': self.cards[pos],
+                'card_id': card_id,
+                'card_html': fragment['html'],
+                'card_category': fragment['category_display'],
                 'pos': pos + 1,
                 'total': total,
                 # sugerencia: pasar progress_percent calculado aquí
@@ -69,7 +166,7 @@ class ChapterDetailView(DetailView, FormView):
         else:
             # Si pos >= total, enviamos contexto vacío (la vista de "finished" se mostrará vía redirect)
             ctx.update({
-                'card': None,
+                'card_id': None,
                 'pos': total,
                 'total': total,
                 'progress_percent': 100,
@@ -78,73 +175,125 @@ class ChapterDetailView(DetailView, FormView):
         return ctx
 
     def form_valid(self, form):
-        pos_key = f'pos_{self.object.pk}'
-        pos = self.request.session.get(pos_key, 0)
+        pos = self.position
         action = self.request.POST.get('action', 'next')
 
         if action == 'prev':
             # retrocede sin marcar
-            new_pos = max(pos - 1, 0)
-            self.request.session[pos_key] = new_pos
+            self.set_position(max(pos - 1, 0))
             return redirect('chapter_detail', slug=self.object.slug)
 
         # marcar la tarjeta actual (si existe)
-        if pos < len(self.cards):
-            card = self.cards[pos]
-            card.viewed = True
-            # si tu formulario tiene mark_as, guárdalo (si no lo tienes, omitir)
-            if 'mark_as' in form.cleaned_data:
-                card.mark_as = form.cleaned_data.get('mark_as', card.mark_as)
-            card.save()
+        card_id = self.card_id_at(pos)
+        if card_id is not None:
+            # el progreso es por usuario: nunca se escribe la fila compartida de Flashcard
+            buffer_answer(
+                self.request, card_id, self.object.pk, form.cleaned_data['mark_as'], form.seconds_spent(),
+            )
             # avanzamos la posición
-            self.request.session[pos_key] = pos + 1
+            self.set_position(pos + 1)
 
         # Al dejar que super().form_valid() maneje la redirección, get_success_url decidirá a dónde ir
         return super().form_valid(form)
 
     def get_success_url(self):
-        pos_key = f'pos_{self.object.pk}'
-        pos = self.request.session.get(pos_key, 0)
-        total = len(self.cards)
-        if pos >= total:
+        pos = self.position
+        if pos >= self.total:
             # Cuando terminamos, vamos a la vista dedicada de "finished"
             return reverse('chapter_finished', args=[self.object.slug])
         # si no, volvemos a la misma vista para mostrar la siguiente tarjeta (usamos ?pos por claridad)
         return f"{reverse('chapter_detail', args=[self.object.slug])}?pos={pos + 1}"
 
 
-class ChapterFinishedView(TemplateView):
+class ChapterFinishedView(LoginRequiredMixin, TemplateView):
     template_name = 'flashcard/chapter_finished.html'
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         slug = self.kwargs.get('slug')
+        # el capítulo terminó: volcamos lo pendiente antes de calcular estadísticas
+        flush_pending(self.request.session, self.request.user.pk)
         chapter = get_object_or_404(Chapter, slug=slug)
-        total = chapter.cards.count()
-        # estadísticas útiles: cuántas marcaron como learned/review
-        learned = chapter.cards.filter(mark_as='learned').count()
-        review = chapter.cards.filter(mark_as='review').count()
+        # totales, learned/review, categorías y tiempo: una consulta (o la caché)
+        stats = chapter_stats(self.request.user, chapter)
         ctx.update({
             'chapter': chapter,
-            'total': total,
-            'learned': learned,
-            'review': review,
+            'stats': stats,
+            'total': stats['total'],
+            'learned': stats['learned'],
+            'review': stats['review'],
         })
         return ctx
 
+@login_required
 def chapter_restart(request, slug):
     """
-    Reinicia el capítulo: marca todas las flashcards relacionadas como no vistas (viewed=False)
-    y redirige al capítulo con restart=1 para comenzar desde la primera tarjeta.
+    Reinicia el capítulo para el usuario: marca su progreso en las flashcards
+    del capítulo como no visto y redirige al capítulo con restart=1 para
+    comenzar desde la primera tarjeta.
     """
     chapter = get_object_or_404(Chapter, slug=slug)
-    # marcar todas como no vistas (reset)
-    chapter.cards.update(viewed=False)
-    # (opcional) resetear mark_as si quieres: chapter.cards.update(mark_as='review')
-    # resetear la posición en la sesión también
-    pos_key = f'pos_{chapter.pk}'
-    request.session[pos_key] = 0
-    request.session['current_chapter'] = chapter.slug
-    return redirect(f"{reverse('chapter_detail', args=[chapter.slug])}?restart=1")
+    flush_pending(request.session, request.user.pk)
+    # marcar como no vistas (reset) solo las filas de progreso de este usuario
+    reset_chapter(request.user, chapter)
+    # y la posición vuelve al principio
+    save_position(request.user.pk, chapter, 0)
+    return redirect('chapter_detail', slug=chapter.slug)
+
+
+class DueCardsView(LoginRequiredMixin, FormView):
+    """
+    Repaso de las tarjetas pendientes (due_at <= ahora) de todos los capítulos,
+    empezando por la más atrasada. Cada respuesta reprograma la tarjeta (SM-2).
+    """
+    template_name = 'flashcard/due_cards.html'
+    form_class = ReviewForm
+    batch_size = 20
+
+    def get_initial(self):
+        return {**super().get_initial(), 'shown_at': int(time.time())}
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        flush_pending(self.request.session, self.request.user.pk)
+        batch = due_cards(self.request.user, self.batch_size)
+        card = batch[0].card if batch else None
+        ctx.update({
+            'card': card,
+            'card_html': card_fragment(card.pk, card=card)['html'] if card else '',
+            'due_count': len(batch),
+            'batch_size': self.batch_size,
+        })
+        return ctx
+
+    def form_valid(self, form):
+        user = self.request.user
+        progress = CardProgress.objects.filter(
+            user=user, card_id=form.cleaned_data['card'],
+        ).only('card_id', 'chapter_id').first()
+        if progress is not None:
+            flush_pending(self.request.session, user.pk)
+            record_answers(user.pk, [(
+                progress.card_id, progress.chapter_id, form.cleaned_data['mark_as'], timezone.now(),
+                form.seconds_spent(),
+            )])
+        return redirect('due_cards')
+
 
+class SearchView(LoginRequiredMixin, TemplateView):
+    """Búsqueda de tarjetas por palabra, traducción, significado o contenido."""
+    template_name = 'flashcard/search.html'
+    max_results = 50
+    max_suggestions = 5
 
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        results = search.search(query, self.max_results) if query else []
+        ctx.update({
+            'query': query,
+            'results': results,
+            # sin resultados: "¿quisiste decir...?" con el índice aproximado
+            'suggestions': fuzzy.closest(query, self.max_suggestions) if query and not results else [],
+        })
+        return ctx
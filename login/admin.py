@@ -1,6 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .models import QueuedEmail
 
 class UserAdmin(BaseUserAdmin):
     list_display = ('username', 'email', 'first_name', 'is_staff')  # Añadir email aquí
@@ -9,3 +12,27 @@ class UserAdmin(BaseUserAdmin):
 
 admin.site.unregister(User)
 admin.site.register(User, UserAdmin)
+
+
+@admin.register(QueuedEmail)
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'status', 'attempts', 'created_at', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'to')
+    date_hierarchy = 'created_at'
+    readonly_fields = [field.name for field in QueuedEmail._meta.fields]
+    actions = ['retry_now']
+
+    @admin.display(description='Destinatarios')
+    def recipients(self, obj):
+        return ', '.join(obj.to)
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Reintentar ahora')
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=QueuedEmail.SENT).update(
+            status=QueuedEmail.PENDING, next_attempt_at=timezone.now(),
+        )
+        self.message_user(request, f"{updated} correos vuelven a la cola.")
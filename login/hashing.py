@@ -0,0 +1,115 @@
+# login/hashing.py
+
+"""
+Argon2 con parámetros por entorno y un límite de hashes simultáneos.
+
+Cada hash Argon2 reserva ``ARGON2_MEMORY_COST`` KiB (100 MB por defecto) y
+ocupa la CPU ``ARGON2_TIME_COST`` pasadas: una ráfaga de logins dentro de un
+mismo proceso multiplica ambas cosas por el número de peticiones a la vez.
+
+``Argon2PasswordHasher`` lee sus parámetros de los ajustes (al cambiarlos,
+Django rehace el hash de cada usuario en su siguiente login) y hace cada
+``encode``/``verify`` dentro de ``gate``: como mucho
+``PASSWORD_HASHING_CONCURRENCY`` a la vez por proceso; el resto espera en
+cola. Si ya esperan ``PASSWORD_HASHING_QUEUE`` o la espera pasa de
+``PASSWORD_HASHING_TIMEOUT`` segundos, se lanza ``HashingBusy`` y
+``HashingBusyMiddleware`` responde 503 con ``Retry-After``.
+
+Como va en el hasher, cubre todo lo que toca contraseñas: login, registro,
+admin, allauth y restablecimiento.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher as BaseArgon2PasswordHasher
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+
+class HashingBusy(Exception):
+    """Demasiados hashes de contraseña en curso o en cola."""
+
+
+class HashingGate:
+    """Semáforo con cola acotada para los hashes de contraseña."""
+
+    def __init__(self):
+        self.lock = threading.Condition()
+        self.running = 0
+        self.waiting = 0
+        self.peak = 0  # máximo de hashes simultáneos visto (benchmarks y tests)
+
+    @staticmethod
+    def limits():
+        concurrency = getattr(settings, 'PASSWORD_HASHING_CONCURRENCY', None) or min(4, os.cpu_count() or 1)
+        return (
+            concurrency,
+            getattr(settings, 'PASSWORD_HASHING_QUEUE', 32),
+            getattr(settings, 'PASSWORD_HASHING_TIMEOUT', 5.0),
+        )
+
+    @contextmanager
+    def __call__(self):
+        concurrency, queue, timeout = self.limits()
+        with self.lock:
+            if self.running >= concurrency:
+                if self.waiting >= queue:
+                    raise HashingBusy('Cola de hashes llena')
+                self.waiting += 1
+                try:
+                    if not self.lock.wait_for(lambda: self.running < concurrency, timeout):
+                        raise HashingBusy('Tiempo de espera agotado')
+                finally:
+                    self.waiting -= 1
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.running -= 1
+                self.lock.notify()
+
+
+gate = HashingGate()
+
+
+class Argon2PasswordHasher(BaseArgon2PasswordHasher):
+    """El Argon2 de Django con parámetros de los ajustes y pasando por ``gate``."""
+
+    @property
+    def time_cost(self):
+        return getattr(settings, 'ARGON2_TIME_COST', BaseArgon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'ARGON2_MEMORY_COST', BaseArgon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'ARGON2_PARALLELISM', BaseArgon2PasswordHasher.parallelism)
+
+    def encode(self, password, salt):
+        with gate():
+            return super().encode(password, salt)
+
+    def verify(self, password, encoded):
+        with gate():
+            return super().verify(password, encoded)
+
+
+class HashingBusyMiddleware(MiddlewareMixin):
+    """Convierte ``HashingBusy`` en un 503 en lugar de un error 500 (WSGI y ASGI)."""
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, HashingBusy):
+            return None
+        response = HttpResponse(
+            'Hay demasiados inicios de sesión en curso. Inténtalo de nuevo en unos segundos.',
+            status=503, content_type='text/plain; charset=utf-8',
+        )
+        response['Retry-After'] = '5'
+        return response
@@ -0,0 +1,220 @@
+# login/mail.py
+
+"""
+Bandeja de salida de correo.
+
+``QueuedEmailBackend`` es el ``EMAIL_BACKEND`` del proyecto: en lugar de
+hablar con el servidor SMTP mientras la petición sigue abierta (el
+restablecimiento de contraseña, los correos de allauth...), guarda cada
+mensaje en ``QueuedEmail`` y responde enseguida.
+
+``send_queued`` los envía por bloques con una sola conexión del backend
+real (``OUTBOX_DELIVERY_BACKEND``, SMTP por defecto). Un fallo deja el
+mensaje para más tarde con espera exponencial (``OUTBOX_RETRY_SECONDS``,
+2x por intento) y tras ``OUTBOX_MAX_ATTEMPTS`` queda como fallido. Lo
+ejecuta ``manage.py send_queued_mail`` (cron o ``--loop``) o, con
+``OUTBOX_THREAD=True``, una hebra del propio proceso (core/background.py)
+que se despierta al confirmar cada transacción que encola correo y, si
+quedan reintentos, espera hasta el primero en vez de terminar.
+"""
+
+import base64
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from core.background import Worker
+
+from .models import QueuedEmail
+
+logger = logging.getLogger(__name__)
+
+# un mensaje "enviando" de un worker que murió vuelve a la cola pasado este tiempo
+SENDING_TIMEOUT = timedelta(minutes=10)
+MAX_RETRY_DELAY = timedelta(hours=6)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# Encolar
+
+def _attachment(attachment):
+    # (nombre, contenido, mimetype) o un MIMEBase ya construido
+    if isinstance(attachment, tuple):
+        filename, content, mimetype = attachment
+    else:
+        filename = attachment.get_filename()
+        content = attachment.get_payload(decode=True)
+        mimetype = attachment.get_content_type()
+    if isinstance(content, str):
+        content = content.encode()
+    return [filename, base64.b64encode(content).decode('ascii'), mimetype]
+
+
+def to_row(message):
+    return QueuedEmail(
+        subject=message.subject,
+        body=message.body,
+        from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(message.to),
+        cc=list(message.cc),
+        bcc=list(message.bcc),
+        reply_to=list(message.reply_to),
+        headers=dict(message.extra_headers),
+        alternatives=[[content, mimetype] for content, mimetype in getattr(message, 'alternatives', [])],
+        attachments=[_attachment(attachment) for attachment in message.attachments],
+    )
+
+
+def to_message(row, connection=None):
+    message = EmailMultiAlternatives(
+        subject=row.subject,
+        body=row.body,
+        from_email=row.from_email,
+        to=row.to,
+        cc=row.cc,
+        bcc=row.bcc,
+        reply_to=row.reply_to,
+        headers=row.headers,
+        connection=connection,
+    )
+    for content, mimetype in row.alternatives:
+        message.attach_alternative(content, mimetype)
+    for filename, content, mimetype in row.attachments:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Guarda los mensajes en la bandeja de salida; no abre ninguna conexión."""
+
+    def send_messages(self, email_messages):
+        rows = [to_row(message) for message in email_messages if message.recipients()]
+        if not rows:
+            return 0
+        QueuedEmail.objects.bulk_create(rows)
+        if _setting('OUTBOX_THREAD', False):
+            transaction.on_commit(kick)
+        return len(rows)
+
+
+# Enviar
+
+def retry_delay(attempts):
+    """Espera antes del intento ``attempts + 1``: base, 2x, 4x... con tope."""
+    base = timedelta(seconds=_setting('OUTBOX_RETRY_SECONDS', 60))
+    return min(base * 2 ** max(attempts - 1, 0), MAX_RETRY_DELAY)
+
+
+def due(now=None):
+    now = now or timezone.now()
+    return QueuedEmail.objects.filter(
+        Q(status=QueuedEmail.PENDING) | Q(status=QueuedEmail.SENDING),
+        next_attempt_at__lte=now,
+    )
+
+
+def _take(row, now):
+    """Reserva ``row`` con un UPDATE condicional: False si otro worker se adelantó."""
+    row.status = QueuedEmail.SENDING
+    row.next_attempt_at = now + SENDING_TIMEOUT
+    return due(now).filter(pk=row.pk).update(status=row.status, next_attempt_at=row.next_attempt_at) == 1
+
+
+def claim(batch_size, now=None):
+    """
+    Reserva hasta ``batch_size`` mensajes pendientes para este worker.
+
+    Solo se devuelven las filas que este worker pasó a "enviando": si otro
+    (cron y la hebra del proceso) leyó las mismas, su UPDATE ya no las
+    encuentra vencidas. Vale también para SQLite, donde no hay
+    ``SELECT ... FOR UPDATE``.
+    """
+    now = now or timezone.now()
+    rows = list(due(now).order_by('next_attempt_at', 'pk')[:batch_size])
+    return [row for row in rows if _take(row, now)]
+
+
+def _failed(row, error, now):
+    row.attempts += 1
+    row.last_error = f'{type(error).__name__}: {error}'[:2000]
+    if row.attempts >= _setting('OUTBOX_MAX_ATTEMPTS', 5):
+        row.status = QueuedEmail.FAILED
+        logger.error('Correo %s descartado tras %s intentos: %s', row.pk, row.attempts, row.last_error)
+    else:
+        row.status = QueuedEmail.PENDING
+        row.next_attempt_at = now + retry_delay(row.attempts)
+        logger.warning('Correo %s: intento %s fallido (%s)', row.pk, row.attempts, row.last_error)
+
+
+def deliver(rows, backend=None):
+    """Envía ``rows`` por una sola conexión. Devuelve (enviados, fallidos)."""
+    if not rows:
+        return 0, 0
+    connection = get_connection(backend or _setting('OUTBOX_DELIVERY_BACKEND', None), fail_silently=False)
+    now = timezone.now()
+    try:
+        connection.open()
+    except Exception as exc:
+        # sin conexión no se envía ninguno: todos a reintentar
+        for row in rows:
+            _failed(row, exc, now)
+    else:
+        try:
+            for row in rows:
+                try:
+                    to_message(row, connection).send()
+                except Exception as exc:
+                    _failed(row, exc, now)
+                    # la conexión puede haber quedado rota: el siguiente envío la reabre
+                    connection.close()
+                else:
+                    row.status = QueuedEmail.SENT
+                    row.sent_at = timezone.now()
+                    row.attempts += 1
+                    row.last_error = ''
+        finally:
+            connection.close()
+    QueuedEmail.objects.bulk_update(rows, ['status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at'])
+    sent = sum(row.status == QueuedEmail.SENT for row in rows)
+    return sent, len(rows) - sent
+
+
+def send_queued(batch_size=None, backend=None, max_batches=None):
+    """Vacía la cola (lo que ya toca enviar). Devuelve (enviados, fallidos)."""
+    batch_size = batch_size or _setting('OUTBOX_BATCH_SIZE', 50)
+    sent = failed = batches = 0
+    while max_batches is None or batches < max_batches:
+        rows = claim(batch_size)
+        if not rows:
+            break
+        ok, ko = deliver(rows, backend)
+        sent, failed, batches = sent + ok, failed + ko, batches + 1
+    return sent, failed
+
+
+def next_attempt_in(now=None):
+    """Segundos hasta el próximo envío programado (un reintento), o None si no queda nada."""
+    now = now or timezone.now()
+    earliest = QueuedEmail.objects.filter(
+        status__in=(QueuedEmail.PENDING, QueuedEmail.SENDING),
+    ).aggregate(earliest=Min('next_attempt_at'))['earliest']
+    return None if earliest is None else max((earliest - now).total_seconds(), 0)
+
+
+# Hebra del proceso (OUTBOX_THREAD)
+
+worker = Worker('outbox', send_queued, next_attempt_in)
+
+
+def kick():
+    """Despierta (o arranca) la hebra que envía la cola en segundo plano."""
+    worker.kick()
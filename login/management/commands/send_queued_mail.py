@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from login.mail import send_queued
+
+
+class Command(BaseCommand):
+    help = (
+        "Envía los correos de la bandeja de salida (login/mail.py) por bloques, "
+        "con una conexión SMTP por bloque. Pensado para cron o, con --loop, como worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Correos por conexión (por defecto OUTBOX_BATCH_SIZE)")
+        parser.add_argument('--loop', action='store_true', help="No terminar: volver a mirar la cola cada --interval segundos")
+        parser.add_argument('--interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued(options['batch_size'])
+            if sent or failed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f"{sent} correos enviados, {failed} fallidos."))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -1,3 +1,71 @@
 from django.db import models # type: ignore
+from django.utils import timezone
 
-# Create your models here.
+
+class QueuedEmail(models.Model):
+    """
+    Correo pendiente de enviar (bandeja de salida, ver login/mail.py).
+
+    Las vistas solo insertan la fila; ``send_queued_mail`` (o la hebra de
+    ``OUTBOX_THREAD``) los envía por bloques con una sola conexión SMTP y
+    reintenta los fallos con espera creciente.
+    """
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pendiente'),
+        (SENDING, 'Enviando'),
+        (SENT, 'Enviado'),
+        (FAILED, 'Fallido'),
+    ]
+
+    subject    = models.CharField(max_length=998)
+    body       = models.TextField(blank=True)
+    from_email = models.CharField(max_length=320)
+    # listas de direcciones, cabeceras extra, [[contenido, mimetype], ...]
+    # y [[nombre, contenido en base64, mimetype], ...]
+    to           = models.JSONField(default=list)
+    cc           = models.JSONField(default=list, blank=True)
+    bcc          = models.JSONField(default=list, blank=True)
+    reply_to     = models.JSONField(default=list, blank=True)
+    headers      = models.JSONField(default=dict, blank=True)
+    alternatives = models.JSONField(default=list, blank=True)
+    attachments  = models.JSONField(default=list, blank=True)
+
+    status     = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts   = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at    = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Correo en cola'
+        verbose_name_plural = 'Correos en cola'
+        indexes = [
+            # el worker: WHERE status = 'pending' AND next_attempt_at <= now ORDER BY next_attempt_at
+            models.Index(fields=['status', 'next_attempt_at'], name='queuedemail_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.get_status_display()})"
+
+
+class LoginAttempt(models.Model):
+    """
+    Contador de intentos de una ventana de login/throttle.py (por IP o por
+    usuario). En la base y no en la caché: el ``UPDATE count = count + 1``
+    es atómico entre workers, el ``incr()`` de la caché en disco no.
+    """
+    key        = models.CharField(max_length=64, unique=True)
+    count      = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Intento de login'
+        verbose_name_plural = 'Intentos de login'
+
+    def __str__(self):
+        return f"{self.key}: {self.count}"
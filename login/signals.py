@@ -0,0 +1,19 @@
+from django.contrib.auth.signals import user_logged_in, user_login_failed
+from django.dispatch import receiver
+
+from . import throttle
+
+
+@receiver(user_login_failed)
+def count_failed_login(sender, credentials, request=None, **kwargs):
+    # los intentos ya rechazados por el límite no alargan la espera
+    if request is None or getattr(request, 'login_throttled', False):
+        return
+    username = throttle.credential_username(credentials)
+    if username:
+        throttle.hit_user('login', username)
+
+
+@receiver(user_logged_in)
+def reset_failed_logins(sender, request, user, **kwargs):
+    throttle.reset('login', user.get_username())
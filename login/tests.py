@@ -1,3 +1,278 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.background import Worker
+
+from . import hashing, throttle
+from . import mail as outbox
+from . import views as login_views
+from .models import LoginAttempt, QueuedEmail
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    """Backend de entrega que rechaza los correos de ciertos destinatarios."""
+    reject = {'rebota@example.com'}
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            if self.reject & set(message.recipients()):
+                raise ConnectionError('servidor caído')
+        return len(email_messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='login.mail.QueuedEmailBackend',
+    OUTBOX_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    OUTBOX_RETRY_SECONDS=60,
+    OUTBOX_MAX_ATTEMPTS=3,
+)
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', 'ana@example.com', 'x')
+
+    def test_password_reset_is_queued_not_sent(self):
+        response = self.client.post(reverse('password_reset'), {'email': 'ana@example.com'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = QueuedEmail.objects.get()
+        self.assertEqual(queued.to, ['ana@example.com'])
+        self.assertEqual(queued.status, QueuedEmail.PENDING)
+
+        self.assertEqual(outbox.send_queued(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('/reset/', mail.outbox[0].body)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, QueuedEmail.SENT)
+        self.assertIsNotNone(queued.sent_at)
+
+    def test_message_round_trip(self):
+        message = mail.EmailMultiAlternatives(
+            'Asunto', 'Texto', 'quibly@example.com', ['a@example.com'],
+            cc=['c@example.com'], reply_to=['r@example.com'], headers={'X-Quibly': '1'},
+        )
+        message.attach_alternative('<p>Texto</p>', 'text/html')
+        message.attach('notas.txt', 'hola', 'text/plain')
+        message.send()
+
+        outbox.send_queued()
+        sent = mail.outbox[0]
+        self.assertEqual((sent.subject, sent.body, sent.cc, sent.reply_to), ('Asunto', 'Texto', ['c@example.com'], ['r@example.com']))
+        self.assertEqual(sent.extra_headers, {'X-Quibly': '1'})
+        self.assertEqual(sent.alternatives[0][:2], ('<p>Texto</p>', 'text/html'))
+        self.assertEqual(sent.attachments[0][0], 'notas.txt')
+
+    def test_batches_share_one_connection(self):
+        for i in range(5):
+            mail.send_mail(f'Aviso {i}', 'Texto', None, [f'u{i}@example.com'])
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open') as opened:
+            self.assertEqual(outbox.send_queued(batch_size=2), (5, 0))
+        # un open() por bloque: 2 + 2 + 1
+        self.assertEqual(opened.call_count, 3)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_file_backend_delivery(self):
+        mail.send_mail('Fichero', 'Texto', None, ['ana@example.com'])
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.settings(OUTBOX_DELIVERY_BACKEND='django.core.mail.backends.filebased.EmailBackend',
+                               EMAIL_FILE_PATH=tmp):
+                self.assertEqual(outbox.send_queued(), (1, 0))
+            files = os.listdir(tmp)
+            self.assertEqual(len(files), 1)
+            with open(os.path.join(tmp, files[0])) as handle:
+                self.assertIn('Subject: Fichero', handle.read())
+
+    @override_settings(OUTBOX_DELIVERY_BACKEND='login.tests.FailingEmailBackend')
+    def test_failures_back_off_then_give_up(self):
+        mail.send_mail('Bien', 'Texto', None, ['ana@example.com'])
+        mail.send_mail('Mal', 'Texto', None, ['rebota@example.com'])
+        with self.assertLogs('login.mail', 'WARNING'):
+            self.assertEqual(outbox.send_queued(), (1, 1))
+
+        failed = QueuedEmail.objects.get(subject='Mal')
+        self.assertEqual((failed.status, failed.attempts), (QueuedEmail.PENDING, 1))
+        self.assertIn('servidor caído', failed.last_error)
+        # hasta que no pasa la espera no se reintenta
+        self.assertEqual(outbox.send_queued(), (0, 0))
+
+        now = timezone.now()
+        for attempt, delay in ((2, 120), (3, None)):
+            with mock.patch('django.utils.timezone.now', return_value=failed.next_attempt_at), \
+                    self.assertLogs('login.mail', 'WARNING'):
+                self.assertEqual(outbox.send_queued(), (0, 1))
+            previous, failed = failed, QueuedEmail.objects.get(pk=failed.pk)
+            self.assertEqual(failed.attempts, attempt)
+            if delay:
+                self.assertEqual(failed.next_attempt_at - previous.next_attempt_at, timedelta(seconds=delay))
+        self.assertEqual(failed.status, QueuedEmail.FAILED)
+        self.assertGreater(failed.next_attempt_at, now)
+        with mock.patch('django.utils.timezone.now', return_value=now + timedelta(days=1)):
+            self.assertEqual(outbox.send_queued(), (0, 0))
+
+    def test_command_and_stale_claims(self):
+        mail.send_mail('Aviso', 'Texto', None, ['ana@example.com'])
+        # un worker que murió a medio envío deja la fila en "enviando"
+        QueuedEmail.objects.update(status=QueuedEmail.SENDING, next_attempt_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command('send_queued_mail', stdout=out)
+        self.assertIn('1 correos enviados', out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_claim_skips_rows_taken_by_another_worker(self):
+        for i in range(3):
+            mail.send_mail(f'Aviso {i}', 'Texto', None, [f'u{i}@example.com'])
+        # otro worker leyó las mismas filas antes de que este las reservara
+        seen = list(outbox.due())
+        self.assertEqual(len(outbox.claim(2)), 2)
+        now = timezone.now()
+        self.assertEqual([row.subject for row in seen if outbox._take(row, now)], ['Aviso 2'])
+        self.assertEqual(outbox.claim(10), [])
+        self.assertEqual(QueuedEmail.objects.filter(status=QueuedEmail.SENDING).count(), 3)
+
+    @override_settings(OUTBOX_DELIVERY_BACKEND='login.tests.FailingEmailBackend')
+    def test_next_attempt_waits_for_the_first_retry(self):
+        self.assertIsNone(outbox.next_attempt_in())
+        mail.send_mail('Mal', 'Texto', None, ['rebota@example.com'])
+        self.assertEqual(outbox.next_attempt_in(), 0)
+        with self.assertLogs('login.mail', 'WARNING'):
+            outbox.send_queued()
+        self.assertAlmostEqual(outbox.next_attempt_in(), 60, delta=5)
+        QueuedEmail.objects.update(status=QueuedEmail.FAILED)
+        self.assertIsNone(outbox.next_attempt_in())
+
+
+class BackgroundWorkerTests(SimpleTestCase):
+    """core.background.Worker con funciones sin base de datos."""
+
+    def run_worker(self, work, next_run=None):
+        worker = Worker('test', work, next_run)
+        thread = worker.kick()
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(worker.thread)
+        return worker
+
+    def test_kick_while_finishing_is_not_lost(self):
+        calls = []
+        worker = None
+
+        def next_run():
+            # el aviso llega justo después de la pasada, antes de decidir terminar
+            if len(calls) == 1:
+                worker.kick()
+            return None
+
+        worker = Worker('test', lambda: calls.append(1), next_run)
+        worker.kick().join(10)
+        self.assertEqual(len(calls), 2)
+        self.assertIsNone(worker.thread)
+
+    def test_waits_for_the_next_scheduled_run(self):
+        calls = []
+        self.run_worker(lambda: calls.append(1), lambda: 0 if len(calls) == 1 else None)
+        self.assertEqual(len(calls), 2)
+
+    def test_errors_stop_the_thread_until_the_next_kick(self):
+        calls = []
+
+        def work():
+            calls.append(1)
+            raise RuntimeError('fallo')
+
+        with self.assertLogs('core.background', 'ERROR'):
+            worker = self.run_worker(work, lambda: 0)
+        self.assertEqual(len(calls), 1)
+        with self.assertLogs('core.background', 'ERROR'):
+            worker.kick().join(10)
+        self.assertEqual(len(calls), 2)
+
+
+@override_settings(
+    ARGON2_TIME_COST=1, ARGON2_MEMORY_COST=64, ARGON2_PARALLELISM=1,
+    LOGIN_THROTTLE_IP=6, LOGIN_THROTTLE_USERNAME=3,
+    PASSWORD_HASHING_CONCURRENCY=1, PASSWORD_HASHING_QUEUE=0, PASSWORD_HASHING_TIMEOUT=0.01,
+)
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', 'ana@example.com', 'secreta')
+
+    def login(self, password, username='ana', url=None):
+        return self.client.post(url or reverse('login'), {'username': username, 'password': password})
+
+    def test_hasher_parameters_come_from_settings(self):
+        self.assertIn('$m=64,t=1,p=1$', self.user.password)
+        hasher = get_hasher()
+        self.assertIsInstance(hasher, hashing.Argon2PasswordHasher)
+        self.assertFalse(hasher.must_update(self.user.password))
+        with self.settings(ARGON2_TIME_COST=2):
+            self.assertTrue(hasher.must_update(self.user.password))
+
+    def test_failed_logins_are_rejected_before_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.login('mal').status_code, 200)
+        with mock.patch('django.contrib.auth.backends.ModelBackend.authenticate') as authenticate:
+            self.assertEqual(self.login('secreta').status_code, 200)
+            response = self.login('secreta', url=reverse(login_views.login_view))
+        self.assertEqual(response.status_code, 429)
+        authenticate.assert_not_called()
+        # otro usuario desde la misma IP todavía puede entrar
+        User.objects.create_user('luis', password='otra')
+        self.assertEqual(self.login('otra', 'luis').status_code, 302)
+
+    def test_successful_login_resets_the_username_counter(self):
+        for _ in range(2):
+            self.login('mal')
+            self.login('mal')
+            self.assertEqual(self.login('secreta').status_code, 302)
+            self.client.logout()
+        # pero el límite por IP cuenta todos los intentos
+        self.assertEqual(self.login('secreta', url=reverse(login_views.login_view)).status_code, 429)
+
+    def test_hits_are_atomic_database_increments(self):
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1')
+        throttle.hit('login', request)
+        # sin leer el valor: un solo UPDATE count = count + 1 en la base
+        with CaptureQueriesContext(connection) as queries:
+            throttle.hit('login', request)
+        self.assertEqual(len(queries), 1)
+        self.assertRegex(queries[0]['sql'], r'"count" = \(?"login_loginattempt"\."count" \+ 1')
+        attempt = LoginAttempt.objects.get()
+        self.assertEqual(attempt.count, 2)
+
+        # pasada la ventana el contador vuelve a empezar en la misma fila
+        with mock.patch('django.utils.timezone.now', return_value=attempt.expires_at + timedelta(seconds=1)):
+            self.assertFalse(throttle.is_limited('login', request))
+            throttle.hit('login', request)
+        self.assertEqual(LoginAttempt.objects.get().count, 1)
+
+    def test_registration_is_limited_per_ip(self):
+        data = {'username': 'nuevo', 'email': 'n@example.com', 'password1': 'a', 'password2': 'b'}
+        for _ in range(6):
+            self.assertEqual(self.client.post(reverse('register'), data).status_code, 200)
+        self.assertEqual(self.client.post(reverse('register'), data).status_code, 429)
+
+    def test_gate_caps_concurrent_hashes(self):
+        with hashing.gate():
+            # uno en curso, cola de 0: se rechaza sin esperar
+            with self.assertRaises(hashing.HashingBusy):
+                make_password('x')
+            with self.settings(PASSWORD_HASHING_QUEUE=1):
+                with self.assertRaises(hashing.HashingBusy):
+                    make_password('x')
+            response = self.login('secreta', url=reverse(login_views.login_view))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertTrue(make_password('x').startswith('argon2$'))
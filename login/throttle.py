@@ -0,0 +1,138 @@
+# login/throttle.py
+
+"""
+Límite de intentos de login y registro, comprobado antes de calcular ningún
+hash (ver login/hashing.py).
+
+Contadores de ventana fija en la base (``LoginAttempt``, una fila por IP o
+usuario). No en la caché: con varios workers la única compartida es la de
+disco (perfil ``multi``) y su ``incr()`` lee y reescribe el valor, así que
+los intentos simultáneos, justo los que hay que frenar, se perderían. Cada
+intento es un ``UPDATE ... SET count = count + 1`` de una fila:
+
+- por IP, todos los intentos: ``LOGIN_THROTTLE_IP`` por ventana;
+- por nombre de usuario, solo los fallidos: ``LOGIN_THROTTLE_USERNAME``.
+  Un login correcto pone a cero su contador.
+
+La ventana dura ``LOGIN_THROTTLE_WINDOW`` segundos. ``0`` desactiva un límite.
+La IP es ``REMOTE_ADDR``: detrás de un proxy, este debe fijarla.
+
+Para el login, ``ThrottleBackend`` va el primero en ``AUTHENTICATION_BACKENDS``:
+así vale para cualquier vista que llame a ``authenticate()`` (la nuestra, la
+de ``django.contrib.auth``, el admin, allauth) y corta antes de que los
+demás backends calculen el hash. Los fallos y los logins correctos se
+apuntan desde las señales de login/signals.py. El registro se comprueba en
+la propia vista.
+"""
+
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LoginAttempt
+
+
+def window():
+    return getattr(settings, 'LOGIN_THROTTLE_WINDOW', 300)
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR') or 'desconocida'
+
+
+def _key(scope, value):
+    # los nombres de usuario vienen del formulario: se resumen para que la clave sea válida
+    digest = hashlib.sha256(value.lower().encode()).hexdigest()[:32]
+    return f'{scope}:{digest}'
+
+
+def _ip_limit(scope, request):
+    return _key(f'{scope}-ip', client_ip(request)), getattr(settings, 'LOGIN_THROTTLE_IP', 30)
+
+
+def _user_limit(scope, username):
+    return _key(f'{scope}-user', username), getattr(settings, 'LOGIN_THROTTLE_USERNAME', 10)
+
+
+def is_limited(scope, request, username=None):
+    """True si la IP o el usuario ya agotaron sus intentos en esta ventana."""
+    limits = [_ip_limit(scope, request)]
+    if username:
+        limits.append(_user_limit(scope, username))
+    limits = [(key, limit) for key, limit in limits if limit]
+    if not limits:
+        return False
+    counts = dict(
+        LoginAttempt.objects.filter(key__in=[key for key, _ in limits], expires_at__gt=timezone.now())
+        .values_list('key', 'count')
+    )
+    return any(counts.get(key, 0) >= limit for key, limit in limits)
+
+
+def _hit(key, limit):
+    if not limit:
+        return
+    now = timezone.now()
+    attempts = LoginAttempt.objects.filter(key=key)
+    # cada paso es un UPDATE condicional de una fila: la base serializa los
+    # intentos simultáneos y ninguno se pierde
+    if attempts.filter(expires_at__gt=now).update(count=F('count') + 1):
+        return
+    expires_at = now + timedelta(seconds=window())
+    # ventana caducada: se reabre (solo uno la encuentra caducada)
+    if attempts.filter(expires_at__lte=now).update(count=1, expires_at=expires_at):
+        return
+    try:
+        with transaction.atomic():
+            LoginAttempt.objects.create(key=key, count=1, expires_at=expires_at)
+    except IntegrityError:
+        # otro intento creó la fila a la vez
+        attempts.update(count=F('count') + 1)
+    else:
+        # de paso, las filas de ventanas que ya nadie reabrió
+        LoginAttempt.objects.filter(expires_at__lte=now - timedelta(seconds=window())).delete()
+
+
+def hit(scope, request):
+    """Apunta un intento a la IP."""
+    _hit(*_ip_limit(scope, request))
+
+
+def hit_user(scope, username):
+    """Apunta un intento fallido al usuario."""
+    _hit(*_user_limit(scope, username))
+
+
+def reset(scope, username):
+    LoginAttempt.objects.filter(key=_key(f'{scope}-user', username)).delete()
+
+
+def credential_username(credentials):
+    # allauth autentica también por email
+    return credentials.get('username') or credentials.get('email') or ''
+
+
+class ThrottleBackend:
+    """
+    No autentica a nadie: rechaza el intento si la IP o el usuario están
+    limitados (``PermissionDenied`` detiene al resto de backends) y si no,
+    lo apunta a la IP y deja seguir.
+
+    Sin ``get_user`` a propósito: ``force_login`` y ``login()`` se saltan
+    este backend y las sesiones siguen guardando el de siempre.
+    """
+
+    def authenticate(self, request, **credentials):
+        if request is None:
+            return None
+        username = credential_username(credentials)
+        if is_limited('login', request, username):
+            request.login_throttled = True
+            raise PermissionDenied
+        hit('login', request)
+        return None
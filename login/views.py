@@ -7,6 +7,8 @@ from django.contrib.auth.forms import AuthenticationForm
 from django.db import IntegrityError
 from django.contrib.auth.models import User
 from .forms import UserDeleteForm
+from flashcard.stats import user_stats
+from . import throttle
 
 
 
@@ -19,7 +21,7 @@ def exit(request):
 
 @login_required
 def profile_login(request):
-    return render(request, 'content/profile.html')
+    return render(request, 'content/profile.html', {'stats': user_stats(request.user)})
 
 
 
@@ -27,6 +29,11 @@ def register(request):
     if request.method == 'GET':
         return render(request, 'registration/register.html', {"form": CustomUserCreationForm})
     else:
+        # antes de calcular el hash de la contraseña nueva
+        if throttle.is_limited('register', request):
+            error_message = "Demasiados intentos. Espera unos minutos antes de volver a probar."
+            return render(request, 'registration/register.html', {"form": CustomUserCreationForm, "error": error_message}, status=429)
+        throttle.hit('register', request)
         if request.POST["password1"] == request.POST["password2"]:
             try:
                 user = User.objects.create_user(
@@ -51,6 +58,10 @@ def login_view(request):
         user = authenticate(
             request, username=request.POST['username'], password=request.POST['password'])
         if user is None:
+            # rechazado por login/throttle.py antes de calcular ningún hash
+            if getattr(request, 'login_throttled', False):
+                error_message = "Demasiados intentos. Espera unos minutos antes de volver a probar."
+                return render(request, 'registration/login.html', {"form": AuthenticationForm, "error": error_message}, status=429)
             error_message = "Nombre de usuario o contraseña incorrectos."
             return render(request, 'registration/login.html', {"form": AuthenticationForm, "error": error_message})
 
@@ -0,0 +1,342 @@
+/*
+ * Quibly: estudio de un capítulo sin recargar la página.
+ *
+ * Usa la API JSON de flashcard/api.py: descarga el mazo por páginas y
+ * precarga las siguientes tarjetas, avanza en el navegador y envía las
+ * respuestas en lotes. Si la API falla, el formulario se envía como siempre.
+ *
+ * Modo sin conexión: "Descargar capítulo" guarda el paquete del mazo, la
+ * página y los medios en la caché del service worker (/sw.js). Un capítulo
+ * descargado se estudia desde el paquete, sin peticiones por tarjeta; las
+ * respuestas se guardan en localStorage hasta que se pueden enviar.
+ */
+(function () {
+  'use strict';
+
+  var PAGE_SIZE = 20;      // tarjetas por petición
+  var PREFETCH_AHEAD = 5;  // precargar la siguiente página al quedar tan pocas
+  var FLUSH_EVERY = 10;    // respuestas por lote
+  var MAX_BATCH = 200;     // api.MAX_ANSWERS
+  var OFFLINE_CACHE = 'quibly-offline-v1';  // la misma que en sw.js
+
+  // localStorage puede no existir o estar lleno (modo privado): se ignora
+  var store = {
+    get: function (key, fallback) {
+      try {
+        var value = window.localStorage.getItem('quibly:' + key);
+        return value === null ? fallback : JSON.parse(value);
+      } catch (error) { return fallback; }
+    },
+    set: function (key, value) {
+      try { window.localStorage.setItem('quibly:' + key, JSON.stringify(value)); } catch (error) {}
+    },
+    remove: function (key) {
+      try { window.localStorage.removeItem('quibly:' + key); } catch (error) {}
+    },
+  };
+
+  function StudySession(root) {
+    this.root = root;
+    this.deckUrl = root.dataset.deckUrl;
+    this.answersUrl = root.dataset.answersUrl;
+    this.finishedUrl = root.dataset.finishedUrl;
+    this.bundleUrl = root.dataset.bundleUrl;
+    this.slug = root.dataset.slug;
+    this.position = Math.max(0, parseInt(root.dataset.position, 10) || 0);
+    this.total = parseInt(root.dataset.total, 10) || 0;
+    this.cards = {};
+    this.loading = {};
+    // respuestas aún no enviadas (también las de visitas anteriores sin red)
+    this.queue = store.get('answers:' + this.slug, []);
+    this.offline = !!store.get('bundle:' + this.slug, null);
+    if (!navigator.onLine) {
+      // la página guardada trae la posición de cuando se descargó
+      this.position = Math.max(this.position, store.get('position:' + this.slug, 0));
+    }
+    this.syncedPosition = this.position;
+    this.form = document.getElementById('navForm');
+    this.ready = false;
+    this.shownAt = Date.now();
+  }
+
+  StudySession.prototype.csrfToken = function () {
+    var input = this.form.querySelector('[name=csrfmiddlewaretoken]');
+    return input ? input.value : '';
+  };
+
+  StudySession.prototype.saveQueue = function () {
+    if (this.queue.length) store.set('answers:' + this.slug, this.queue);
+    else store.remove('answers:' + this.slug);
+    store.set('position:' + this.slug, this.position);
+  };
+
+  // capítulo descargado: todas las tarjetas de una vez (de la red o de la caché del service worker)
+  StudySession.prototype.loadBundle = function () {
+    var self = this;
+    return fetch(this.bundleUrl, { credentials: 'same-origin' })
+      .then(function (response) {
+        if (!response.ok) throw new Error('bundle ' + response.status);
+        return response.json();
+      })
+      .then(function (bundle) {
+        self.total = bundle.chapter.total;
+        bundle.cards.forEach(function (card) { self.cards[card.position] = card; });
+        // mismo total que las páginas: no hace falta pedir ninguna
+        for (var offset = 0; offset < self.total; offset += PAGE_SIZE) {
+          self.loading[offset] = Promise.resolve();
+        }
+        if (navigator.onLine && bundle.version !== store.get('bundle:' + self.slug, null)) {
+          // el mazo cambió desde la descarga: se guardan también los medios nuevos
+          saveForOffline(self.slug, window.location.pathname, self.bundleUrl).catch(function () {});
+        }
+      });
+  };
+
+  StudySession.prototype.fetchPage = function (offset) {
+    var self = this;
+    offset = Math.floor(offset / PAGE_SIZE) * PAGE_SIZE;
+    if (offset >= this.total) return Promise.resolve();
+    if (this.loading[offset]) return this.loading[offset];
+
+    // el navegador revalida con If-None-Match: un mazo sin cambios responde 304
+    var url = this.deckUrl + '?offset=' + offset + '&limit=' + PAGE_SIZE;
+    this.loading[offset] = fetch(url, { credentials: 'same-origin' })
+      .then(function (response) {
+        if (!response.ok) throw new Error('deck ' + response.status);
+        return response.json();
+      })
+      .then(function (data) {
+        self.total = data.chapter.total;
+        data.cards.forEach(function (card) { self.cards[card.position] = card; });
+      })
+      .catch(function (error) {
+        delete self.loading[offset];
+        throw error;
+      });
+    return this.loading[offset];
+  };
+
+  StudySession.prototype.prefetch = function () {
+    var ahead = this.position + PREFETCH_AHEAD;
+    if (ahead < this.total && !this.cards[ahead]) {
+      this.fetchPage(ahead).catch(function () {});
+    }
+  };
+
+  StudySession.prototype.flush = function (keepalive) {
+    var self = this;
+    var answers = this.queue.slice(0, MAX_BATCH);
+    var position = this.position;
+    this.queue = this.queue.slice(MAX_BATCH);
+    return fetch(this.answersUrl, {
+      method: 'POST',
+      credentials: 'same-origin',
+      keepalive: !!keepalive,
+      headers: { 'Content-Type': 'application/json', 'X-CSRFToken': this.csrfToken() },
+      body: JSON.stringify({ answers: answers, position: position }),
+    }).then(function (response) {
+      if (!response.ok) throw new Error('answers ' + response.status);
+      self.syncedPosition = position;
+      self.saveQueue();
+      return response.json();
+    }).then(function (data) {
+      // lo acumulado sin conexión puede ocupar varios lotes
+      return self.queue.length ? self.flush(keepalive) : data;
+    }, function (error) {
+      // se reintentan con el siguiente lote
+      self.queue = answers.concat(self.queue);
+      self.saveQueue();
+      throw error;
+    });
+  };
+
+  StudySession.prototype.render = function () {
+    var card = this.cards[this.position];
+    if (!card) return;
+
+    this.root.querySelectorAll('[data-field]').forEach(function (el) {
+      var value = card[el.dataset.field];
+      if (el.dataset.field === 'content') {
+        el.innerText = value || '—';
+      } else {
+        el.textContent = value || '';
+      }
+    });
+    var image = this.root.querySelector('[data-card-image]');
+    var placeholder = this.root.querySelector('[data-card-placeholder]');
+    image.classList.toggle('d-none', !card.image_url);
+    placeholder.classList.toggle('d-none', !!card.image_url);
+    placeholder.classList.toggle('d-flex', !card.image_url);
+    if (card.image_url) {
+      var img = image.querySelector('img');
+      // srcset antes que src: si no, el navegador baja primero la variante grande
+      if (card.image_srcset) {
+        img.sizes = '(min-width: 992px) 640px, 100vw';
+        img.srcset = card.image_srcset;
+      } else {
+        img.removeAttribute('srcset');
+      }
+      img.src = card.image_url;
+      img.alt = card.word_english;
+    }
+    this.root.querySelector('[data-card-ipa]').classList.toggle('d-none', !card.ipa_english);
+    this.root.querySelector('[data-study-pos]').textContent = this.position + 1;
+    this.shownAt = Date.now();
+    document.getElementById('prevBtn').disabled = this.position === 0;
+  };
+
+  StudySession.prototype.go = function (position) {
+    var self = this;
+    this.position = position;
+    if (this.cards[position]) {
+      this.render();
+      this.prefetch();
+      return;
+    }
+    this.fetchPage(position).then(function () {
+      self.render();
+      self.prefetch();
+    }, function () {
+      // sin API: volvemos a la página del servidor
+      window.location.reload();
+    });
+  };
+
+  StudySession.prototype.answer = function (action) {
+    var self = this;
+    if (action === 'prev') {
+      this.go(Math.max(this.position - 1, 0));
+      return;
+    }
+    var card = this.cards[this.position];
+    this.queue.push({
+      card: card.id,
+      mark_as: this.form.querySelector('[name=mark_as]').value,
+      seconds: Math.round((Date.now() - this.shownAt) / 1000),
+      answered_at: Date.now(),
+    });
+
+    if (this.position + 1 >= this.total) {
+      this.position = this.total;
+      this.saveQueue();
+      this.flush(false).then(
+        function () { window.location.href = self.finishedUrl; },
+        function () {
+          if (!navigator.onLine) {
+            // se envían en cuanto vuelva la conexión (evento online)
+            self.status('Capítulo terminado sin conexión: tus respuestas se enviarán al volver a estar en línea.');
+            return;
+          }
+          // sin API: la página del servidor retoma desde la última posición guardada
+          window.location.reload();
+        }
+      );
+      return;
+    }
+    this.position += 1;
+    this.saveQueue();
+    if (this.queue.length >= FLUSH_EVERY && navigator.onLine) this.flush(false).catch(function () {});
+    this.go(this.position);
+  };
+
+  StudySession.prototype.status = function (text) {
+    var el = this.root.querySelector('[data-offline-status]');
+    if (el) el.textContent = text;
+  };
+
+  StudySession.prototype.start = function () {
+    var self = this;
+    if (this.queue.length && navigator.onLine) this.flush(false).catch(function () {});
+    window.addEventListener('online', function () {
+      if (self.queue.length) self.flush(false).catch(function () {});
+    });
+    if (!this.form || !this.total || this.position >= this.total) return;
+
+    var first = this.offline ? this.loadBundle() : this.fetchPage(this.position);
+    first.then(function () {
+      self.ready = true;
+      if (!self.offline) self.prefetch();
+      // la página guardada puede mostrar otra tarjeta que la posición real
+      if (self.position !== parseInt(self.root.dataset.position, 10)) self.render();
+    }).catch(function () {});
+
+    this.form.addEventListener('submit', function (event) {
+      if (!self.ready || !self.cards[self.position]) return;  // envío normal
+      event.preventDefault();
+      var submitter = event.submitter;
+      self.answer(submitter ? submitter.value : 'next');
+    });
+
+    // al salir de la página enviamos lo pendiente (y la posición, para retomar)
+    window.addEventListener('pagehide', function () {
+      if (self.queue.length || self.position !== self.syncedPosition) {
+        self.flush(true).catch(function () {});
+      }
+    });
+  };
+
+  // Descarga de un capítulo para estudiar sin conexión
+
+  function saveForOffline(slug, pageUrl, bundleUrl) {
+    return fetch(bundleUrl, { credentials: 'same-origin', cache: 'no-cache' })
+      .then(function (response) {
+        if (!response.ok) throw new Error('bundle ' + response.status);
+        return response.clone().json().then(function (bundle) {
+          return caches.open(OFFLINE_CACHE).then(function (cache) {
+            var saves = [
+              cache.put(bundleUrl, response),
+              fetch(pageUrl, { credentials: 'same-origin' }).then(function (page) {
+                if (page.ok) return cache.put(pageUrl, page);
+              }),
+            ];
+            bundle.media.forEach(function (url) {
+              // las imágenes externas solo se pueden guardar como respuesta opaca
+              var sameOrigin = new URL(url, window.location.href).origin === window.location.origin;
+              saves.push(cache.match(url).then(function (cached) {
+                if (cached) return;
+                return fetch(url, sameOrigin ? {} : { mode: 'no-cors' })
+                  .then(function (media) { return cache.put(url, media); })
+                  .catch(function () {});
+              }));
+            });
+            return Promise.all(saves).then(function () {
+              store.set('bundle:' + slug, bundle.version);
+              return bundle;
+            });
+          });
+        });
+      });
+  }
+
+  function setupDownload(root) {
+    var button = root.querySelector('[data-offline-download]');
+    if (!button) return;
+    if (!('serviceWorker' in navigator) || !window.caches) {
+      button.classList.add('d-none');
+      return;
+    }
+    navigator.serviceWorker.register(button.dataset.serviceWorker).catch(function () {});
+    var slug = root.dataset.slug;
+    if (store.get('bundle:' + slug, null)) button.textContent = 'Disponible sin conexión ✓';
+
+    button.addEventListener('click', function () {
+      button.disabled = true;
+      button.textContent = 'Descargando…';
+      navigator.serviceWorker.ready
+        .then(function () { return saveForOffline(slug, window.location.pathname, root.dataset.bundleUrl); })
+        .then(function (bundle) {
+          button.textContent = 'Disponible sin conexión ✓ (' + bundle.chapter.total + ' tarjetas)';
+        }, function () {
+          button.textContent = 'No se pudo descargar, inténtalo de nuevo';
+        })
+        .then(function () { button.disabled = false; });
+    });
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    var root = document.querySelector('[data-study]');
+    if (!root || !window.fetch) return;
+    setupDownload(root);
+    new StudySession(root).start();
+  });
+})();